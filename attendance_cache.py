@@ -0,0 +1,152 @@
+# attendance_cache.py
+import threading
+import time
+from datetime import datetime, timedelta
+
+STATE_TTL = 300  # Seconds before today's state is re-read from the database
+SESSION_GAP = timedelta(minutes=10)  # Must match SESSION_GAP_MINUTES in db_config2
+
+WARM_QUERY = """
+    SELECT u.name, s.session_no, s.time_in, s.time_out
+    FROM userDetails u
+    LEFT JOIN attendance_sessions s
+        ON s.student_id = u.id AND s.date = %s
+        AND s.session_no = (
+            SELECT MAX(s2.session_no) FROM attendance_sessions s2
+            WHERE s2.student_id = u.id AND s2.date = %s
+        )
+"""
+
+
+def _as_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.strptime(str(value), "%Y-%m-%d %H:%M:%S")
+
+
+class StudentDayState:
+    """What we know about one registered student today"""
+
+    __slots__ = ("open_since", "last_out", "sessions")
+
+    def __init__(self, open_since=None, last_out=None, sessions=0):
+        self.open_since = open_since
+        self.last_out = last_out
+        self.sessions = sessions
+
+    def last_event(self):
+        return self.open_since or self.last_out
+
+
+class AttendanceStateCache:
+    """In-process copy of today's attendance state, used to reject marks without a query.
+
+    Warmed with one bulk query and kept in step with every successful write.
+    A "too soon" rejection is always one the database would make too: the
+    cached last event for a student is never newer than the real one, and
+    writes from other kiosks can only make the database stricter. Anything
+    the cache allows still goes to the database, which stays authoritative.
+    A name the cache has not seen (e.g. registered after warm-up) is left to
+    the database as well; once the database answers 'unregistered' for it,
+    later sightings are rejected from memory until the name is registered
+    through the gallery feed. The whole state is dropped on day rollover and
+    after STATE_TTL seconds.
+    """
+
+    def __init__(self, ttl=STATE_TTL):
+        self.ttl = ttl
+        self.day = None
+        self.loaded_at = 0.0
+        self.students = {}
+        self.unregistered = set()  # Names the database reported as not registered
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _stale(self, day):
+        return self.day != day or time.monotonic() - self.loaded_at > self.ttl
+
+    def warm(self, connection, day=None):
+        """Load today's state for every registered student with one query"""
+        day = day or datetime.now().date()
+        day_str = day.strftime("%Y-%m-%d")
+        with connection.cursor() as cursor:
+            cursor.execute(WARM_QUERY, (day_str, day_str))
+            rows = cursor.fetchall()
+
+        students = {}
+        for row in rows:
+            time_in, time_out = _as_datetime(row["time_in"]), _as_datetime(row["time_out"])
+            if time_in is None:
+                students[row["name"]] = StudentDayState()
+            elif time_out is None:
+                students[row["name"]] = StudentDayState(time_in, None, row["session_no"])
+            else:
+                students[row["name"]] = StudentDayState(None, time_out, row["session_no"])
+
+        with self._lock:
+            self.students = students
+            self.unregistered = set()
+            self.day = day
+            self.loaded_at = time.monotonic()
+
+    def ensure_warm(self, connection, day=None):
+        day = day or datetime.now().date()
+        with self._lock:
+            stale = self._stale(day)
+        if stale:
+            self.warm(connection, day)
+
+    def check(self, name, timestamp):
+        """Return a rejection reason ('unregistered' or 'too_soon'), or None if the DB must decide"""
+        with self._lock:
+            if self._stale(timestamp.date()):
+                self.misses += 1
+                return None
+            state = self.students.get(name)
+            if state is None:
+                if name in self.unregistered:
+                    self.hits += 1
+                    return "unregistered"
+                self.misses += 1
+                return None
+            last_event = state.last_event()
+            if last_event is not None and timestamp < last_event + SESSION_GAP:
+                self.hits += 1
+                return "too_soon"
+            self.misses += 1
+            return None
+
+    def apply(self, name, timestamp, result):
+        """Record the outcome of a database mark so later checks see it"""
+        with self._lock:
+            if self.day != timestamp.date():
+                return
+            if result == "unregistered":
+                self.students.pop(name, None)
+                self.unregistered.add(name)
+                return
+            state = self.students.setdefault(name, StudentDayState())
+            if result == "in":
+                state.open_since = timestamp
+                state.sessions += 1
+            elif result == "out":
+                state.open_since = None
+                state.last_out = timestamp
+
+    def on_gallery_change(self, op, name):
+        """LiveGallery listener: track students registered or removed since warm-up"""
+        with self._lock:
+            if self.day is None:
+                return
+            if op == "remove":
+                self.students.pop(name, None)
+            else:
+                self.unregistered.discard(name)
+                self.students.setdefault(name, StudentDayState())
+
+    def invalidate(self):
+        with self._lock:
+            self.day = None
+            self.students = {}
+            self.unregistered = set()
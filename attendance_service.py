@@ -0,0 +1,182 @@
+# attendance_service.py
+"""Headless multi-camera attendance service.
+
+    python attendance_service.py 0 1 rtsp://entrance-b/stream recordings/test.mp4 \\
+        [--duration 3600] [--detect-every 1] [--no-motion-gate] [--detector yunet]
+
+Each source (a camera index, an RTSP/HTTP URL or a video file) runs in its
+own worker process. The gallery is built once, placed in shared memory and
+attached read-only by every worker, so adding a camera does not add a copy
+of the encodings. Each worker follows the registration change feed, so new
+students are recognized without a restart. Workers send attendance events over a queue to this
+process, where a single AttendanceWriter batches them into the database.
+"""
+import argparse
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+from multiprocessing import Event, Pool, Queue
+
+import cv2
+
+from attendance_writer import AttendanceWriter
+from detectors import DEFAULT_DETECTOR, DETECTORS, create_detector
+from db_config2 import DB_ERRORS, fetch_gallery_changes, get_db_connection, get_gallery_version
+from gallery import SharedGallery
+from live_gallery import LiveGallery
+from motion import MotionGate
+from face_models import warm_up
+from take_attendace import MIN_REQUIRED_FRAMES, load_known_faces, recognize_faces, save_attendance_event
+from voting import AttendanceVoter
+
+RECONNECT_DELAY = 5  # Seconds before reopening a live stream that stopped delivering frames
+EVENT_POLL_INTERVAL = 0.5  # Seconds between stop checks while waiting for events
+
+_gallery = None
+_gallery_shm = None
+_events = None
+_stop = None
+
+
+def _init_worker(handle, gallery_version, events, stop):
+    global _gallery, _gallery_shm, _events, _stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The parent handles Ctrl+C and sets ``stop``
+    gallery, _gallery_shm = SharedGallery.attach(handle)
+    # Registrations made while the service runs are applied on top of the shared matrix
+    _gallery = LiveGallery(gallery, gallery_version).follow(fetch_gallery_changes)
+    _events, _stop = events, stop
+
+
+def parse_source(value):
+    """Camera indices are given as integers, everything else is passed to OpenCV as is"""
+    return int(value) if value.isdigit() else value
+
+
+def run_camera(args):
+    """Worker entry: recognize faces on one source until stopped; returns (source, frames, events, errors, seconds)"""
+    source, deadline, detect_every, motion_gate, detector_name = args
+    detector = create_detector(detector_name)
+    warm_up(detector)
+    is_file = isinstance(source, str) and os.path.isfile(source)
+    voter = AttendanceVoter(min_votes=MIN_REQUIRED_FRAMES)
+    gate = MotionGate() if motion_gate else None
+    frames = events = errors = 0
+    started = time.perf_counter()
+
+    cap = cv2.VideoCapture(source)
+    try:
+        while not _stop.is_set() and (deadline is None or time.time() < deadline):
+            if not cap.isOpened() or not cap.grab():
+                if is_file:
+                    break
+                print(f"{source}: no frames, reconnecting in {RECONNECT_DELAY}s", file=sys.stderr)
+                cap.release()
+                _stop.wait(RECONNECT_DELAY)
+                cap = cv2.VideoCapture(source)
+                continue
+            frames += 1
+            if frames % detect_every:
+                continue  # grab() without retrieve() skips decoding this frame
+            ret, frame = cap.retrieve()
+            if not ret:
+                continue
+
+            try:
+                _, names, distances = recognize_faces(frame, _gallery, gate, detector)
+            except Exception as e:
+                # One bad frame must not take this camera (or, through the pool, the others) down
+                errors += 1
+                print(f"❌ {source}: error processing frame: {e}", file=sys.stderr)
+                continue
+            now = datetime.now()
+            for name, distance in zip(names, distances):
+                if name is not None and voter.vote(name, now, distance):
+                    _events.put((source, name, now))
+                    events += 1
+    finally:
+        cap.release()
+    return source, frames, events, errors, time.perf_counter() - started
+
+
+def _drain_events(events, writer, done):
+    """Feed worker events to the single attendance writer"""
+    while not (done.is_set() and events.empty()):
+        try:
+            source, name, timestamp = events.get(timeout=EVENT_POLL_INTERVAL)
+        except queue.Empty:
+            continue
+        print(f"{timestamp:%Y-%m-%d %H:%M:%S} {source}: {name}")
+        writer.submit(name, timestamp)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run attendance on several cameras without the UI")
+    parser.add_argument("sources", nargs="+", help="Camera indices, stream URLs or video files")
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds (default: run until Ctrl+C)")
+    parser.add_argument("--detect-every", type=int, default=1, help="Recognize every Nth frame of each source")
+    parser.add_argument("--no-motion-gate", action="store_true", help="Detect on every frame even when idle")
+    parser.add_argument("--detector", choices=list(DETECTORS), default=DEFAULT_DETECTOR, help="Face detector backend")
+    args = parser.parse_args(argv)
+
+    try:
+        create_detector(args.detector)  # Fail on a missing model file before starting the workers
+    except (ValueError, FileNotFoundError) as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    gallery_version = get_gallery_version() or 0
+    known_faces, known_names = load_known_faces()
+    if len(known_faces) == 0:
+        print("No registered faces found. Please register students first.", file=sys.stderr)
+        return 1
+
+    shared = SharedGallery(known_faces, known_names)
+    del known_faces  # Workers read the shared copy
+    events = Queue()
+    stop = Event()
+    done = threading.Event()
+
+    deadline = time.time() + args.duration if args.duration else None
+    jobs = [(parse_source(s), deadline, max(1, args.detect_every), not args.no_motion_gate, args.detector)
+            for s in args.sources]
+    # Fork the workers before the writer threads start; each worker gets its own
+    # connection pool (db_config2 resets it after a fork)
+    pool = Pool(len(jobs), _init_worker, (shared.handle, gallery_version, events, stop))
+    writer = AttendanceWriter(get_db_connection, save_attendance_event, transient_errors=DB_ERRORS).start()
+    drain = threading.Thread(target=_drain_events, args=(events, writer, done), name="events", daemon=True)
+    drain.start()
+    started = time.perf_counter()
+    total_frames = 0
+    try:
+        with pool:
+            results = pool.imap_unordered(run_camera, jobs)
+            try:
+                for source, frames, count, errors, seconds in results:
+                    total_frames += frames
+                    print(f"{source}: {frames} frames in {seconds:.1f}s "
+                          f"({frames / max(seconds, 1e-9):.1f} frames/s), {count} events, "
+                          f"{errors} frame errors", file=sys.stderr)
+            except KeyboardInterrupt:
+                print("Stopping cameras...", file=sys.stderr)
+                stop.set()
+                for source, frames, count, errors, seconds in results:
+                    total_frames += frames
+    finally:
+        done.set()
+        drain.join()
+        writer.close(timeout=None)
+        shared.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Total: {total_frames} frames in {elapsed:.1f}s "
+          f"({total_frames / max(elapsed, 1e-9):.1f} frames/s)", file=sys.stderr)
+    print(f"Database: {writer.stats}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
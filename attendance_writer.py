@@ -0,0 +1,254 @@
+# attendance_writer.py
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from queue import Queue, Empty
+
+SPOOL_FILE = "attendance_spool.jsonl"
+DEAD_LETTER_FILE = "attendance_dead_letter.jsonl"
+BATCH_SIZE = 50
+FLUSH_INTERVAL = 0.5  # Seconds to wait for more events before committing a batch
+MAX_RETRIES = 3
+MAX_EVENT_ATTEMPTS = 3  # Failures (other than transient_errors) before an event is dead-lettered
+RETRY_BACKOFF = 0.5  # Seconds, doubled on every retry
+MAX_NOTICES = 50  # Rejection notices kept for the page to show
+
+
+class AttendanceEvent:
+    """A recognition to be persisted: who, and when they were seen"""
+
+    __slots__ = ("name", "timestamp", "attempts")
+
+    def __init__(self, name, timestamp=None, attempts=0):
+        self.name = name
+        self.timestamp = timestamp or datetime.now()
+        self.attempts = attempts  # Failed saves so far, carried through the spool
+
+    def to_json(self, **extra):
+        return json.dumps(dict({"name": self.name, "timestamp": self.timestamp.isoformat(),
+                                "attempts": self.attempts}, **extra))
+
+    @classmethod
+    def from_json(cls, line):
+        data = json.loads(line)
+        return cls(data["name"], datetime.fromisoformat(data["timestamp"]), data.get("attempts", 0))
+
+
+def coalesce(events):
+    """Drop repeat sightings of the same person in the same minute, in time order.
+
+    Marks are stored at minute resolution, so these are exact duplicates.
+    Sightings further apart are all kept: whether one is too soon depends on
+    the last mark the database accepted, which only the database knows.
+    """
+    kept = []
+    seen = set()
+    for event in sorted(events, key=lambda e: e.timestamp):
+        key = (event.name, event.timestamp.replace(second=0, microsecond=0))
+        if key in seen:
+            continue
+        seen.add(key)
+        kept.append(event)
+    return kept
+
+
+class AsyncFeedback:
+    """Plays confirmation feedback on a background thread so callers never block.
+
+    Requests that arrive while a sound is already playing are collapsed into
+    it rather than queued up behind it.
+    """
+
+    def __init__(self, play_fn):
+        self.play_fn = play_fn
+        self._pending = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="feedback", daemon=True)
+        self._thread.start()
+
+    def notify(self, *_):
+        self._pending.set()
+
+    def _run(self):
+        while True:
+            self._pending.wait()
+            self._pending.clear()
+            try:
+                self.play_fn()
+            except Exception as e:
+                print(f"❌ Feedback failed: {e}")
+
+
+class AttendanceWriter:
+    """Write-behind persistence for attendance events.
+
+    ``submit`` only enqueues. A background thread drains the queue, drops
+    duplicate sightings and commits each batch over one connection via
+    ``save_fn(event, connection)``, which returns ``(marked, reason)`` and
+    raises on database errors. Failed batches are retried with backoff and
+    then appended to a local spool file, which is replayed on the next start
+    and after the next successful commit. An event whose save keeps failing
+    with an error outside ``transient_errors`` (a bug, not an outage) is
+    moved to the dead-letter file after MAX_EVENT_ATTEMPTS tries instead.
+
+    Rejections, and events spooled because the database was unreachable
+    (reason 'spooled'), are kept as (name, reason) notices for the caller's
+    thread to show with ``pop_notices()``; the writer thread never touches
+    the page.
+    """
+
+    def __init__(self, connect_fn, save_fn, on_marked=None, spool_path=SPOOL_FILE,
+                 batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 max_retries=MAX_RETRIES, thread_hook=None, transient_errors=(),
+                 dead_letter_path=DEAD_LETTER_FILE, max_event_attempts=MAX_EVENT_ATTEMPTS):
+        self.connect_fn = connect_fn
+        self.save_fn = save_fn
+        self.on_marked = on_marked
+        self.spool_path = spool_path
+        self.dead_letter_path = dead_letter_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.transient_errors = tuple(transient_errors)
+        self.max_event_attempts = max_event_attempts
+        self.stats = {"submitted": 0, "committed": 0, "rejected": 0, "coalesced": 0,
+                      "retries": 0, "spooled": 0, "dead_lettered": 0}
+        self._stats_lock = threading.Lock()
+        self._notices = deque(maxlen=MAX_NOTICES)
+
+        self._queue = Queue()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="attendance-writer", daemon=True)
+        if thread_hook:
+            thread_hook(self._thread)
+
+    def start(self):
+        self._replay_spool()
+        self._thread.start()
+        return self
+
+    def _count(self, key, n=1):
+        with self._stats_lock:
+            self.stats[key] += n
+
+    def submit(self, name, timestamp=None):
+        """Queue a recognition for persistence; never blocks"""
+        self._count("submitted")
+        self._queue.put(AttendanceEvent(name, timestamp))
+
+    def pop_notices(self):
+        """Return and clear the (name, reason) rejections since the last call"""
+        with self._stats_lock:
+            notices = list(self._notices)
+            self._notices.clear()
+        return notices
+
+    def flush(self, timeout=None):
+        """Block until every submitted event has been committed or spooled"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout=10):
+        self.flush(timeout)
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except Empty:
+                continue
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(0, deadline - time.monotonic())))
+                except Empty:
+                    break
+            try:
+                self._commit(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _commit(self, batch):
+        events = coalesce(batch)
+        self._count("coalesced", len(batch) - len(events))
+        done = 0
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._count("retries")
+                time.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
+            connection = self.connect_fn()
+            if connection is None:
+                continue
+            try:
+                while done < len(events):
+                    self._save(events[done], connection)
+                    done += 1
+                break
+            except Exception as e:
+                print(f"❌ Attendance batch failed (attempt {attempt + 1}): {e}")
+            finally:
+                connection.close()
+
+        if done < len(events):
+            self._spool(events[done:])
+            with self._stats_lock:
+                self._notices.extend((event.name, "spooled") for event in events[done:])
+        elif os.path.exists(self.spool_path):
+            self._replay_spool()
+
+    def _save(self, event, connection):
+        try:
+            marked, reason = self.save_fn(event, connection)
+        except self.transient_errors:
+            raise
+        except Exception as e:
+            event.attempts += 1
+            if event.attempts < self.max_event_attempts:
+                raise
+            print(f"❌ Giving up on attendance for {event.name} after {event.attempts} attempts: {e}")
+            self._dead_letter(event, e)
+            return
+        if marked:
+            self._count("committed")
+            if self.on_marked:
+                self.on_marked(event.name)
+        else:
+            self._count("rejected")
+            with self._stats_lock:
+                self._notices.append((event.name, reason))
+
+    def _dead_letter(self, event, error):
+        with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+            f.write(event.to_json(error=repr(error)) + "\n")
+        self._count("dead_lettered")
+
+    def _spool(self, events):
+        with open(self.spool_path, "a", encoding="utf-8") as f:
+            for event in events:
+                f.write(event.to_json() + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._count("spooled", len(events))
+
+    def _replay_spool(self):
+        """Re-queue spooled events, moving the spool aside first so new failures start a fresh one"""
+        replay_path = f"{self.spool_path}.replay"
+        for path in (replay_path, self.spool_path):
+            if not os.path.exists(path):
+                continue
+            if path == self.spool_path:
+                os.replace(self.spool_path, replay_path)
+            with open(replay_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._queue.put(AttendanceEvent.from_json(line))
+            os.remove(replay_path)
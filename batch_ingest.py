@@ -0,0 +1,220 @@
+# batch_ingest.py
+"""Headless attendance from recorded footage and image folders.
+
+    python batch_ingest.py recordings/*.mp4 snapshots/ --stride 5 --workers 4 \\
+        --output events.csv [--mark]
+
+Each input is processed in its own worker process. Frames are sampled every
+``--stride`` frames, detected and encoded in batches, and matched against the
+gallery with one matrix operation per batch. An attendance event is emitted
+when an identity reaches MIN_REQUIRED_FRAMES confident matches, stamped with
+the time derived from the video position.
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from multiprocessing import Pool
+
+import cv2
+
+from attendance_writer import AttendanceWriter
+from db_config2 import DB_ERRORS, get_db_connection
+from face_models import face_recognition
+from gallery import build_gallery
+from take_attendace import (
+    ALLOWED_EXTENSIONS, FACE_RECOGNITION_TOLERANCE, MIN_REQUIRED_FRAMES,
+    load_known_faces, save_attendance_event,
+)
+from voting import AttendanceVoter
+
+DEFAULT_STRIDE = 5
+DEFAULT_BATCH_SIZE = 16
+EVENT_FIELDS = ["source", "name", "timestamp", "position_seconds", "votes", "best_distance"]
+
+_gallery = None
+
+
+def _init_worker(known_faces, known_names):
+    global _gallery
+    _gallery = build_gallery(known_faces, known_names)
+
+
+def iter_video_frames(path, stride, start=None):
+    """Yield (timestamp, position_seconds, frame) for every ``stride``-th frame of a video"""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video {path}")
+    try:
+        if start is None:
+            # Assume the file was last written when recording stopped
+            fps = cap.get(cv2.CAP_PROP_FPS) or 0
+            frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0
+            duration = frame_count / fps if fps else 0
+            start = datetime.fromtimestamp(os.path.getmtime(path)) - timedelta(seconds=duration)
+        index = 0
+        while True:
+            # grab() skips decoding, so strided-out frames cost almost nothing
+            if not cap.grab():
+                break
+            if index % stride == 0:
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                position = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+                yield start + timedelta(seconds=position), position, frame
+            index += 1
+    finally:
+        cap.release()
+
+
+def iter_image_frames(directory, stride):
+    """Yield (timestamp, position_seconds, frame) for images in a folder, stamped by mtime"""
+    files = sorted(
+        f for f in os.listdir(directory) if f.lower().endswith(tuple(ALLOWED_EXTENSIONS))
+    )
+    first = None
+    for filename in files[::stride]:
+        path = os.path.join(directory, filename)
+        frame = cv2.imread(path)
+        if frame is None:
+            continue
+        timestamp = datetime.fromtimestamp(os.path.getmtime(path))
+        first = first or timestamp
+        yield timestamp, (timestamp - first).total_seconds(), frame
+
+
+def iter_batches(frames, batch_size):
+    batch = []
+    for item in frames:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def recognize_batch(frames, gallery, model="hog"):
+    """Detect, encode and match a batch of BGR frames; returns [(names, distances)] per frame"""
+    rgb_frames = [
+        cv2.cvtColor(cv2.resize(frame, (0, 0), fx=0.25, fy=0.25), cv2.COLOR_BGR2RGB)
+        for frame in frames
+    ]
+    fr = face_recognition()
+    if model == "cnn":
+        batch_locations = fr.batch_face_locations(
+            rgb_frames, number_of_times_to_upsample=0, batch_size=len(rgb_frames)
+        )
+    else:
+        batch_locations = [fr.face_locations(rgb) for rgb in rgb_frames]
+
+    encodings, owners = [], []
+    for i, (rgb, locations) in enumerate(zip(rgb_frames, batch_locations)):
+        for encoding in fr.face_encodings(rgb, locations):
+            encodings.append(encoding)
+            owners.append(i)
+
+    results = [([], []) for _ in frames]
+    if encodings:
+        names, distances = gallery.match(encodings, FACE_RECOGNITION_TOLERANCE)
+        for i, name, distance in zip(owners, names, distances):
+            if name is not None:
+                results[i][0].append(name)
+                results[i][1].append(distance)
+    return results
+
+
+def process_source(args):
+    """Worker entry: ingest one video or image folder and return (source, events, frames, seconds)"""
+    source, stride, batch_size, model, start = args
+    started = time.perf_counter()
+    if os.path.isdir(source):
+        frames = iter_image_frames(source, stride)
+    else:
+        frames = iter_video_frames(source, stride, start)
+
+    voter = AttendanceVoter(min_votes=MIN_REQUIRED_FRAMES)
+    events = []
+    frame_count = 0
+
+    for batch in iter_batches(frames, batch_size):
+        frame_count += len(batch)
+        results = recognize_batch([frame for _, _, frame in batch], _gallery, model)
+        for (timestamp, position, _), (names, distances) in zip(batch, results):
+            for name, distance in zip(names, distances):
+                event = voter.vote(name, timestamp, distance)
+                if event is None:
+                    continue
+                votes, best_distance = event
+                events.append({
+                    "source": source,
+                    "name": name,
+                    "timestamp": timestamp.isoformat(timespec="seconds"),
+                    "position_seconds": round(position, 2),
+                    "votes": votes,
+                    "best_distance": round(best_distance, 4),
+                })
+
+    return source, events, frame_count, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Take attendance from recorded video or image folders")
+    parser.add_argument("sources", nargs="+", help="Video files or directories of images")
+    parser.add_argument("--stride", type=int, default=DEFAULT_STRIDE, help="Process every Nth frame")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--model", choices=["hog", "cnn"], default="hog",
+                        help="cnn uses dlib's batched detector (only worthwhile with CUDA)")
+    parser.add_argument("--start", type=datetime.fromisoformat,
+                        help="Wall-clock time of the first video frame (default: file mtime minus duration)")
+    parser.add_argument("--output", help="CSV file for attendance events (default: stdout)")
+    parser.add_argument("--mark", action="store_true", help="Also write events to the attendance database")
+    args = parser.parse_args(argv)
+
+    known_faces, known_names = load_known_faces()
+    if len(known_faces) == 0:
+        print("No registered faces found. Please register students first.", file=sys.stderr)
+        return 1
+
+    jobs = [(source, max(1, args.stride), max(1, args.batch_size), args.model, args.start)
+            for source in args.sources]
+    all_events = []
+    total_frames = 0
+    started = time.perf_counter()
+
+    with Pool(min(args.workers, len(jobs)), _init_worker, (known_faces, known_names)) as pool:
+        for source, events, frames, seconds in pool.imap_unordered(process_source, jobs):
+            total_frames += frames
+            all_events.extend(events)
+            print(f"{source}: {frames} frames in {seconds:.1f}s "
+                  f"({frames / max(seconds, 1e-9):.1f} frames/s), {len(events)} events", file=sys.stderr)
+
+    elapsed = time.perf_counter() - started
+    print(f"Total: {total_frames} frames in {elapsed:.1f}s "
+          f"({total_frames / max(elapsed, 1e-9):.1f} frames/s)", file=sys.stderr)
+
+    all_events.sort(key=lambda e: e["timestamp"])
+    out = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        writer = csv.DictWriter(out, fieldnames=EVENT_FIELDS)
+        writer.writeheader()
+        writer.writerows(all_events)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    if args.mark:
+        writer = AttendanceWriter(get_db_connection, save_attendance_event, transient_errors=DB_ERRORS).start()
+        for event in all_events:
+            writer.submit(event["name"], datetime.fromisoformat(event["timestamp"]))
+        writer.close(timeout=None)
+        print(f"Database: {writer.stats}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
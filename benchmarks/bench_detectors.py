@@ -0,0 +1,158 @@
+# benchmarks/bench_detectors.py
+"""Detection speed and recall of each face detector backend on a labelled image set.
+
+The image set is a folder of photos plus a CSV with one row per face:
+
+    file,top,right,bottom,left
+    class_a/0001.jpg,120,340,260,200
+    class_a/0002.jpg,,,,            <- an image without faces
+
+Boxes are in full-resolution pixels. Images are detected at --scale (0.25,
+like the live loop) and the boxes mapped back before scoring. A detection
+matches a labelled face when their IoU is at least --iou. Run from the
+repository root:
+
+    python -m benchmarks.bench_detectors --images faces/ --labels faces/labels.csv
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+import cv2
+
+from benchmarks.suite import log, summarize
+from detectors import DETECTORS, create_detector
+
+DEFAULT_SCALE = 0.25
+DEFAULT_IOU = 0.5
+
+
+def read_labels(path):
+    """{file: [(top, right, bottom, left)]} from the labels CSV"""
+    labels = {}
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            boxes = labels.setdefault(row["file"], [])
+            if row.get("top"):
+                boxes.append(tuple(int(float(row[k])) for k in ("top", "right", "bottom", "left")))
+    return labels
+
+
+def iou(a, b):
+    top, right = max(a[0], b[0]), min(a[1], b[1])
+    bottom, left = min(a[2], b[2]), max(a[3], b[3])
+    inter = max(0, right - left) * max(0, bottom - top)
+    area = lambda box: (box[1] - box[3]) * (box[2] - box[0])
+    union = area(a) + area(b) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def count_matches(detected, truth, threshold):
+    """Greedy one-to-one matching by IoU; returns the number of labelled faces found"""
+    pairs = sorted(
+        ((iou(d, t), i, j) for i, d in enumerate(detected) for j, t in enumerate(truth)),
+        reverse=True,
+    )
+    used_d, used_t = set(), set()
+    for overlap, i, j in pairs:
+        if overlap < threshold:
+            break
+        if i not in used_d and j not in used_t:
+            used_d.add(i)
+            used_t.add(j)
+    return len(used_t)
+
+
+def load_images(images_dir, labels, scale):
+    """[(file, rgb at scale, labelled boxes)], skipping unreadable files"""
+    images = []
+    for name, boxes in labels.items():
+        image = cv2.imread(os.path.join(images_dir, name))
+        if image is None:
+            log(f"Cannot read {name}, skipped")
+            continue
+        small = cv2.resize(image, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        images.append((name, cv2.cvtColor(small, cv2.COLOR_BGR2RGB), boxes))
+    return images
+
+
+def bench_detector(detector, images, scale, threshold, repeat):
+    """Time every image ``repeat`` times and score the detections of the first pass"""
+    detector.detect(images[0][1])  # Load the model outside the timings
+    samples = []
+    found = labelled = detections = 0
+    for run in range(repeat):
+        for _, rgb, truth in images:
+            start = time.perf_counter()
+            boxes = detector.detect(rgb)
+            samples.append((time.perf_counter() - start) * 1000)
+            if run:
+                continue
+            boxes = [tuple(round(v / scale) for v in box) for box in boxes]
+            found += count_matches(boxes, truth, threshold)
+            labelled += len(truth)
+            detections += len(boxes)
+    stats = summarize(samples)
+    return {
+        "fps": 1000.0 / stats["mean_ms"],
+        "recall": found / labelled if labelled else None,
+        "precision": found / detections if detections else None,
+        "false_positives": detections - found,
+        "latency": stats,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", required=True, help="Folder the label file names are relative to")
+    parser.add_argument("--labels", required=True, help="CSV of file,top,right,bottom,left")
+    parser.add_argument("--detectors", nargs="+", choices=list(DETECTORS), default=list(DETECTORS))
+    parser.add_argument("--scale", type=float, default=DEFAULT_SCALE, help="Detection scale, as in the live loop")
+    parser.add_argument("--iou", type=float, default=DEFAULT_IOU, help="Overlap counted as a correct detection")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes over the image set")
+    parser.add_argument("--output", help="Write the JSON results here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    images = load_images(args.images, read_labels(args.labels), args.scale)
+    if not images:
+        log("No labelled images could be read")
+        return 1
+
+    results, skipped = {}, {}
+    for name in args.detectors:
+        try:
+            detector = create_detector(name)
+            results[name] = bench_detector(detector, images, args.scale, args.iou, args.repeat)
+        except (ImportError, ValueError, FileNotFoundError, cv2.error) as e:
+            skipped[name] = str(e)
+            log(f"{name}: skipped ({e})")
+            continue
+        r = results[name]
+        recall = "n/a" if r["recall"] is None else f"{r['recall']:.1%}"
+        log(f"{name:>6}: {r['fps']:7.1f} images/s, recall {recall}, {r['false_positives']} false positives")
+
+    report = {
+        "meta": {
+            "images": len(images),
+            "faces": sum(len(boxes) for _, _, boxes in images),
+            "scale": args.scale,
+            "iou": args.iou,
+            "opencv": cv2.__version__,
+        },
+        "results": results,
+        "skipped": skipped,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
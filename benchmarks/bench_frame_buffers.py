@@ -0,0 +1,140 @@
+# benchmarks/bench_frame_buffers.py
+"""Per-frame allocations and latency: allocating path vs. FrameContext buffers.
+
+Times the parts of recognize_faces that this repo controls (resize, color
+convert, box mapping, encoding matrix, gallery match) on synthetic 640x480
+frames, once the way they were written before FrameContext (new arrays,
+tuples and lists every frame) and once through a FrameContext. Detection
+and encoding are left out: their cost is the same either way. Allocations
+are measured with tracemalloc, which sees NumPy and OpenCV output arrays.
+Run from the repository root:
+
+    python -m benchmarks.bench_frame_buffers [--frames 200] [--faces 4]
+"""
+import argparse
+import json
+import sys
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from benchmarks.bench_gallery import synthetic_gallery, synthetic_queries
+from benchmarks.suite import FRAME_SIZE, log, measure
+from frame_context import FrameContext, face_boxes, map_boxes
+from gallery import build_gallery
+
+SCALE = 0.25
+TOLERANCE = 0.4
+
+
+def synthetic_frames(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 256, size=FRAME_SIZE + (3,), dtype=np.uint8) for _ in range(count)]
+
+
+def synthetic_boxes(faces):
+    """Detector-style list of (top, right, bottom, left) tuples at quarter scale"""
+    return [(10 + 20 * i, 40 + 20 * i, 40 + 20 * i, 10 + 20 * i) for i in range(faces)]
+
+
+def allocating_frame(frame, locations, encodings, gallery, scale, x0, y0):
+    """The per-frame work as it was written without reusable buffers"""
+    small = cv2.resize(frame, (0, 0), fx=scale, fy=scale)
+    rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+    observed = [
+        (y0 + top / scale, x0 + right / scale, y0 + bottom / scale, x0 + left / scale)
+        for top, right, bottom, left in locations
+    ]
+    boxes = [
+        (round((y0 + top / scale) / 4), round((x0 + right / scale) / 4),
+         round((y0 + bottom / scale) / 4), round((x0 + left / scale) / 4))
+        for top, right, bottom, left in locations
+    ]
+    names, distances = gallery.match(list(encodings), TOLERANCE)
+    return rgb, observed, boxes, names, distances
+
+
+def buffered_frame(context, frame, locations, encodings, gallery, scale, x0, y0):
+    """The same work through a FrameContext, as recognize_faces does it"""
+    rgb = context.to_rgb(context.resize(frame, scale))
+    boxes = face_boxes(locations)
+    observed = map_boxes(boxes, scale, x0, y0, out_scale=1.0, rounded=False)
+    boxes = map_boxes(boxes, scale, x0, y0)
+    names, distances = gallery.match(context.encodings(list(encodings)), TOLERANCE)
+    return rgb, observed, boxes, names, distances
+
+
+def allocation_stats(fn, frames):
+    """Peak bytes and new memory blocks per ``fn(i)`` call, measured with tracemalloc"""
+    fn(0)
+    tracemalloc.start()
+    peak_bytes = blocks = 0
+    for i in range(frames):
+        before = tracemalloc.take_snapshot()
+        start, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = fn(i)
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        peak_bytes += peak - start
+        blocks += sum(max(0, stat.count_diff) for stat in after.compare_to(before, "lineno"))
+        del result
+    tracemalloc.stop()
+    return {"peak_bytes_per_frame": peak_bytes / frames, "blocks_per_frame": blocks / frames}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--faces", type=int, default=4, help="Faces per frame")
+    parser.add_argument("--gallery-size", type=int, default=1000)
+    parser.add_argument("--crop", action="store_true", help="Use motion-style crops of varying size")
+    parser.add_argument("--output", help="Write the JSON results here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    frames = synthetic_frames(8)
+    encodings_matrix = synthetic_gallery(args.gallery_size)
+    gallery = build_gallery(encodings_matrix, [f"student_{i}" for i in range(args.gallery_size)])
+    queries, _ = synthetic_queries(encodings_matrix, args.faces)
+    encodings = [q for q in queries]  # face_recognition returns a list of arrays
+    locations = synthetic_boxes(args.faces)
+
+    def inputs(i):
+        frame = frames[i % len(frames)]
+        if not args.crop:
+            return frame, 0, 0
+        x0, y0 = 8 * (i % 10), 4 * (i % 7)
+        return frame[y0:y0 + 320 + 8 * (i % 5), x0:x0 + 400], x0, y0
+
+    def allocating(i):
+        frame, x0, y0 = inputs(i)
+        return allocating_frame(frame, locations, encodings, gallery, SCALE, x0, y0)
+
+    context = FrameContext()
+
+    def buffered(i):
+        frame, x0, y0 = inputs(i)
+        return buffered_frame(context, frame, locations, encodings, gallery, SCALE, x0, y0)
+
+    results = {}
+    for name, fn in (("allocating", allocating), ("frame_context", buffered)):
+        results[name] = {"latency": measure(fn, args.frames, warmup=5)}
+        results[name].update(allocation_stats(fn, min(args.frames, 50)))
+        log(f"{name:>14}: p50 {results[name]['latency']['p50_ms']:.3f} ms, "
+            f"{results[name]['peak_bytes_per_frame'] / 1024:.1f} KiB peak, "
+            f"{results[name]['blocks_per_frame']:.0f} new blocks per frame")
+    results["frame_context"]["buffer_growths"] = context.allocations
+
+    text = json.dumps({"meta": {"frames": args.frames, "faces": args.faces, "crop": args.crop,
+                                "gallery_size": args.gallery_size}, "results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+# benchmarks/bench_gallery.py
+"""Per-frame match latency against gallery size.
+
+Run from the repository root:  python -m benchmarks.bench_gallery
+"""
+import argparse
+import time
+import numpy as np
+from face_cache import ENCODING_DIM
+from gallery import Gallery, IVFIndex
+
+FACES_PER_FRAME = 4
+QUERY_NOISE = 0.02  # Per-dimension noise giving same-person distances around 0.2-0.3
+
+
+def synthetic_gallery(size, seed=0):
+    """Random encodings with roughly the scale of dlib's 128-d embeddings"""
+    rng = np.random.default_rng(seed)
+    return rng.normal(0.0, 0.09, size=(size, ENCODING_DIM))
+
+
+def synthetic_queries(encodings, count, seed=1):
+    rng = np.random.default_rng(seed)
+    truth = rng.choice(len(encodings), count, replace=False)
+    queries = encodings[truth] + rng.normal(0.0, QUERY_NOISE, size=(count, ENCODING_DIM))
+    return queries, truth
+
+
+def time_per_frame(fn, frames, repeat):
+    fn(frames[0])
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for frame in frames:
+            fn(frame)
+    return (time.perf_counter() - start) / (repeat * len(frames)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000, 100000])
+    parser.add_argument("--frames", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'gallery':>8} {'per-face scan ms':>17} {'exact ms':>9} {'ivf ms':>8} {'ivf recall':>11} {'ivf build s':>12}")
+    for size in args.sizes:
+        encodings = synthetic_gallery(size)
+        n_queries = min(size, args.frames * FACES_PER_FRAME)
+        queries, truth = synthetic_queries(encodings, n_queries)
+        frames = [queries[i:i + FACES_PER_FRAME] for i in range(0, n_queries, FACES_PER_FRAME)]
+        names = [str(i) for i in range(size)]
+
+        # Baseline: what face_recognition.face_distance does, once per detected face
+        known_list = list(encodings)
+        def per_face_scan(frame):
+            for q in frame:
+                np.argmin(np.linalg.norm(np.asarray(known_list) - q, axis=1))
+
+        exact = Gallery(encodings, names)
+        build_start = time.perf_counter()
+        ivf = Gallery(encodings, names, index=IVFIndex())
+        build_s = time.perf_counter() - build_start
+
+        baseline_ms = time_per_frame(per_face_scan, frames, 1)
+        exact_ms = time_per_frame(exact.search, frames, args.repeat)
+        ivf_ms = time_per_frame(ivf.search, frames, args.repeat)
+        found, _ = ivf.search(queries, 1)
+        recall = float(np.mean(found[:, 0] == truth))
+
+        print(f"{size:>8} {baseline_ms:>17.3f} {exact_ms:>9.3f} {ivf_ms:>8.3f} {recall:>11.3f} {build_s:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# benchmarks/bench_quantized_gallery.py
+"""Memory, match latency and decision agreement of quantized galleries.
+
+For each gallery size the synthetic encodings are written to a float32
+.npy file and memory-mapped, as FaceEncodingCache.float32_matrix does, and
+matched four faces at a time through:
+
+    list_float64  one float64 array per person, as load_known_faces used to
+                  return them, scanned per face like face_recognition.face_distance
+    float32       the default Gallery (matrix copied into memory)
+    float16/int8  QuantizedIndex over the memory-mapped rows
+
+Memory is what a build leaves allocated per identity (tracemalloc; mapped
+file pages are not counted). Agreement compares the quantized match
+decisions with the float32 Gallery at FACE_RECOGNITION_TOLERANCE, on
+queries whose true distances are spread around the tolerance plus
+impostors. Run from the repository root:
+
+    python -m benchmarks.bench_quantized_gallery [--sizes 1000 10000 100000]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.bench_gallery import FACES_PER_FRAME, synthetic_gallery
+from benchmarks.suite import log, measure
+from face_cache import ENCODING_DIM
+from gallery import Gallery, QuantizedIndex
+from take_attendace import FACE_RECOGNITION_TOLERANCE
+
+PRECISIONS = ["float16", "int8"]
+
+
+def boundary_queries(encodings, count, seed=1):
+    """Genuine queries at distances of roughly 0.1-0.7 from their row, plus 25% impostors"""
+    rng = np.random.default_rng(seed)
+    genuine = count - count // 4
+    truth = rng.choice(len(encodings), genuine, replace=False)
+    noise = rng.uniform(0.1, 0.7, size=(genuine, 1)) / np.sqrt(ENCODING_DIM)
+    queries = encodings[truth] + rng.normal(0.0, 1.0, size=(genuine, ENCODING_DIM)) * noise
+    impostors = rng.normal(0.0, 0.09, size=(count - genuine, ENCODING_DIM))
+    return np.vstack([queries, impostors]).astype(np.float32)
+
+
+def retained_bytes(build):
+    """(object, bytes still allocated after ``build()`` returns it)"""
+    tracemalloc.start()
+    try:
+        result = build()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current
+
+
+def list_match(known, frame, tolerance):
+    """Per-face scan over a list of arrays, the way the original loop matched"""
+    names, best = [], []
+    for q in frame:
+        distances = np.linalg.norm(np.asarray(known) - q, axis=1)
+        i = int(np.argmin(distances))
+        names.append(i if distances[i] < tolerance else None)
+        best.append(float(distances[i]))
+    return names, best
+
+
+def decisions(gallery, queries, tolerance):
+    names, distances = gallery.match(queries, tolerance)
+    return names, np.asarray(distances)
+
+
+def bench_size(size, args, workdir):
+    encodings = synthetic_gallery(size)
+    path = os.path.join(workdir, f"gallery_{size}.npy")
+    np.save(path, encodings.astype(np.float32))
+    mapped = np.load(path, mmap_mode="r")
+    names = [str(i) for i in range(size)]
+    queries = boundary_queries(encodings, min(size, args.queries))
+    frames = [queries[i:i + FACES_PER_FRAME] for i in range(0, len(queries), FACES_PER_FRAME)]
+    tolerance = FACE_RECOGNITION_TOLERANCE
+
+    results = {}
+    if size <= args.max_list_size:
+        known, nbytes = retained_bytes(lambda: [np.array(row) for row in encodings])
+        results["list_float64"] = {
+            "bytes_per_identity": nbytes / size,
+            "match": measure(lambda i: list_match(known, frames[i % len(frames)], tolerance),
+                             max(1, args.repeat // 10)),
+        }
+        del known
+
+    exact, nbytes = retained_bytes(lambda: Gallery(encodings, names))
+    results["float32"] = {
+        "bytes_per_identity": nbytes / size,
+        "match": measure(lambda i: exact.match(frames[i % len(frames)], tolerance), args.repeat),
+    }
+    exact_names, exact_distances = decisions(exact, queries, tolerance)
+
+    for precision in PRECISIONS:
+        gallery, nbytes = retained_bytes(
+            lambda: Gallery(mapped, names, index=QuantizedIndex(precision, shortlist=args.shortlist))
+        )
+        quantized_names, quantized_distances = decisions(gallery, queries, tolerance)
+        agree = [a == b for a, b in zip(exact_names, quantized_names)]
+        results[precision] = {
+            "bytes_per_identity": nbytes / size,
+            "match": measure(lambda i: gallery.match(frames[i % len(frames)], tolerance), args.repeat),
+            "decision_agreement": float(np.mean(agree)),
+            "decisions_changed": int(len(agree) - sum(agree)),
+            "max_distance_error": float(np.max(np.abs(quantized_distances - exact_distances))),
+        }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=2000, help="Queries checked for agreement")
+    parser.add_argument("--repeat", type=int, default=100, help="Timed frames per case")
+    parser.add_argument("--shortlist", type=int, default=QuantizedIndex().shortlist)
+    parser.add_argument("--max-list-size", type=int, default=10000,
+                        help="Largest gallery timed with the per-face list scan (it is slow)")
+    parser.add_argument("--output", help="Write the JSON results here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            results[size] = bench_size(size, args, workdir)
+            for name, r in results[size].items():
+                extra = ""
+                if "decision_agreement" in r:
+                    extra = f", agreement {r['decision_agreement']:.4f} ({r['decisions_changed']} changed)"
+                log(f"{size:>7} {name:>12}: {r['bytes_per_identity']:7.0f} B/identity, "
+                    f"p50 {r['match']['p50_ms']:8.3f} ms per frame{extra}")
+
+    text = json.dumps({"meta": {"tolerance": FACE_RECOGNITION_TOLERANCE, "shortlist": args.shortlist,
+                                "faces_per_frame": FACES_PER_FRAME, "queries": args.queries},
+                       "results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+# benchmarks/bench_startup.py
+"""Cold import time and memory of each entry point, in fresh interpreters.
+
+Every sample starts a new Python process, imports one module and reports
+the wall time of the import, the process RSS afterwards and which heavy
+libraries the import pulled in. "models" times face_models.warm_up(), the
+cost the attendance entry points pay on their first frame. Run from the
+repository root:
+
+    python -m benchmarks.bench_startup [--repeat 5] [--output startup.json]
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+from benchmarks.suite import log, summarize
+
+ENTRY_POINTS = [
+    "manage_students3",  # Admin app
+    "take_attendace",  # Attendance app
+    "attendance_service",
+    "batch_ingest",
+    "time_utils",  # Core modules the admin app is built from
+    "db_config2",
+    "report_export",
+    "enrollment",
+]
+HEAVY_MODULES = ["face_recognition", "dlib", "cv2", "playsound", "docx", "openpyxl", "pandas", "streamlit"]
+
+CHILD = """
+import json, sys, time
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+before = rss_mb()
+start = time.perf_counter()
+target = sys.argv[1]
+if target == "models":
+    from face_models import warm_up
+    warm_up()
+else:
+    __import__(target)
+seconds = time.perf_counter() - start
+print(json.dumps({"ms": seconds * 1000, "rss_mb": rss_mb(), "baseline_rss_mb": before,
+                  "loaded": [m for m in json.loads(sys.argv[2]) if m in sys.modules]}))
+"""
+
+
+def sample(target):
+    """One fresh-process measurement; returns (result, None) or (None, error)"""
+    proc = subprocess.run(
+        [sys.executable, "-c", CHILD, target, json.dumps(HEAVY_MODULES)],
+        capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        lines = proc.stderr.strip().splitlines()
+        return None, lines[-1] if lines else f"exit code {proc.returncode}"
+    return json.loads(proc.stdout.strip().splitlines()[-1]), None
+
+
+def bench_target(target, repeat):
+    samples = []
+    for _ in range(repeat):
+        result, error = sample(target)
+        if error:
+            return None, error
+        samples.append(result)
+    return {
+        "import": summarize([s["ms"] for s in samples]),
+        "rss_mb": max(s["rss_mb"] for s in samples),
+        "rss_added_mb": max(s["rss_mb"] - s["baseline_rss_mb"] for s in samples),
+        "loaded": samples[-1]["loaded"],
+    }, None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--targets", nargs="+", default=ENTRY_POINTS + ["models"])
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh processes per target")
+    parser.add_argument("--output", help="Write the JSON results here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    results, skipped = {}, {}
+    for target in args.targets:
+        result, error = bench_target(target, args.repeat)
+        if error:
+            skipped[target] = error
+            log(f"{target}: skipped ({error})")
+            continue
+        results[target] = result
+        log(f"{target:>20}: {result['import']['p50_ms']:7.0f} ms, {result['rss_mb']:6.0f} MB RSS, "
+            f"loads {', '.join(result['loaded']) or 'none of the heavy modules'}")
+
+    text = json.dumps({"meta": {"python": sys.version.split()[0], "repeat": args.repeat},
+                       "results": results, "skipped": skipped}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
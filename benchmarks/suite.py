@@ -0,0 +1,368 @@
+# benchmarks/suite.py
+"""Benchmark suite for the recognition and attendance hot paths, with JSON output.
+
+Runs without a camera or MySQL: galleries and frames are synthetic (or
+recorded frames from --frames-dir) and the database is a throwaway SQLite
+file. Run from the repository root:
+
+    python -m benchmarks.suite --output bench.json
+    python -m benchmarks.suite --baseline bench.json   # exit 1 on regression
+
+Cases that need face_recognition (detect/encode, and load_known_faces /
+save_attendance_to_db through take_attendace) are reported under
+"skipped" when it is not installed; the cache, matching and database
+paths they wrap are still timed.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import cv2
+import numpy as np
+
+from benchmarks.bench_gallery import FACES_PER_FRAME, synthetic_gallery, synthetic_queries
+
+DEFAULT_GALLERY_SIZES = [10, 100, 1000, 10000, 100000]
+DEFAULT_LOAD_SIZES = [10, 1000, 10000]
+FRAME_SIZE = (480, 640)  # Height, width of synthetic frames, like a 640x480 webcam
+DEFAULT_THRESHOLD = 0.15  # p50 slowdown (fraction) reported as a regression
+DB_STUDENTS = 200
+DB_DAYS = 30
+PERCENTILES = (50, 90, 99)
+
+
+def summarize(samples_ms):
+    samples = np.asarray(samples_ms, dtype=np.float64)
+    stats = {"n": int(samples.size), "mean_ms": float(samples.mean())}
+    for p in PERCENTILES:
+        stats[f"p{p}_ms"] = float(np.percentile(samples, p))
+    stats["min_ms"] = float(samples.min())
+    stats["max_ms"] = float(samples.max())
+    return stats
+
+
+def measure(fn, repeat, warmup=1):
+    """Call ``fn(i)`` ``repeat`` times after ``warmup`` calls; returns per-call stats"""
+    for i in range(warmup):
+        fn(i)
+    samples = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn(warmup + i)
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def log(message):
+    print(message, file=sys.stderr)
+
+
+def try_import_take_attendace():
+    """Return (module, None) or (None, reason) if the vision stack is missing"""
+    try:
+        import take_attendace
+        return take_attendace, None
+    except ImportError as e:
+        return None, f"take_attendace not importable: {e}"
+
+
+# Cases: each returns (results, skipped) dicts keyed by case name
+
+def bench_gallery_match(args):
+    from gallery import build_gallery
+    results = {}
+    for size in args.gallery_sizes:
+        encodings = synthetic_gallery(size)
+        n_queries = min(size, args.repeat * FACES_PER_FRAME)
+        queries, _ = synthetic_queries(encodings, n_queries)
+        frames = [queries[i:i + FACES_PER_FRAME] for i in range(0, n_queries, FACES_PER_FRAME)]
+        gallery = build_gallery(encodings, [str(i) for i in range(size)])
+        results[f"match.gallery_{size}"] = measure(
+            lambda i: gallery.match(frames[i % len(frames)], 0.4), args.repeat
+        )
+    return results, {}
+
+
+def _synthetic_faces_dir(root, size):
+    """A folder of ``size`` tiny image files plus an encoder that returns fixed random encodings"""
+    faces_dir = os.path.join(root, f"faces_{size}")
+    os.makedirs(faces_dir, exist_ok=True)
+    for i in range(size):
+        with open(os.path.join(faces_dir, f"student_{i:06d}.jpg"), "wb") as f:
+            f.write(b"synthetic-%d" % i)
+    encodings = synthetic_gallery(size)
+
+    def encode(path):
+        index = int(os.path.basename(path)[8:14])
+        return encodings[index]
+    return faces_dir, encode
+
+
+def bench_load_known_faces(args):
+    from face_cache import FaceEncodingCache
+    take_attendace, reason = try_import_take_attendace()
+    results = {}
+    for size in args.load_sizes:
+        faces_dir, encode = _synthetic_faces_dir(args.workdir, size)
+        extensions = {".jpg"}
+
+        # Cold: every file is hashed and encoded once (with a free encoder)
+        def cold(i):
+            cache = FaceEncodingCache(faces_dir, extensions)
+            cache.clear()
+            cache.sync(encode)
+        results[f"load.cold_cache_{size}"] = measure(cold, max(1, args.repeat // 10), warmup=0)
+
+        # Warm: what a kiosk restart costs once the cache exists
+        if take_attendace is not None:
+            take_attendace.KNOWN_FACES_DIR = faces_dir
+            take_attendace.ALLOWED_EXTENSIONS = extensions
+            warm = lambda i: take_attendace.load_known_faces()
+            name = f"load_known_faces.warm_{size}"
+        else:
+            warm = lambda i: FaceEncodingCache(faces_dir, extensions).sync(encode)
+            name = f"load.warm_cache_{size}"
+        results[name] = measure(warm, args.repeat)
+    return results, {} if take_attendace else {"load_known_faces": reason}
+
+
+def load_frames(frames_dir, count):
+    """Recorded frames from a folder, or synthetic frames with registered faces pasted in"""
+    if frames_dir:
+        files = sorted(f for f in os.listdir(frames_dir) if f.lower().endswith((".jpg", ".jpeg", ".png")))
+        frames = [cv2.imread(os.path.join(frames_dir, f)) for f in files[:count]]
+        return [f for f in frames if f is not None]
+
+    rng = np.random.default_rng(0)
+    faces = []
+    if os.path.isdir("known_faces"):
+        for filename in sorted(os.listdir("known_faces"))[:4]:
+            image = cv2.imread(os.path.join("known_faces", filename))
+            if image is not None:
+                faces.append(cv2.resize(image, (200, 240)))
+    frames = []
+    for i in range(count):
+        frame = rng.integers(0, 255, size=FRAME_SIZE + (3,), dtype=np.uint8)
+        if faces:
+            face = faces[i % len(faces)]
+            frame[120:360, 220:420] = face
+        frames.append(frame)
+    return frames
+
+
+def bench_process_frame(args):
+    from gallery import build_gallery
+    frames = load_frames(args.frames_dir, args.frame_count)
+    if not frames:
+        return {}, {"process_frame": "no frames"}
+
+    small = [cv2.resize(f, (0, 0), fx=0.25, fy=0.25) for f in frames]
+    rgb = [cv2.cvtColor(s, cv2.COLOR_BGR2RGB) for s in small]
+    results = {
+        "process_frame.resize": measure(
+            lambda i: cv2.resize(frames[i % len(frames)], (0, 0), fx=0.25, fy=0.25), args.repeat),
+        "process_frame.color_convert": measure(
+            lambda i: cv2.cvtColor(small[i % len(small)], cv2.COLOR_BGR2RGB), args.repeat),
+    }
+
+    encodings = synthetic_gallery(args.match_gallery_size)
+    gallery = build_gallery(encodings, [str(i) for i in range(len(encodings))])
+    queries, _ = synthetic_queries(encodings, min(len(encodings), FACES_PER_FRAME))
+    results[f"process_frame.match_{args.match_gallery_size}"] = measure(
+        lambda i: gallery.match(queries, 0.4), args.repeat)
+
+    try:
+        import face_recognition
+    except ImportError as e:
+        return results, {"process_frame.detect": str(e), "process_frame.encode": str(e)}
+
+    locations = [face_recognition.face_locations(image) for image in rgb]
+    results["process_frame.detect"] = measure(
+        lambda i: face_recognition.face_locations(rgb[i % len(rgb)]), args.repeat)
+    results["process_frame.encode"] = measure(
+        lambda i: face_recognition.face_encodings(rgb[i % len(rgb)], locations[i % len(rgb)]),
+        args.repeat)
+    results["process_frame.faces_per_frame"] = summarize([len(l) for l in locations])
+    return results, {}
+
+
+def bench_motion_gate(args):
+    from motion import MotionGate
+    frames = load_frames(args.frames_dir, args.frame_count)
+    still = frames[0]
+    gate = MotionGate()
+    gate.plan(still)  # First frame initialises the background
+    results = {"motion.idle_frame": measure(lambda i: gate.plan(still), args.repeat)}
+
+    # Alternate between the still frame and one with a moving block
+    moved = still.copy()
+    moved[100:220, 200:320] = 255 - moved[100:220, 200:320]
+    results["motion.moving_frame"] = measure(
+        lambda i: gate.plan(moved if i % 2 else still), args.repeat)
+    return results, {}
+
+
+def _populate_database():
+    from db_config2 import get_db_connection, mark_attendance_session
+    connection = get_db_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.executemany("INSERT INTO userDetails (name) VALUES (%s)",
+                               [(f"student_{i}",) for i in range(DB_STUDENTS)])
+        start = datetime.combine(date.today() - timedelta(days=DB_DAYS), datetime.min.time())
+        for day in range(DB_DAYS):
+            for i in range(DB_STUDENTS):
+                t = start + timedelta(days=day, hours=9, seconds=i)
+                mark_attendance_session(connection, f"student_{i}", t)
+                mark_attendance_session(connection, f"student_{i}", t + timedelta(hours=3))
+    finally:
+        connection.close()
+
+
+def bench_save_attendance(args):
+    from db_config2 import get_db_connection, mark_attendance_session
+    take_attendace, reason = try_import_take_attendace()
+    today = datetime.combine(date.today(), datetime.min.time()) + timedelta(hours=8)
+
+    # Each call opens or closes a session: student i, at a time 11 minutes after its last mark
+    def event(i):
+        return f"student_{i % DB_STUDENTS}", today + timedelta(minutes=11 * (i // DB_STUDENTS))
+
+    results, skipped = {}, {}
+    if take_attendace is not None:
+        def save(i):
+            name, when = event(i)
+            take_attendace.save_attendance_to_db(name, when.strftime("%I:%M %p"), when.strftime("%Y-%m-%d"))
+        results["save_attendance_to_db.write"] = measure(save, args.repeat, warmup=0)
+        name, when = event(0)
+        results["save_attendance_to_db.too_soon"] = measure(
+            lambda i: take_attendace.save_attendance_to_db(
+                name, when.strftime("%I:%M %p"), when.strftime("%Y-%m-%d")),
+            args.repeat)
+    else:
+        skipped["save_attendance_to_db"] = reason
+
+    offset = args.repeat + 1  # Continue after the events above so every call is a real write
+
+    def mark(i):
+        name, when = event(offset * DB_STUDENTS + i)
+        connection = get_db_connection()
+        try:
+            mark_attendance_session(connection, name, when)
+        finally:
+            connection.close()
+    results["mark_attendance_session.write"] = measure(mark, args.repeat, warmup=0)
+    return results, skipped
+
+
+def bench_view_attendance(args):
+    import manage_students3
+    from report_export import format_time_columns, query_attendance_summary
+    start, end = date.today() - timedelta(days=DB_DAYS), date.today()
+    page = manage_students3.fetch_attendance_page(start, end, (), None, -1)
+    # A fresh ``version`` per call misses st.cache_data, timing the query itself
+    return {
+        "view.summary_query": measure(lambda i: query_attendance_summary(start, end), args.repeat),
+        "view.page_query": measure(
+            lambda i: manage_students3.fetch_attendance_page(start, end, (), None, i), args.repeat),
+        "view.format_page": measure(lambda i: format_time_columns(page), args.repeat),
+    }, {}
+
+
+CASES = {
+    "gallery": bench_gallery_match,
+    "load": bench_load_known_faces,
+    "frame": bench_process_frame,
+    "motion": bench_motion_gate,
+    "save": bench_save_attendance,
+    "view": bench_view_attendance,
+}
+
+
+def compare(results, baseline, threshold):
+    """Print p50 changes against a baseline run; returns the names of regressed cases"""
+    regressions = []
+    log(f"{'case':<40} {'base p50':>10} {'p50':>10} {'change':>8}")
+    for name, stats in sorted(results.items()):
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            log(f"{name:<40} {'-':>10} {stats['p50_ms']:>10.3f} {'new':>8}")
+            continue
+        change = stats["p50_ms"] / max(base["p50_ms"], 1e-9) - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        log(f"{name:<40} {base['p50_ms']:>10.3f} {stats['p50_ms']:>10.3f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES))
+    parser.add_argument("--gallery-sizes", type=int, nargs="+", default=DEFAULT_GALLERY_SIZES)
+    parser.add_argument("--load-sizes", type=int, nargs="+", default=DEFAULT_LOAD_SIZES)
+    parser.add_argument("--match-gallery-size", type=int, default=1000)
+    parser.add_argument("--frames-dir", help="Recorded frames to use instead of synthetic ones")
+    parser.add_argument("--frame-count", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50, help="Timed calls per case")
+    parser.add_argument("--output", help="Write the JSON results here (default: stdout)")
+    parser.add_argument("--baseline", help="Earlier JSON results to compare p50 latencies against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="attendance_bench_") as workdir:
+        args.workdir = workdir
+        # The database stand-in must be configured before db_config2 is imported
+        os.environ["ATTENDANCE_DB_BACKEND"] = "sqlite"
+        os.environ["ATTENDANCE_SQLITE_PATH"] = os.path.join(workdir, "bench.db")
+        if {"save", "view"} & set(args.cases):
+            log("Populating database...")
+            _populate_database()
+
+        results, skipped = {}, {}
+        for case in args.cases:
+            log(f"Running {case}...")
+            case_results, case_skipped = CASES[case](args)
+            results.update(case_results)
+            skipped.update(case_skipped)
+
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "repeat": args.repeat,
+        },
+        "results": results,
+        "skipped": skipped,
+    }
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    for name, reason in skipped.items():
+        log(f"skipped {name}: {reason}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            log(f"{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,6 +12,13 @@ DROP PROCEDURE IF EXISTS initialize_daily_attendance;
 -- Step 4: Drop the table if it exists
 DROP TABLE IF EXISTS attendance;
 
+-- Step 4b: Registered students (written by manage_students3.register_student)
+CREATE TABLE IF NOT EXISTS userDetails (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    UNIQUE KEY unique_name (name)
+);
+
 -- Step 5: Create a fresh attendance table
 CREATE TABLE attendance (
     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -1,29 +1,827 @@
 import streamlit as st
 import pymysql
-from pymysql.cursors import DictCursor
-from datetime import datetime
+from pymysql.cursors import DictCursor, SSDictCursor
+import logging
+import os
+import re
+import sqlite3
+import numpy as np
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 
-# Database Configuration
-def get_db_connection():
-    """Establish and return a connection to the database."""
-    try:
+# Database Configuration (override with environment variables)
+DB_BACKEND = os.environ.get("ATTENDANCE_DB_BACKEND", "mysql")  # "mysql" or "sqlite"
+DB_HOST = os.environ.get("ATTENDANCE_DB_HOST", "localhost")
+DB_PORT = int(os.environ.get("ATTENDANCE_DB_PORT", "3306"))
+DB_USER = os.environ.get("ATTENDANCE_DB_USER", "root")
+DB_PASSWORD = os.environ.get("ATTENDANCE_DB_PASSWORD", "nihal@22")
+DB_NAME = os.environ.get("ATTENDANCE_DB_NAME", "attendance_system")
+SQLITE_PATH = os.environ.get("ATTENDANCE_SQLITE_PATH", "attendance_system.db")
+
+# Pool Configuration
+POOL_MAX_SIZE = int(os.environ.get("ATTENDANCE_DB_POOL_SIZE", "8"))
+POOL_ACQUIRE_TIMEOUT = 10  # Seconds to wait for a free connection
+POOL_MAX_LIFETIME = 30 * 60  # Recycle connections older than this (seconds)
+POOL_HEALTH_CHECK_AFTER = 30  # Ping connections idle longer than this (seconds)
+
+SESSION_GAP_MINUTES = 10  # Minimum time between an in and out, and between sessions
+ROSTER_CHUNK_SIZE = 5000  # Students given their daily 'Absent' row per statement
+
+# Errors raised by any backend; catch this instead of pymysql.Error
+DB_ERRORS = (pymysql.Error, sqlite3.Error)
+
+logger = logging.getLogger(__name__)
+
+
+def _daily_columns(time_of, seconds):
+    """Select list of the attendance_daily view over ``a`` (attendance) and ``s`` (its sessions).
+
+    ``time_of(column)`` formats a DATETIME as 'HH:MM:SS'; ``seconds`` is the
+    length of session ``s`` in seconds. Used to aggregate a page of
+    attendance rows without materializing the whole view.
+    """
+    columns = ["a.name", "a.date"]
+    for n in range(1, 6):
+        columns += [
+            f"MAX(CASE WHEN s.session_no = {n} THEN {time_of('s.time_in')} END) AS entry{n}_in",
+            f"MAX(CASE WHEN s.session_no = {n} THEN {time_of('s.time_out')} END) AS entry{n}_out",
+            f"MAX(CASE WHEN s.session_no = {n} THEN SEC_TO_TIME({seconds}) END) AS entry{n}_hours",
+        ]
+    columns += [
+        f"CASE WHEN COUNT(s.time_out) > 0 THEN SEC_TO_TIME(SUM({seconds})) END AS total_hours",
+        "CASE WHEN COUNT(s.id) > 0 THEN 'Present' ELSE a.status END AS status",
+    ]
+    return ",\n    ".join(columns)
+
+
+class MySQLBackend:
+    """MySQL server through PyMySQL"""
+
+    name = "mysql"
+    # '%%' because PyMySQL applies the query parameters with the % operator
+    daily_columns = _daily_columns(
+        lambda column: f"TIME_FORMAT({column}, '%%H:%%i:%%s')",
+        "TIMESTAMPDIFF(SECOND, s.time_in, s.time_out)",
+    )
+
+    def connect(self):
         return pymysql.connect(
-            host="localhost",
-            user="root",
-            password="nihal@22",
-            database="attendance_system",
+            host=DB_HOST,
+            port=DB_PORT,
+            user=DB_USER,
+            password=DB_PASSWORD,
+            database=DB_NAME,
             charset="utf8mb4",
             cursorclass=DictCursor,
             autocommit=True
         )
-    except pymysql.Error as e:
-        st.error(f"Failed to connect to database: {e}")
+
+    def ping(self, raw):
+        raw.ping(reconnect=False)
+
+    def streaming_cursor(self, connection):
+        """Unbuffered cursor: rows are read from the socket as they are fetched"""
+        return connection.cursor(SSDictCursor)
+
+    def mark_session(self, connection, name, timestamp):
+        """One round trip: the stored procedure from migrations/001_attendance_sessions.sql"""
+        with connection.cursor() as cursor:
+            cursor.execute("CALL mark_attendance_session(%s, %s)", (name, timestamp))
+            row = cursor.fetchone()
+        return row["result"]
+
+    def after_fork(self):
+        pass
+
+
+def _parse_duration(value):
+    """Parse 'HH:MM:SS' (optionally negative) into a timedelta"""
+    if value is None:
+        return None
+    value = str(value)
+    sign = -1 if value.startswith("-") else 1
+    hours, minutes, seconds = value.lstrip("-").split(":")
+    return sign * timedelta(hours=int(hours), minutes=int(minutes), seconds=float(seconds))
+
+
+def _format_duration(delta):
+    total = int(delta.total_seconds())
+    sign = "-" if total < 0 else ""
+    total = abs(total)
+    return f"{sign}{total // 3600:02d}:{total % 3600 // 60:02d}:{total % 60:02d}"
+
+
+def _sql_timediff(a, b):
+    a, b = _parse_duration(a), _parse_duration(b)
+    return None if a is None or b is None else _format_duration(a - b)
+
+
+def _sql_addtime(a, b):
+    a, b = _parse_duration(a), _parse_duration(b)
+    return None if a is None or b is None else _format_duration(a + b)
+
+
+def _sql_sec_to_time(seconds):
+    return None if seconds is None else _format_duration(timedelta(seconds=int(seconds)))
+
+
+def _sql_unix_timestamp(value):
+    if value is None:
         return None
+    return int(datetime.strptime(str(value), "%Y-%m-%d %H:%M:%S").timestamp())
+
+
+_ON_DUPLICATE = re.compile(r"ON\s+DUPLICATE\s+KEY\s+UPDATE", re.IGNORECASE)
+_VALUES_REF = re.compile(r"VALUES\((\w+)\)", re.IGNORECASE)
+_INSERT_IGNORE = re.compile(r"INSERT\s+IGNORE\s+INTO", re.IGNORECASE)
+
+
+def _translate_mysql(query):
+    """Rewrite the MySQL dialect used by this app into SQLite"""
+    query = query.replace("%s", "?")
+    query = _INSERT_IGNORE.sub("INSERT OR IGNORE INTO", query)
+    match = _ON_DUPLICATE.search(query)
+    if match:
+        head, tail = query[:match.start()], query[match.end():]
+        query = head + "ON CONFLICT DO UPDATE SET" + _VALUES_REF.sub(r"excluded.\1", tail)
+    return query
+
+
+class SQLiteCursor:
+    """DB-API cursor with PyMySQL's DictCursor behaviour on top of sqlite3"""
+
+    def __init__(self, raw_cursor):
+        self._cursor = raw_cursor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def execute(self, query, args=None):
+        self._cursor.execute(_translate_mysql(query), tuple(args or ()))
+        return self._cursor.rowcount
+
+    def executemany(self, query, seq_of_args):
+        self._cursor.executemany(_translate_mysql(query), [tuple(a) for a in seq_of_args])
+        return self._cursor.rowcount
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def fetchmany(self, size=None):
+        return self._cursor.fetchmany(size or self._cursor.arraysize)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """sqlite3 connection exposing the subset of the PyMySQL API the app uses"""
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def cursor(self):
+        return SQLiteCursor(self._raw.cursor())
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def close(self):
+        self._raw.close()
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS userDetails (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS attendance (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    date TEXT NOT NULL,
+    entry1_in TEXT, entry1_out TEXT, entry1_hours TEXT,
+    entry2_in TEXT, entry2_out TEXT, entry2_hours TEXT,
+    entry3_in TEXT, entry3_out TEXT, entry3_hours TEXT,
+    entry4_in TEXT, entry4_out TEXT, entry4_hours TEXT,
+    entry5_in TEXT, entry5_out TEXT, entry5_hours TEXT,
+    total_hours TEXT,
+    status TEXT DEFAULT 'Absent',
+    UNIQUE (name, date)
+);
+
+CREATE TABLE IF NOT EXISTS attendance_sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    student_id INTEGER NOT NULL REFERENCES userDetails (id),
+    date TEXT NOT NULL,
+    session_no INTEGER NOT NULL,
+    time_in TEXT NOT NULL,
+    time_out TEXT,
+    UNIQUE (student_id, date, session_no)
+);
+
+CREATE INDEX IF NOT EXISTS idx_sessions_date ON attendance_sessions (date, student_id);
+
+CREATE VIEW IF NOT EXISTS attendance_daily AS
+SELECT
+    a.name,
+    a.date,
+    MAX(CASE WHEN s.session_no = 1 THEN strftime('%H:%M:%S', s.time_in) END) AS entry1_in,
+    MAX(CASE WHEN s.session_no = 1 THEN strftime('%H:%M:%S', s.time_out) END) AS entry1_out,
+    MAX(CASE WHEN s.session_no = 1 THEN SEC_TO_TIME(strftime('%s', s.time_out) - strftime('%s', s.time_in)) END) AS entry1_hours,
+    MAX(CASE WHEN s.session_no = 2 THEN strftime('%H:%M:%S', s.time_in) END) AS entry2_in,
+    MAX(CASE WHEN s.session_no = 2 THEN strftime('%H:%M:%S', s.time_out) END) AS entry2_out,
+    MAX(CASE WHEN s.session_no = 2 THEN SEC_TO_TIME(strftime('%s', s.time_out) - strftime('%s', s.time_in)) END) AS entry2_hours,
+    MAX(CASE WHEN s.session_no = 3 THEN strftime('%H:%M:%S', s.time_in) END) AS entry3_in,
+    MAX(CASE WHEN s.session_no = 3 THEN strftime('%H:%M:%S', s.time_out) END) AS entry3_out,
+    MAX(CASE WHEN s.session_no = 3 THEN SEC_TO_TIME(strftime('%s', s.time_out) - strftime('%s', s.time_in)) END) AS entry3_hours,
+    MAX(CASE WHEN s.session_no = 4 THEN strftime('%H:%M:%S', s.time_in) END) AS entry4_in,
+    MAX(CASE WHEN s.session_no = 4 THEN strftime('%H:%M:%S', s.time_out) END) AS entry4_out,
+    MAX(CASE WHEN s.session_no = 4 THEN SEC_TO_TIME(strftime('%s', s.time_out) - strftime('%s', s.time_in)) END) AS entry4_hours,
+    MAX(CASE WHEN s.session_no = 5 THEN strftime('%H:%M:%S', s.time_in) END) AS entry5_in,
+    MAX(CASE WHEN s.session_no = 5 THEN strftime('%H:%M:%S', s.time_out) END) AS entry5_out,
+    MAX(CASE WHEN s.session_no = 5 THEN SEC_TO_TIME(strftime('%s', s.time_out) - strftime('%s', s.time_in)) END) AS entry5_hours,
+    CASE WHEN COUNT(s.time_out) > 0
+         THEN SEC_TO_TIME(SUM(strftime('%s', s.time_out) - strftime('%s', s.time_in)))
+    END AS total_hours,
+    CASE WHEN COUNT(s.id) > 0 THEN 'Present' ELSE a.status END AS status
+FROM attendance a
+LEFT JOIN userDetails u ON u.name = a.name
+LEFT JOIN attendance_sessions s ON s.student_id = u.id AND s.date = a.date
+GROUP BY a.id, a.name, a.date, a.status;
+
+CREATE INDEX IF NOT EXISTS idx_attendance_date_name ON attendance (date, name, status);
+CREATE INDEX IF NOT EXISTS idx_attendance_keyset ON attendance (date DESC, name ASC, status);
+
+CREATE TABLE IF NOT EXISTS attendance_version (
+    id INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO attendance_version (id, version) VALUES (1, 0);
+
+-- The version is bumped once per write by bump_attendance_version; drop the
+-- per-row triggers older databases were created with.
+DROP TRIGGER IF EXISTS bump_version_on_session_insert;
+DROP TRIGGER IF EXISTS bump_version_on_session_update;
+DROP TRIGGER IF EXISTS bump_version_on_attendance_insert;
+DROP TRIGGER IF EXISTS bump_version_on_attendance_update;
+
+CREATE TABLE IF NOT EXISTS gallery_changes (
+    version INTEGER PRIMARY KEY AUTOINCREMENT,
+    op TEXT NOT NULL CHECK (op IN ('add', 'update', 'remove')),
+    name TEXT NOT NULL,
+    encoding BLOB,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS roster_days (
+    date TEXT PRIMARY KEY,
+    last_student_id INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS attendance_rollup_daily (
+    student_id INTEGER NOT NULL REFERENCES userDetails (id),
+    date TEXT NOT NULL,
+    sessions INTEGER NOT NULL,
+    total_seconds INTEGER NOT NULL,
+    first_in TEXT,
+    last_out TEXT,
+    PRIMARY KEY (student_id, date)
+);
+
+CREATE INDEX IF NOT EXISTS idx_rollup_daily_date ON attendance_rollup_daily (date);
+
+CREATE TABLE IF NOT EXISTS attendance_rollup_weekly (
+    student_id INTEGER NOT NULL REFERENCES userDetails (id),
+    week_start TEXT NOT NULL,
+    days_present INTEGER NOT NULL,
+    total_seconds INTEGER NOT NULL,
+    first_in TEXT,
+    last_out TEXT,
+    PRIMARY KEY (student_id, week_start)
+);
+
+CREATE INDEX IF NOT EXISTS idx_rollup_weekly_week ON attendance_rollup_weekly (week_start);
+
+-- One row per day with any session: the denominator of per-student attendance rates
+CREATE TABLE IF NOT EXISTS attendance_rollup_days (
+    date TEXT PRIMARY KEY
+);
+
+CREATE TRIGGER IF NOT EXISTS add_rollup_day_on_session_insert AFTER INSERT ON attendance_sessions
+BEGIN INSERT OR IGNORE INTO attendance_rollup_days (date) VALUES (NEW.date); END;
+
+CREATE TRIGGER IF NOT EXISTS move_rollup_day_on_session_update AFTER UPDATE OF date ON attendance_sessions
+BEGIN
+    INSERT OR IGNORE INTO attendance_rollup_days (date) VALUES (NEW.date);
+    DELETE FROM attendance_rollup_days
+    WHERE date = OLD.date AND NOT EXISTS (SELECT 1 FROM attendance_sessions WHERE date = OLD.date);
+END;
+
+CREATE TRIGGER IF NOT EXISTS drop_rollup_day_on_session_delete AFTER DELETE ON attendance_sessions
+BEGIN
+    DELETE FROM attendance_rollup_days
+    WHERE date = OLD.date AND NOT EXISTS (SELECT 1 FROM attendance_sessions WHERE date = OLD.date);
+END;
+
+CREATE TRIGGER IF NOT EXISTS update_status_on_entry
+AFTER UPDATE ON attendance
+FOR EACH ROW
+WHEN NEW.status <> 'Present' AND (
+    NEW.entry1_in IS NOT NULL OR NEW.entry2_in IS NOT NULL OR NEW.entry3_in IS NOT NULL
+    OR NEW.entry4_in IS NOT NULL OR NEW.entry5_in IS NOT NULL)
+BEGIN
+    UPDATE attendance SET status = 'Present' WHERE id = NEW.id;
+END;
+"""
+
+# Every session write re-aggregates that student's day (at most a few sessions)
+# and then that week (at most seven daily rows), so the rollups stay exact at
+# a constant cost per mark. Same logic as refresh_attendance_rollup in
+# migrations/005_attendance_rollups.sql.
+SQLITE_ROLLUP_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS refresh_rollup_on_session_{event} AFTER {event} ON attendance_sessions
+BEGIN
+    DELETE FROM attendance_rollup_daily WHERE student_id = {row}.student_id AND date = {row}.date;
+    INSERT INTO attendance_rollup_daily (student_id, date, sessions, total_seconds, first_in, last_out)
+    SELECT student_id, date, COUNT(*),
+           COALESCE(SUM(strftime('%s', time_out) - strftime('%s', time_in)), 0),
+           MIN(time_in), MAX(time_out)
+    FROM attendance_sessions
+    WHERE student_id = {row}.student_id AND date = {row}.date
+    GROUP BY student_id, date;
+    DELETE FROM attendance_rollup_weekly
+    WHERE student_id = {row}.student_id AND week_start = date({row}.date, 'weekday 0', '-6 days');
+    INSERT INTO attendance_rollup_weekly (student_id, week_start, days_present, total_seconds, first_in, last_out)
+    SELECT student_id, date({row}.date, 'weekday 0', '-6 days'), COUNT(*), SUM(total_seconds),
+           MIN(first_in), MAX(last_out)
+    FROM attendance_rollup_daily
+    WHERE student_id = {row}.student_id
+      AND date BETWEEN date({row}.date, 'weekday 0', '-6 days') AND date({row}.date, 'weekday 0')
+    GROUP BY student_id;
+END;
+"""
+SQLITE_SCHEMA += "".join(
+    SQLITE_ROLLUP_TRIGGER.format(event=event, row=row)
+    for event, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD"))
+)
+
+
+class SQLiteBackend:
+    """Single-file SQLite database with the same schema as database_face_att.sql"""
+
+    name = "sqlite"
+    # Times are stored as 'YYYY-MM-DD HH:MM:SS'; no '%' formats, which the placeholder rewrite would break
+    daily_columns = _daily_columns(
+        lambda column: f"substr({column}, 12, 8)",
+        "UNIX_TIMESTAMP(s.time_out) - UNIX_TIMESTAMP(s.time_in)",
+    )
+
+    def __init__(self, path=None):
+        self.path = path or SQLITE_PATH
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def connect(self):
+        raw = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=30)
+        raw.row_factory = lambda cursor, row: {d[0]: v for d, v in zip(cursor.description, row)}
+        raw.create_function("TIMEDIFF", 2, _sql_timediff, deterministic=True)
+        raw.create_function("ADDTIME", 2, _sql_addtime, deterministic=True)
+        raw.create_function("CURDATE", 0, lambda: datetime.now().strftime("%Y-%m-%d"))
+        raw.create_function("SEC_TO_TIME", 1, _sql_sec_to_time, deterministic=True)
+        raw.create_function("UNIX_TIMESTAMP", 1, _sql_unix_timestamp, deterministic=True)
+        with self._schema_lock:
+            if not self._schema_ready:
+                # Persistent on the file; switching modes fails at once (no busy wait) if another connection holds a lock
+                raw.execute("PRAGMA journal_mode=WAL")
+                raw.executescript(SQLITE_SCHEMA)
+                self._schema_ready = True
+        return SQLiteConnection(raw)
+
+    def ping(self, raw):
+        with raw.cursor() as cursor:
+            cursor.execute("SELECT 1")
+
+    def after_fork(self):
+        # Another thread may have held the lock when the process forked
+        self._schema_lock = threading.Lock()
+
+    def streaming_cursor(self, connection):
+        """sqlite3 cursors already step through results lazily"""
+        return connection.cursor()
+
+    def mark_session(self, connection, name, timestamp):
+        """Same rules as the MySQL procedure, in one IMMEDIATE (write-locked) transaction"""
+        ts = timestamp.strftime("%Y-%m-%d %H:%M:%S")
+        day = timestamp.strftime("%Y-%m-%d")
+        gap = f"-{SESSION_GAP_MINUTES} minutes"
+        with connection.cursor() as cursor:
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                cursor.execute("SELECT id FROM userDetails WHERE name = %s", (name,))
+                student = cursor.fetchone()
+                if student is None:
+                    result = "unregistered"
+                else:
+                    cursor.execute("""
+                        SELECT id, session_no, time_in, time_out,
+                               time_in <= datetime(%s, %s) AS in_elapsed,
+                               time_out <= datetime(%s, %s) AS out_elapsed
+                        FROM attendance_sessions
+                        WHERE student_id = %s AND date = %s
+                        ORDER BY session_no DESC LIMIT 1
+                    """, (ts, gap, ts, gap, student["id"], day))
+                    last = cursor.fetchone()
+                    if last is None or (last["time_out"] is not None and last["out_elapsed"]):
+                        cursor.execute("""
+                            INSERT INTO attendance_sessions (student_id, date, session_no, time_in)
+                            VALUES (%s, %s, %s, %s)
+                        """, (student["id"], day, (last["session_no"] if last else 0) + 1, ts))
+                        cursor.execute("""
+                            INSERT INTO attendance (name, date, status) VALUES (%s, %s, 'Present')
+                            ON DUPLICATE KEY UPDATE status = 'Present'
+                        """, (name, day))
+                        result = "in"
+                    elif last["time_out"] is None and last["in_elapsed"]:
+                        cursor.execute(
+                            "UPDATE attendance_sessions SET time_out = %s WHERE id = %s",
+                            (ts, last["id"]),
+                        )
+                        result = "out"
+                    else:
+                        result = "too_soon"
+                if result in ("in", "out"):
+                    bump_attendance_version(cursor)
+                cursor.execute("COMMIT")
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+        return result
+
+
+def get_backend(name=None):
+    name = name or DB_BACKEND
+    if name == "sqlite":
+        return SQLiteBackend()
+    if name == "mysql":
+        return MySQLBackend()
+    raise ValueError(f"Unknown database backend: {name}")
+
+
+class PooledConnection:
+    """Connection checked out of a pool; ``close()`` returns it instead of closing it"""
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self.created = time.monotonic()
+        self.last_used = self.created
+        self.broken = False
+
+    def cursor(self, *args, **kwargs):
+        return self._raw.cursor(*args, **kwargs)
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def close(self):
+        self._pool.release(self)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+class ConnectionPool:
+    """Thread-safe bounded connection pool.
+
+    Idle connections are health-checked before reuse once they have been
+    idle for POOL_HEALTH_CHECK_AFTER seconds, and recycled after
+    POOL_MAX_LIFETIME. ``acquire`` blocks up to ``timeout`` when all
+    ``max_size`` connections are in use; the wait is recorded in ``metrics``.
+    """
+
+    def __init__(self, backend, max_size=POOL_MAX_SIZE, max_lifetime=POOL_MAX_LIFETIME,
+                 health_check_after=POOL_HEALTH_CHECK_AFTER):
+        self.backend = backend
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.health_check_after = health_check_after
+        self._idle = []
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._metrics = {"created": 0, "recycled": 0, "failed_health_checks": 0,
+                         "acquired": 0, "waits": 0, "wait_seconds": 0.0, "timeouts": 0}
+
+    def _discard(self, conn):
+        try:
+            conn._raw.close()
+        except Exception:
+            pass
+
+    def _check(self, conn, now):
+        """None if the connection can be reused, else the metric to count its discard under"""
+        if now - conn.created > self.max_lifetime:
+            return "recycled"
+        if now - conn.last_used > self.health_check_after:
+            try:
+                self.backend.ping(conn._raw)
+            except Exception:
+                return "failed_health_checks"
+        return None
+
+    def acquire(self, timeout=POOL_ACQUIRE_TIMEOUT):
+        start = time.monotonic()
+        with self._cond:
+            if not self._idle and self._in_use >= self.max_size:
+                self._metrics["waits"] += 1
+                ready = self._cond.wait_for(
+                    lambda: self._idle or self._in_use < self.max_size, timeout
+                )
+                self._metrics["wait_seconds"] += time.monotonic() - start
+                if not ready:
+                    self._metrics["timeouts"] += 1
+                    raise TimeoutError("Timed out waiting for a database connection")
+            # The slot is reserved here: idle + in use never exceeds max_size
+            self._in_use += 1
+            self._metrics["acquired"] += 1
+            candidate = self._idle.pop() if self._idle else None
+
+        # Health checks and connects happen outside the lock, one idle connection at a time
+        while candidate is not None:
+            problem = self._check(candidate, time.monotonic())
+            if problem is None:
+                return candidate
+            self._discard(candidate)
+            with self._cond:
+                self._metrics[problem] += 1
+                candidate = self._idle.pop() if self._idle else None
+        try:
+            conn = PooledConnection(self, self.backend.connect())
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._metrics["created"] += 1
+        return conn
+
+    def release(self, conn):
+        conn.last_used = time.monotonic()
+        with self._cond:
+            self._in_use -= 1
+            # PyMySQL clears ``open`` when the socket dies mid-query
+            if (conn.broken or not getattr(conn._raw, "open", True)
+                    or conn.last_used - conn.created > self.max_lifetime):
+                self._discard(conn)
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout=POOL_ACQUIRE_TIMEOUT):
+        """``with pool.connection() as conn:`` — returned to the pool on exit"""
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        except DB_ERRORS:
+            conn.broken = True
+            raise
+        finally:
+            conn.close()
+
+    def metrics(self):
+        with self._cond:
+            return dict(self._metrics, in_use=self._in_use, idle=len(self._idle),
+                        max_size=self.max_size)
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._discard(conn)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide connection pool for the configured backend"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(get_backend())
+        return _pool
+
+
+def _reset_pool_after_fork():
+    """Give a forked child its own pool instead of the parent's connections.
+
+    The inherited connections share sockets (or sqlite3 handles) with the
+    parent, so they are dropped without being closed, which would close them
+    for the parent too. The locks are replaced because another thread (e.g. an
+    AttendanceWriter) may have held them at the fork.
+    """
+    global _pool, _pool_lock
+    _pool_lock = threading.Lock()
+    if _pool is not None:
+        _pool.backend.after_fork()
+        _pool = ConnectionPool(_pool.backend, _pool.max_size, _pool.max_lifetime, _pool.health_check_after)
+
+
+os.register_at_fork(after_in_child=_reset_pool_after_fork)
+
+
+def get_pool_metrics():
+    return get_pool().metrics()
+
+
+def get_db_connection():
+    """Check out a pooled database connection, or None if none can be had.
+
+    ``close()`` returns it to the pool. Failures are logged, not shown: this
+    is also called from background threads, so callers on the page report
+    a None themselves.
+    """
+    try:
+        return get_pool().acquire()
+    except (TimeoutError,) + DB_ERRORS as e:
+        logger.error("Failed to connect to database: %s", e)
+        return None
+
+def mark_attendance_session(connection, name, timestamp):
+    """Atomically apply one attendance mark.
+
+    Opens a session, closes the open one, or rejects the mark under the
+    10-minute rule. Returns 'in', 'out', 'too_soon' or 'unregistered'.
+    """
+    return get_pool().backend.mark_session(connection, name, timestamp)
+
+def attendance_daily_columns():
+    """The attendance_daily select list for the configured backend (see _daily_columns)"""
+    return get_pool().backend.daily_columns
+
+def streaming_cursor(connection):
+    """Cursor that fetches rows incrementally instead of buffering the whole result.
+
+    Read it to the end (or close it) before running another query on the
+    same connection.
+    """
+    return get_pool().backend.streaming_cursor(connection)
+
+def migrate_legacy_attendance():
+    """Copy entry1..entry5 columns of the wide attendance table into attendance_sessions (SQLite).
+
+    MySQL installations run migrations/001_attendance_sessions.sql instead.
+    Safe to re-run: existing sessions are left untouched.
+    """
+    if get_pool().backend.name != "sqlite":
+        st.info("Run migrations/001_attendance_sessions.sql against the MySQL server.")
+        return False
+    connection = get_db_connection()
+    if connection is None:
+        st.error("Failed to connect to the database.")
+        return False
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT OR IGNORE INTO userDetails (name) SELECT DISTINCT name FROM attendance")
+            for i in range(1, 6):
+                cursor.execute(f"""
+                    INSERT OR IGNORE INTO attendance_sessions (student_id, date, session_no, time_in, time_out)
+                    SELECT u.id, a.date, {i},
+                           a.date || ' ' || a.entry{i}_in,
+                           CASE WHEN a.entry{i}_out IS NULL OR a.entry{i}_out = '' THEN NULL
+                                ELSE a.date || ' ' || a.entry{i}_out END
+                    FROM attendance a JOIN userDetails u ON u.name = a.name
+                    WHERE a.entry{i}_in IS NOT NULL AND a.entry{i}_in <> ''
+                """)
+            bump_attendance_version(cursor)
+        return True
+    except DB_ERRORS as e:
+        st.error(f"Failed to migrate attendance: {e}")
+        return False
+    finally:
+        connection.close()
+
+def bump_attendance_version(cursor):
+    """Mark attendance as changed: call once per write transaction, not per row.
+
+    The counter is a single row, so bumping it per row (as triggers used to)
+    made it a lock every kiosk's mark queued on.
+    """
+    cursor.execute("UPDATE attendance_version SET version = version + 1 WHERE id = 1")
+
+def get_attendance_version():
+    """Return the attendance change counter (bumped once per attendance write), or None"""
+    connection = get_db_connection()
+    if connection is None:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT version FROM attendance_version WHERE id = 1")
+            row = cursor.fetchone()
+        return row["version"] if row else 0
+    except DB_ERRORS as e:
+        st.error(f"Failed to read attendance version: {e}")
+        return None
+    finally:
+        connection.close()
+
+def publish_gallery_change(connection, op, name, encoding=None):
+    """Append an 'add', 'update' or 'remove' to the gallery change feed; returns its version.
+
+    ``encoding`` is stored as 128 float32 values.
+    """
+    blob = None if encoding is None else np.asarray(encoding, dtype=np.float32).tobytes()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO gallery_changes (op, name, encoding) VALUES (%s, %s, %s)",
+            (op, name, blob),
+        )
+        return cursor.lastrowid
+
+def publish_gallery_changes(connection, changes):
+    """Append many (op, name, encoding) changes with one batched insert"""
+    rows = [
+        (op, name, None if encoding is None else np.asarray(encoding, dtype=np.float32).tobytes())
+        for op, name, encoding in changes
+    ]
+    if rows:
+        with connection.cursor() as cursor:
+            cursor.executemany("INSERT INTO gallery_changes (op, name, encoding) VALUES (%s, %s, %s)", rows)
+
+def get_gallery_version():
+    """Latest gallery change version (0 if none), or None if the database is unreachable"""
+    connection = get_db_connection()
+    if connection is None:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT MAX(version) AS version FROM gallery_changes")
+            row = cursor.fetchone()
+        return row["version"] or 0
+    except DB_ERRORS as e:
+        logger.error("Failed to read gallery version: %s", e)
+        return None
+    finally:
+        connection.close()
+
+def fetch_gallery_changes(after_version):
+    """Gallery changes newer than ``after_version`` as [(version, op, name, encoding)], oldest first"""
+    connection = get_db_connection()
+    if connection is None:
+        return []
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT version, op, name, encoding FROM gallery_changes WHERE version > %s ORDER BY version",
+                (after_version,),
+            )
+            rows = cursor.fetchall()
+    except DB_ERRORS as e:
+        logger.error("Failed to fetch gallery changes: %s", e)
+        return []
+    finally:
+        connection.close()
+    return [
+        (row["version"], row["op"], row["name"],
+         None if row["encoding"] is None else np.frombuffer(row["encoding"], dtype=np.float32))
+        for row in rows
+    ]
 
 def get_registered_students():
     """Fetch all registered students from the userDetails table."""
     connection = get_db_connection()
     if connection is None:
+        st.error("Failed to connect to the database.")
         return []
 
     try:
@@ -31,36 +829,156 @@ def get_registered_students():
             cursor.execute("SELECT name FROM userDetails")
             students = [row['name'] for row in cursor.fetchall()]
         return students
-    except pymysql.Error as e:
+    except DB_ERRORS as e:
         st.error(f"Error fetching registered students: {e}")
         return []
     finally:
         connection.close()
 
-def insert_default_attendance():
-    """Insert default 'Absent' records for all registered students for the day."""
-    connection = get_db_connection()
+def ensure_daily_roster(day=None, chunk_size=ROSTER_CHUNK_SIZE, connection=None):
+    """Give every registered student an 'Absent' row for ``day``; returns the rows inserted.
+
+    roster_days records the highest student id already covered for each day,
+    so after the first run a call costs two primary-key lookups, and students
+    registered later in the day are topped up by id. Students are walked in
+    id ranges of ``chunk_size``, one autocommitted statement per range, so no
+    long transaction holds locks. The (name, date) unique key makes every
+    insert idempotent: a student with a row already, or a concurrent run, is
+    skipped by INSERT IGNORE instead of an anti-join. The MySQL event calls
+    the same logic (migrations/004_daily_roster.sql).
+    """
+    day = str(day or datetime.now().date())
+    own_connection = connection is None
+    if own_connection:
+        connection = get_db_connection()
     if connection is None:
-        return False
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT COALESCE(MAX(id), 0) AS max_id FROM userDetails")
+            max_id = cursor.fetchone()["max_id"]
+            cursor.execute("SELECT last_student_id FROM roster_days WHERE date = %s", (day,))
+            row = cursor.fetchone()
+            last_id = row["last_student_id"] if row else 0
+            if last_id >= max_id:
+                return 0
+            if row is None:
+                cursor.execute("INSERT IGNORE INTO roster_days (date, last_student_id) VALUES (%s, 0)", (day,))
+
+            inserted = 0
+            while last_id < max_id:
+                upper = min(last_id + chunk_size, max_id)
+                inserted += cursor.execute("""
+                    INSERT IGNORE INTO attendance (name, date, status)
+                    SELECT name, %s, 'Absent' FROM userDetails WHERE id > %s AND id <= %s
+                """, (day, last_id, upper))
+                cursor.execute("""
+                    UPDATE roster_days SET last_student_id = %s, updated_at = CURRENT_TIMESTAMP
+                    WHERE date = %s AND last_student_id < %s
+                """, (upper, day, upper))
+                last_id = upper
+            if inserted:
+                bump_attendance_version(cursor)
+            return inserted
+    finally:
+        if own_connection:
+            connection.close()
+
+
+def rollup_week_start(day):
+    """Monday of the week that contains ``day``; weekly rollups run Monday to Sunday"""
+    return day - timedelta(days=day.weekday())
+
+
+def rebuild_attendance_rollups(start=None, end=None, connection=None, progress=None):
+    """Recompute the daily and weekly rollups from attendance_sessions; returns the weeks rebuilt.
 
+    The session triggers keep the rollups current as attendance is marked;
+    this is the backfill for history recorded before they existed and the
+    repair tool after bulk edits. ``start``/``end`` (dates, default: the whole
+    session history) are widened to whole weeks, and each week is replaced
+    in its own transaction so marks taken meanwhile are not lost.
+    ``progress(done, total)`` is called after each week.
+    """
+    own_connection = connection is None
+    if own_connection:
+        connection = get_db_connection()
+    if connection is None:
+        return None
     try:
         with connection.cursor() as cursor:
-            today = datetime.now().strftime("%Y-%m-%d")
-
-            # Ensure all registered students have an attendance entry for today
-            cursor.execute("""
-                INSERT INTO attendance (name, date, status)
-                SELECT name, %s, 'Absent'
-                FROM userDetails
-                WHERE name NOT IN (
-                    SELECT name FROM attendance WHERE date = %s
-                )
-            """, (today, today))
+            if start is None or end is None:
+                cursor.execute("SELECT MIN(date) AS first, MAX(date) AS last FROM attendance_sessions")
+                bounds = cursor.fetchone()
+                if bounds["first"] is None:
+                    return 0
+                start = start or datetime.strptime(str(bounds["first"]), "%Y-%m-%d").date()
+                end = end or datetime.strptime(str(bounds["last"]), "%Y-%m-%d").date()
+            weeks = []
+            week = rollup_week_start(start)
+            while week <= end:
+                weeks.append(week)
+                week += timedelta(days=7)
+
+            for done, week in enumerate(weeks, 1):
+                week_start, week_end = str(week), str(week + timedelta(days=6))
+                cursor.execute("BEGIN")
+                try:
+                    cursor.execute(
+                        "DELETE FROM attendance_rollup_daily WHERE date BETWEEN %s AND %s",
+                        (week_start, week_end),
+                    )
+                    cursor.execute("""
+                        INSERT INTO attendance_rollup_daily
+                            (student_id, date, sessions, total_seconds, first_in, last_out)
+                        SELECT student_id, date, COUNT(*),
+                               COALESCE(SUM(UNIX_TIMESTAMP(time_out) - UNIX_TIMESTAMP(time_in)), 0),
+                               MIN(time_in), MAX(time_out)
+                        FROM attendance_sessions
+                        WHERE date BETWEEN %s AND %s
+                        GROUP BY student_id, date
+                    """, (week_start, week_end))
+                    cursor.execute(
+                        "DELETE FROM attendance_rollup_days WHERE date BETWEEN %s AND %s",
+                        (week_start, week_end),
+                    )
+                    cursor.execute("""
+                        INSERT INTO attendance_rollup_days (date)
+                        SELECT DISTINCT date FROM attendance_sessions WHERE date BETWEEN %s AND %s
+                    """, (week_start, week_end))
+                    cursor.execute("DELETE FROM attendance_rollup_weekly WHERE week_start = %s", (week_start,))
+                    cursor.execute("""
+                        INSERT INTO attendance_rollup_weekly
+                            (student_id, week_start, days_present, total_seconds, first_in, last_out)
+                        SELECT student_id, %s, COUNT(*), SUM(total_seconds), MIN(first_in), MAX(last_out)
+                        FROM attendance_rollup_daily
+                        WHERE date BETWEEN %s AND %s
+                        GROUP BY student_id
+                    """, (week_start, week_start, week_end))
+                    cursor.execute("COMMIT")
+                except BaseException:
+                    cursor.execute("ROLLBACK")
+                    raise
+                if progress:
+                    progress(done, len(weeks))
+            if weeks:
+                bump_attendance_version(cursor)
+            return len(weeks)
+    finally:
+        if own_connection:
+            connection.close()
+
 
-            st.info("Daily attendance initialized successfully.")
-            return True
-    except pymysql.Error as e:
+def insert_default_attendance():
+    """Insert default 'Absent' records for all registered students for the day."""
+    try:
+        inserted = ensure_daily_roster()
+    except DB_ERRORS as e:
         st.error(f"Failed to insert default attendance: {e}")
         return False
-    finally:
-        connection.close()
+    if inserted is None:
+        st.error("Failed to connect to the database.")
+        return False
+    if inserted:
+        st.info(f"Daily attendance initialized for {inserted} students.")
+    return True
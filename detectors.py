@@ -0,0 +1,193 @@
+# detectors.py
+"""Face detector backends behind one interface.
+
+Every detector takes an RGB image and returns face boxes as
+``(top, right, bottom, left)`` tuples, the same format as
+``face_recognition.face_locations``, so the boxes can go straight to
+``face_recognition.face_encodings``.
+
+    hog      dlib HOG (face_recognition's default), the most accurate CPU option
+    haar     OpenCV Haar cascade (ships with opencv-python)
+    lbp      OpenCV LBP cascade, the fastest and least accurate
+    yunet    OpenCV DNN YuNet (cv2.FaceDetectorYN), OpenCV 4.8+
+    ssd      OpenCV DNN ResNet-10 SSD (Caffe)
+
+Model files are read from DETECTOR_MODELS_DIR (ATTENDANCE_DETECTOR_MODELS)
+unless a path is given; see readme.txt for where to get them. Models are
+loaded on first use, once per thread, because OpenCV cascades and DNN nets
+are not safe to share between the recognition worker threads. Warm each
+worker thread up before its first frame (RecognitionPipeline's
+``worker_init``), not only the thread that created the detector.
+"""
+import os
+import threading
+
+import cv2
+
+DEFAULT_DETECTOR = os.environ.get("ATTENDANCE_DETECTOR", "hog")
+DETECTOR_MODELS_DIR = os.environ.get("ATTENDANCE_DETECTOR_MODELS", "models")
+HAAR_CASCADE = "haarcascade_frontalface_default.xml"
+LBP_CASCADE = "lbpcascade_frontalface_improved.xml"
+YUNET_MODEL = "face_detection_yunet_2023mar.onnx"
+SSD_CONFIG = "deploy.prototxt"
+SSD_MODEL = "res10_300x300_ssd_iter_140000.caffemodel"
+MIN_FACE_PX = 20  # Smallest face (at detection scale) the cascades look for
+SCORE_THRESHOLD = 0.6  # DNN detectors: minimum face confidence
+
+
+def _model_path(path, filename):
+    """Explicit path, else the models directory, else OpenCV's bundled data (cascades only)"""
+    if path:
+        candidates = [path]
+    else:
+        candidates = [os.path.join(DETECTOR_MODELS_DIR, filename)]
+        bundled = getattr(getattr(cv2, "data", None), "haarcascades", None)
+        if bundled:
+            candidates.append(os.path.join(bundled, filename))
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return candidate
+    raise FileNotFoundError(f"Detector model {filename} not found (looked in: {', '.join(candidates)})")
+
+
+def _clip_box(x, y, w, h, width, height):
+    left, top = max(0, int(x)), max(0, int(y))
+    right, bottom = min(width, int(x + w)), min(height, int(y + h))
+    return top, right, bottom, left
+
+
+class Detector:
+    """Base class: subclasses implement ``_load()`` and ``_detect(model, rgb)``"""
+    name = None
+
+    def __init__(self):
+        self._local = threading.local()
+
+    @property
+    def model(self):
+        model = getattr(self._local, "model", None)
+        if model is None:
+            model = self._local.model = self._load()
+        return model
+
+    def _load(self):
+        return None
+
+    def detect(self, rgb):
+        """Return [(top, right, bottom, left)] for the faces in an RGB image"""
+        return self._detect(self.model, rgb)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.name!r})"
+
+
+class HogDetector(Detector):
+    """dlib HOG through face_recognition"""
+    name = "hog"
+
+    def __init__(self, upsample=1):
+        super().__init__()
+        self.upsample = upsample
+
+    def _load(self):
+        from face_models import face_recognition
+        return face_recognition()
+
+    def _detect(self, face_recognition, rgb):
+        return face_recognition.face_locations(rgb, self.upsample, model="hog")
+
+
+class CascadeDetector(Detector):
+    """OpenCV Haar or LBP cascade on the grayscale image"""
+
+    def __init__(self, name="haar", path=None, scale_factor=1.1, min_neighbors=5, min_size=MIN_FACE_PX):
+        super().__init__()
+        self.name = name
+        self.path = _model_path(path, HAAR_CASCADE if name == "haar" else LBP_CASCADE)
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = min_size
+
+    def _load(self):
+        cascade = cv2.CascadeClassifier(self.path)
+        if cascade.empty():
+            raise ValueError(f"Cannot load cascade {self.path}")
+        return cascade
+
+    def _detect(self, cascade, rgb):
+        gray = cv2.equalizeHist(cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY))
+        height, width = gray.shape
+        boxes = cascade.detectMultiScale(
+            gray, scaleFactor=self.scale_factor, minNeighbors=self.min_neighbors,
+            minSize=(self.min_size, self.min_size),
+        )
+        return [_clip_box(x, y, w, h, width, height) for x, y, w, h in boxes]
+
+
+class YuNetDetector(Detector):
+    """OpenCV's YuNet CNN (cv2.FaceDetectorYN); handles any input size"""
+    name = "yunet"
+
+    def __init__(self, path=None, score_threshold=SCORE_THRESHOLD):
+        super().__init__()
+        if not hasattr(cv2, "FaceDetectorYN"):
+            raise ValueError("The yunet detector needs OpenCV 4.8 or newer")
+        self.path = _model_path(path, YUNET_MODEL)
+        self.score_threshold = score_threshold
+
+    def _load(self):
+        return cv2.FaceDetectorYN.create(self.path, "", (320, 320), self.score_threshold)
+
+    def _detect(self, yunet, rgb):
+        height, width = rgb.shape[:2]
+        yunet.setInputSize((width, height))
+        _, faces = yunet.detect(cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR))
+        if faces is None:
+            return []
+        return [_clip_box(x, y, w, h, width, height) for x, y, w, h in faces[:, :4]]
+
+
+class SsdDetector(Detector):
+    """OpenCV DNN ResNet-10 SSD; the image is resized to 300x300"""
+    name = "ssd"
+    INPUT_SIZE = (300, 300)
+    MEAN = (104.0, 177.0, 123.0)  # BGR training mean
+
+    def __init__(self, config=None, path=None, score_threshold=SCORE_THRESHOLD):
+        super().__init__()
+        self.config = _model_path(config, SSD_CONFIG)
+        self.path = _model_path(path, SSD_MODEL)
+        self.score_threshold = score_threshold
+
+    def _load(self):
+        return cv2.dnn.readNetFromCaffe(self.config, self.path)
+
+    def _detect(self, net, rgb):
+        height, width = rgb.shape[:2]
+        # swapRB turns the RGB input into the BGR order the model was trained on
+        net.setInput(cv2.dnn.blobFromImage(rgb, 1.0, self.INPUT_SIZE, self.MEAN, swapRB=True))
+        detections = net.forward()[0, 0]
+        boxes = []
+        for _, _, score, x0, y0, x1, y1 in detections:
+            if score < self.score_threshold:
+                continue
+            boxes.append(_clip_box(x0 * width, y0 * height, (x1 - x0) * width, (y1 - y0) * height,
+                                   width, height))
+        return boxes
+
+
+DETECTORS = {
+    "hog": HogDetector,
+    "haar": lambda **options: CascadeDetector("haar", **options),
+    "lbp": lambda **options: CascadeDetector("lbp", **options),
+    "yunet": YuNetDetector,
+    "ssd": SsdDetector,
+}
+
+
+def create_detector(name=None, **options):
+    """Detector by name (default: ATTENDANCE_DETECTOR or 'hog'); raises ValueError / FileNotFoundError"""
+    name = (name or DEFAULT_DETECTOR).lower()
+    if name not in DETECTORS:
+        raise ValueError(f"Unknown detector {name!r}; choose from {', '.join(DETECTORS)}")
+    return DETECTORS[name](**options)
@@ -0,0 +1,313 @@
+# enrollment.py
+"""Student enrollment: encode a face once at upload and publish it to running recognizers.
+
+Single registrations and bulk imports (a ZIP of photos plus an optional CSV
+roster) go through the same checks: at most MAX_IMAGE_SIZE bytes, exactly
+one face, and a face at least MIN_FACE_SIZE pixels tall once the photo is
+downscaled to ENROLL_MAX_SIDE. face_recognition and cv2 are imported on
+first use so that importing this module (and the admin pages that use it)
+does not load the dlib models or OpenCV.
+"""
+import csv
+import io
+import os
+import zipfile
+from multiprocessing import Pool
+
+import numpy as np
+
+from db_config2 import publish_gallery_change, publish_gallery_changes
+from face_models import face_recognition as _face_recognition
+from face_cache import ENCODING_DIM, FaceEncodingCache, atomic_write
+from gallery import Gallery
+
+KNOWN_FACES_DIR = "known_faces"
+ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+MAX_IMAGE_SIZE = 5 * 1024 * 1024  # 5MB
+ENROLL_MAX_SIDE = 1024  # Photos are downscaled so their longest side is at most this
+MIN_FACE_SIZE = 80  # Smallest accepted face height in pixels, after downscaling
+DUPLICATE_DISTANCE = 0.15  # Encodings closer than this are the same photo (or a near-identical shot)
+REPORT_FIELDS = ["file", "name", "status", "reason"]
+
+
+class EnrollmentError(ValueError):
+    """The uploaded image cannot be used to enroll a student"""
+
+
+def encode_image_file(filepath):
+    """Encoding of the first face in an image file, or None (FaceEncodingCache encoder)"""
+    face_recognition = _face_recognition()
+    image = face_recognition.load_image_file(filepath)
+    locations = face_recognition.face_locations(image)
+    if not locations:
+        return None
+    return face_recognition.face_encodings(image, locations)[0]
+
+
+def decode_photo(image_bytes):
+    """Decode image bytes to a BGR array no larger than ENROLL_MAX_SIDE"""
+    import cv2
+    if len(image_bytes) > MAX_IMAGE_SIZE:
+        raise EnrollmentError(f"Image is larger than {MAX_IMAGE_SIZE // (1024 * 1024)}MB")
+    image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise EnrollmentError("Cannot read the image")
+    scale = ENROLL_MAX_SIDE / max(image.shape[:2])
+    if scale < 1:
+        image = cv2.resize(image, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return image
+
+
+def encode_photo(image):
+    """Encode the single face in a BGR photo; raises EnrollmentError otherwise"""
+    import cv2
+    face_recognition = _face_recognition()
+    rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    locations = face_recognition.face_locations(rgb)
+    if not locations:
+        raise EnrollmentError("No face detected in the image")
+    if len(locations) > 1:
+        raise EnrollmentError(f"{len(locations)} faces detected; the photo must show one person")
+    top, _, bottom, _ = locations[0]
+    if bottom - top < MIN_FACE_SIZE:
+        raise EnrollmentError(f"Face is too small ({bottom - top}px, at least {MIN_FACE_SIZE}px needed)")
+    return face_recognition.face_encodings(rgb, locations)[0]
+
+
+def encode_upload(image_bytes):
+    """Validate and encode uploaded image bytes; raises EnrollmentError"""
+    return encode_photo(decode_photo(image_bytes))
+
+
+def validate_name(name):
+    """Return the stripped student name; raises EnrollmentError if it cannot be a file name"""
+    name = (name or "").strip()
+    if not name:
+        raise EnrollmentError("The student name is empty")
+    if ("\0" in name or "/" in name or "\\" in name or name in (".", "..")
+            or os.path.basename(name) != name):
+        raise EnrollmentError(f"Invalid student name {name!r}: it cannot contain path separators")
+    return name
+
+
+def _existing_photos(faces_dir, name):
+    """Paths of the student's photos, one per allowed extension that exists"""
+    paths = [os.path.join(faces_dir, f"{name}{ext}") for ext in sorted(ALLOWED_EXTENSIONS)]
+    return [path for path in paths if os.path.exists(path)]
+
+
+def _save_photo(faces_dir, name, data):
+    """Write ``name``.jpg and remove the student's photos in other formats.
+
+    Returns ('add' or 'update', [file names removed]).
+    """
+    filepath = os.path.join(faces_dir, f"{name}.jpg")
+    existing = _existing_photos(faces_dir, name)
+    atomic_write(filepath, lambda f: f.write(data))
+    removed = []
+    for path in existing:
+        if path != filepath:
+            os.remove(path)  # Otherwise the student would have two gallery rows
+            removed.append(os.path.basename(path))
+    return ("update" if existing else "add"), removed
+
+
+def _insert_students(connection, names):
+    with connection.cursor() as cursor:
+        cursor.executemany("""
+            INSERT INTO userDetails (name) VALUES (%s)
+            ON DUPLICATE KEY UPDATE name = name
+        """, [(name,) for name in names])
+
+
+def enroll_student(connection, name, image_bytes, faces_dir=KNOWN_FACES_DIR):
+    """Save a student's photo and encoding and publish the change; returns the op.
+
+    Registering a name that already has a photo is a re-enrollment ('update'):
+    the photo is replaced atomically and running recognizers swap the old
+    encoding for the new one in a single step. The student row is written
+    before the photo, so a database failure never leaves a face that is
+    recognized but unregistered. Only this student's encoding cache entry
+    is rewritten; the rest of the gallery is not rescanned.
+    """
+    name = validate_name(name)
+    encoding = encode_upload(image_bytes)
+    _insert_students(connection, [name])
+
+    op, removed = _save_photo(faces_dir, name, image_bytes)
+    FaceEncodingCache(faces_dir, ALLOWED_EXTENSIONS).update({f"{name}.jpg": encoding}, removed)
+    publish_gallery_change(connection, op, name, encoding)
+    return op
+
+
+def remove_student_face(connection, name, faces_dir=KNOWN_FACES_DIR):
+    """Delete a student's photo so they are no longer recognized; attendance history is kept"""
+    name = validate_name(name)
+    removed = []
+    for filepath in _existing_photos(faces_dir, name):
+        os.remove(filepath)
+        removed.append(os.path.basename(filepath))
+    if removed:
+        FaceEncodingCache(faces_dir, ALLOWED_EXTENSIONS).update(removed=removed)
+        publish_gallery_change(connection, "remove", name)
+    return bool(removed)
+
+
+# Bulk import
+
+def read_roster(csv_bytes):
+    """Parse a roster CSV with ``filename`` and ``name`` columns into {filename: name}"""
+    reader = csv.DictReader(io.StringIO(csv_bytes.decode("utf-8-sig")))
+    columns = {c.strip().lower(): c for c in reader.fieldnames or []}
+    if "filename" not in columns or "name" not in columns:
+        raise EnrollmentError("The roster needs 'filename' and 'name' columns")
+    roster = {}
+    for row in reader:
+        filename = os.path.basename((row[columns["filename"]] or "").strip())
+        name = (row[columns["name"]] or "").strip()
+        if filename and name:
+            roster[filename] = name
+    return roster
+
+
+def _archive_photos(archive):
+    """Image members of a ZIP, skipping folders and macOS metadata"""
+    return [
+        info.filename for info in archive.infolist()
+        if not info.is_dir()
+        and not info.filename.startswith("__MACOSX/")
+        and not os.path.basename(info.filename).startswith(".")
+        and os.path.splitext(info.filename)[1].lower() in ALLOWED_EXTENSIONS
+    ]
+
+
+_archive = None
+
+
+def _init_bulk_worker(zip_path):
+    global _archive
+    _archive = zipfile.ZipFile(zip_path)
+
+
+def _encode_member(member):
+    """Pool task: decode, downscale and encode one archive photo.
+
+    Returns (member, encoding, jpeg_bytes, error).
+    """
+    import cv2
+    try:
+        if _archive.getinfo(member).file_size > MAX_IMAGE_SIZE:
+            raise EnrollmentError(f"Image is larger than {MAX_IMAGE_SIZE // (1024 * 1024)}MB")
+        image = decode_photo(_archive.read(member))
+        encoding = encode_photo(image)
+        ok, jpeg = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 95])
+        if not ok:
+            raise EnrollmentError("Cannot re-encode the image")
+        return member, encoding, jpeg.tobytes(), None
+    except EnrollmentError as e:
+        return member, None, None, str(e)
+    except Exception as e:
+        return member, None, None, f"Failed: {e}"
+
+
+def bulk_enroll(connection, zip_path, roster=None, faces_dir=KNOWN_FACES_DIR, workers=None, progress=None):
+    """Enroll every photo in a ZIP; returns a report row per photo (and per roster entry without one).
+
+    Photos are named after the roster entry for their file name, or after the
+    file name itself without a roster. Faces are encoded in a process pool;
+    students are then written with one batched insert and one batched change
+    feed append. ``progress(done, total)`` is called as photos finish.
+    """
+    with zipfile.ZipFile(zip_path) as archive:
+        members = _archive_photos(archive)
+
+    report = []
+    names = {}  # {member: student name}, in archive order
+    seen_names = {}
+    for member in members:
+        filename = os.path.basename(member)
+        name = roster.get(filename) if roster is not None else os.path.splitext(filename)[0]
+        if not name:
+            report.append({"file": member, "name": "", "status": "rejected", "reason": "Not in the roster"})
+            continue
+        try:
+            name = validate_name(name)
+        except EnrollmentError as e:
+            report.append({"file": member, "name": name, "status": "rejected", "reason": str(e)})
+            continue
+        if name in seen_names:
+            report.append({"file": member, "name": name, "status": "rejected",
+                           "reason": f"Same student as {seen_names[name]}"})
+        else:
+            seen_names[name] = member
+            names[member] = name
+    if roster is not None:
+        photos = {os.path.basename(m) for m in members}
+        for filename, name in roster.items():
+            if filename not in photos:
+                report.append({"file": filename, "name": name, "status": "rejected", "reason": "No photo in the archive"})
+
+    encoded = {}
+    if names:
+        workers = max(1, min(workers or os.cpu_count() or 1, len(names)))
+        with Pool(workers, _init_bulk_worker, (zip_path,)) as pool:
+            for done, result in enumerate(pool.imap_unordered(_encode_member, list(names), chunksize=4), 1):
+                encoded[result[0]] = result[1:]
+                if progress:
+                    progress(done, len(names))
+
+    # Near-identical encodings: against students already registered (under another name) and within the batch
+    cache = FaceEncodingCache(faces_dir, ALLOWED_EXTENSIONS)
+    existing_matrix, existing_names, _ = cache.sync(encode_image_file)
+    candidates = [m for m in names if encoded[m][0] is not None]
+    nearest = {}
+    if candidates and len(existing_names):
+        indices, distances = Gallery(existing_matrix, existing_names).search([encoded[m][0] for m in candidates], 1)
+        nearest = {m: (existing_names[i[0]], d[0]) for m, i, d in zip(candidates, indices, distances)}
+
+    accepted = []
+    accepted_matrix = np.empty((len(candidates), ENCODING_DIM), dtype=np.float32)
+    for member, name in names.items():
+        encoding, jpeg, error = encoded[member]
+        row = {"file": member, "name": name}
+        if error:
+            report.append(dict(row, status="rejected", reason=error))
+            continue
+        match = nearest.get(member)
+        if match and match[0] != name and match[1] < DUPLICATE_DISTANCE:
+            report.append(dict(row, status="rejected", reason=f"Near-identical to registered student {match[0]}"))
+            continue
+        if accepted:
+            distances = np.linalg.norm(accepted_matrix[:len(accepted)] - encoding, axis=1)
+            closest = int(np.argmin(distances))
+            if distances[closest] < DUPLICATE_DISTANCE:
+                report.append(dict(row, status="rejected", reason=f"Near-identical to {accepted[closest][0]}"))
+                continue
+        accepted_matrix[len(accepted)] = encoding
+        accepted.append((member, name, encoding, jpeg))
+
+    if not accepted:
+        return report
+
+    # Students first: if this fails, no photo has been written yet
+    _insert_students(connection, [name for _, name, _, _ in accepted])
+    changes = []
+    precomputed = {}
+    for member, name, encoding, jpeg in accepted:
+        op, _ = _save_photo(faces_dir, name, jpeg)
+        precomputed[f"{name}.jpg"] = encoding
+        changes.append((op, name, encoding))
+        report.append({"file": member, "name": name, "status": "updated" if op == "update" else "enrolled",
+                       "reason": ""})
+    cache.sync(encode_image_file, precomputed=precomputed)
+    publish_gallery_changes(connection, changes)
+    return report
+
+
+def report_csv(report):
+    """Bulk import report as CSV text"""
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=REPORT_FIELDS)
+    writer.writeheader()
+    writer.writerows(report)
+    return out.getvalue()
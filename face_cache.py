@@ -0,0 +1,297 @@
+# face_cache.py
+import os
+import json
+import hashlib
+import tempfile
+import numpy as np
+
+CACHE_DIR_NAME = ".encoding_cache"
+MATRIX_FILE = "encodings-{}.npy"  # One file per generation, named in the index
+FLOAT32_FILE = "encodings_f32-{}.npy"  # float32 copy for quantized galleries, written on first use
+INDEX_FILE = "index.json"
+CACHE_VERSION = 2
+ENCODING_DIM = 128
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(filepath):
+    """Return the SHA-1 hex digest of a file's contents"""
+    digest = hashlib.sha1()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def atomic_write(path, write_fn):
+    """Write a file through a uniquely named temporary sibling and rename it into place"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write_fn(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class FaceEncodingCache:
+    """On-disk store of face encodings for the images in a directory.
+
+    Encodings live in a single ``.npy`` matrix that is memory-mapped on load,
+    with a JSON index mapping each row to its source file. Files are keyed by
+    path, mtime and size; the content hash is only computed when the stat
+    signature changes, so a warm start never decodes or hashes an image.
+
+    Every write stores the matrix under a new generation name and then
+    replaces the index, which names its generation, so a reader never pairs
+    an index with a matrix from a different write. ``update`` appends rows
+    without scanning the directory; rows it replaces or removes stay in the
+    matrix, unreferenced, until the next ``sync`` compacts them.
+    """
+
+    def __init__(self, faces_dir, allowed_extensions, cache_dir=None):
+        self.faces_dir = faces_dir
+        self.allowed_extensions = tuple(ext.lower() for ext in allowed_extensions)
+        self.cache_dir = cache_dir or os.path.join(faces_dir, CACHE_DIR_NAME)
+        self.index_path = os.path.join(self.cache_dir, INDEX_FILE)
+        self.generation = None
+
+    @property
+    def matrix_path(self):
+        return os.path.join(self.cache_dir, MATRIX_FILE.format(self.generation))
+
+    @property
+    def float32_path(self):
+        return os.path.join(self.cache_dir, FLOAT32_FILE.format(self.generation))
+
+    def _read_index(self, attempts=2):
+        """Load the cached index and matrix, or empty ones if the cache is missing or stale"""
+        for _ in range(attempts):
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    index = json.load(f)
+                if index.get("version") != CACHE_VERSION:
+                    break
+                self.generation = index["generation"]
+                if index["rows"] == 0:
+                    return index["files"], np.empty((0, ENCODING_DIM))
+                matrix = np.load(self.matrix_path, mmap_mode="r")
+                if matrix.shape[0] != index["rows"]:
+                    break
+                return index["files"], matrix
+            except FileNotFoundError:
+                continue  # Another writer replaced this generation; re-read its index
+            except (OSError, ValueError, KeyError):
+                break
+        self.generation = None
+        return {}, np.empty((0, ENCODING_DIM))
+
+    def _write_index(self, files, matrix):
+        """Persist the matrix under a new generation, then switch the index to it"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.generation = os.urandom(8).hex()
+        atomic_write(self.matrix_path, lambda f: np.save(f, matrix))
+        self._save_index(files, matrix.shape[0])
+
+    def _append_generation(self, matrix, new_rows, chunk_rows=4096):
+        """Write ``matrix`` followed by ``new_rows`` under a new generation, copying in chunks"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        generation = os.urandom(8).hex()
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".npy")
+        os.close(fd)
+        try:
+            shape = (matrix.shape[0] + new_rows.shape[0], ENCODING_DIM)
+            out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float64, shape=shape)
+            for start in range(0, matrix.shape[0], chunk_rows):
+                stop = min(start + chunk_rows, matrix.shape[0])
+                out[start:stop] = matrix[start:stop]
+            out[matrix.shape[0]:] = new_rows
+            out.flush()
+            del out
+            os.replace(tmp_path, os.path.join(self.cache_dir, MATRIX_FILE.format(generation)))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self.generation = generation
+
+    def _save_index(self, files, rows):
+        """Atomically point the index at the current generation"""
+        index = {"version": CACHE_VERSION, "generation": self.generation, "rows": int(rows), "files": files}
+        atomic_write(self.index_path, lambda f: f.write(json.dumps(index).encode("utf-8")))
+        self._remove_stale_generations()
+
+    def _remove_stale_generations(self):
+        """Delete matrix files (and their float32 copies) the index no longer names"""
+        keep = {os.path.basename(self.matrix_path), os.path.basename(self.float32_path)}
+        prefixes = (MATRIX_FILE.split("{}")[0], FLOAT32_FILE.split("{}")[0])
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.startswith(prefixes) and entry.name.endswith(".npy") and entry.name not in keep:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass  # Still memory-mapped elsewhere (Windows); removed by a later write
+
+    def _scan(self):
+        """Return {filename: (mtime_ns, size)} for every candidate image"""
+        found = {}
+        with os.scandir(self.faces_dir) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.lower().endswith(self.allowed_extensions):
+                    stat = entry.stat()
+                    found[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        return found
+
+    def sync(self, encode_fn, on_error=None, precomputed=None):
+        """Bring the cache in line with the directory and return (encodings, names, skipped).
+
+        ``encode_fn(filepath)`` must return a 128-d encoding, or None if the
+        image has no usable face. Only new or changed files are passed to it;
+        deleted files are evicted. ``skipped`` lists files without a face.
+        ``precomputed`` maps filenames to encodings already computed (e.g. at
+        upload time), which are stored instead of calling ``encode_fn``.
+        """
+        precomputed = precomputed or {}
+        cached_files, cached_matrix = self._read_index()
+        current = self._scan()
+
+        files = {}
+        changed = len(current) != len(cached_files)
+
+        for filename in sorted(current):
+            mtime_ns, size = current[filename]
+            entry = cached_files.get(filename)
+            if entry and entry["mtime_ns"] == mtime_ns and entry["size"] == size:
+                files[filename] = entry
+                continue
+
+            changed = True
+            filepath = os.path.join(self.faces_dir, filename)
+            try:
+                digest = file_digest(filepath)
+                if entry and entry["sha1"] == digest:
+                    files[filename] = dict(entry, mtime_ns=mtime_ns, size=size)
+                    continue
+                if filename in precomputed:
+                    encoding = precomputed[filename]
+                else:
+                    encoding = encode_fn(filepath)
+            except Exception as e:
+                if on_error:
+                    on_error(filename, e)
+                continue
+
+            files[filename] = {
+                "name": os.path.splitext(filename)[0],
+                "mtime_ns": mtime_ns,
+                "size": size,
+                "sha1": digest,
+                "row": None,
+                "encoding": None if encoding is None else [float(x) for x in encoding],
+            }
+
+        live_rows = sum(1 for entry in files.values() if entry["row"] is not None)
+        if not changed and live_rows == cached_matrix.shape[0]:
+            # Warm start: hand back the memory-mapped matrix untouched
+            ordered = sorted(
+                (entry for entry in files.values() if entry["row"] is not None),
+                key=lambda entry: entry["row"],
+            )
+            skipped = sorted(f for f, entry in files.items() if entry["row"] is None)
+            return cached_matrix, [entry["name"] for entry in ordered], skipped
+
+        # Assemble the new matrix: reuse cached rows, append freshly encoded ones, drop unreferenced ones
+        rows = []
+        names = []
+        skipped = []
+        for filename in sorted(files):
+            entry = files[filename]
+            fresh = entry.pop("encoding", None)
+            if fresh is not None:
+                rows.append(np.asarray(fresh, dtype=np.float64))
+            elif entry["row"] is not None:
+                rows.append(cached_matrix[entry["row"]])
+            else:
+                skipped.append(filename)
+                continue
+            entry["row"] = len(names)
+            names.append(entry["name"])
+
+        matrix = np.vstack(rows) if rows else np.empty((0, ENCODING_DIM))
+        self._write_index(files, matrix)
+        if rows:
+            matrix = np.load(self.matrix_path, mmap_mode="r")
+        return matrix, names, skipped
+
+    def update(self, encodings=None, removed=()):
+        """Record files written or deleted by the caller without scanning the directory.
+
+        ``encodings`` maps filenames already in the faces directory to their
+        encoding; ``removed`` lists filenames that no longer exist. Only the
+        given files are stat'ed and hashed, so enrolling one student does not
+        cost a pass over the whole gallery.
+        """
+        files, matrix = self._read_index()
+        files = dict(files)
+        for filename in removed:
+            files.pop(filename, None)
+        if encodings:
+            new_rows = []
+            for filename, encoding in encodings.items():
+                filepath = os.path.join(self.faces_dir, filename)
+                stat = os.stat(filepath)
+                files[filename] = {
+                    "name": os.path.splitext(filename)[0],
+                    "mtime_ns": stat.st_mtime_ns,
+                    "size": stat.st_size,
+                    "sha1": file_digest(filepath),
+                    "row": matrix.shape[0] + len(new_rows),
+                }
+                new_rows.append(np.asarray(encoding, dtype=np.float64))
+            self._append_generation(matrix, np.vstack(new_rows))
+            rows = matrix.shape[0] + len(new_rows)
+        elif self.generation is None:
+            return  # No usable cache to update; the next sync rebuilds it
+        else:
+            rows = matrix.shape[0]
+        self._save_index(files, rows)
+
+    def float32_matrix(self, matrix, chunk_rows=4096):
+        """``matrix`` (as returned by ``sync``) as a memory-mapped float32 copy on disk.
+
+        The copy is written in chunks the first time, so a large gallery is
+        never converted in memory at once, and reused until the cache changes.
+        """
+        if matrix.shape[0] == 0:
+            return np.empty((0, ENCODING_DIM), dtype=np.float32)
+        try:
+            cached = np.load(self.float32_path, mmap_mode="r")
+            if cached.shape == matrix.shape and cached.dtype == np.float32:
+                return cached
+        except (OSError, ValueError):
+            pass
+        # A unique temporary name, so two processes building the copy do not write the same file
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".npy")
+        os.close(fd)
+        try:
+            out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=matrix.shape)
+            for start in range(0, matrix.shape[0], chunk_rows):
+                out[start:start + chunk_rows] = matrix[start:start + chunk_rows]
+            out.flush()
+            del out
+            os.replace(tmp_path, self.float32_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return np.load(self.float32_path, mmap_mode="r")
+
+    def clear(self):
+        """Remove the on-disk cache"""
+        if os.path.exists(self.index_path):
+            os.remove(self.index_path)
+        self.generation = None
+        if os.path.isdir(self.cache_dir):
+            self._remove_stale_generations()
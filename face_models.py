@@ -0,0 +1,46 @@
+# face_models.py
+"""Lazy loading of face_recognition (dlib and its model files).
+
+Importing face_recognition loads dlib and several model files, which takes
+seconds and a few hundred MB. Modules that only sometimes need it call
+``face_recognition()`` instead of importing it at the top, so the admin
+app and the tools never pay for it unless they encode a face. Entry points
+that will need the models call ``warm_up()`` before their first frame, on
+every thread that runs detection, since detector models are per thread.
+"""
+import threading
+import time
+
+import numpy as np
+
+WARM_UP_IMAGE_SIZE = 64  # Blank image pushed through detection and encoding once
+
+_module = None
+_lock = threading.Lock()
+
+
+def face_recognition():
+    """The face_recognition module, imported on first use"""
+    global _module
+    if _module is None:
+        with _lock:
+            if _module is None:
+                import face_recognition as module
+                _module = module
+    return _module
+
+
+def loaded():
+    return _module is not None
+
+
+def warm_up(detector=None):
+    """Load the models and run them once; returns the seconds it took"""
+    started = time.perf_counter()
+    module = face_recognition()
+    image = np.zeros((WARM_UP_IMAGE_SIZE, WARM_UP_IMAGE_SIZE, 3), dtype=np.uint8)
+    if detector is not None:
+        detector.detect(image)
+    size = WARM_UP_IMAGE_SIZE
+    module.face_encodings(image, [(0, size, size, 0)])
+    return time.perf_counter() - started
@@ -0,0 +1,107 @@
+# frame_context.py
+"""Reusable buffers for the per-frame recognition path.
+
+A FrameContext owns the destination buffers that process_frame would
+otherwise allocate on every frame: the downscaled frame, its RGB copy and
+the encoding matrix handed to the gallery. OpenCV writes into them through
+``dst=``. Buffers are flat arrays viewed at the shape each frame needs, so
+motion-gated crops of varying size reuse the same memory and only a frame
+larger than any seen before grows them.
+
+A context belongs to one thread: ``thread_context()`` hands each recognition
+worker its own. The buffers are overwritten by the next frame, so anything
+that outlives the call (boxes, names, distances) is returned as a fresh
+compact array rather than a view.
+"""
+import threading
+
+import cv2
+import numpy as np
+
+from face_cache import ENCODING_DIM
+
+MAX_FACES = 16  # Initial rows of the encoding buffer; grows if a frame has more faces
+GROWTH = 1.25  # Headroom when a buffer has to grow, so slowly growing crops do not reallocate each time
+MAX_CACHED_VIEWS = 64  # Motion crops change shape often; views are cheap to recreate
+
+NO_FACES = np.empty((0, 4), dtype=np.int32)
+NO_FACES.flags.writeable = False
+
+
+class FrameContext:
+    """Preallocated resize / color-convert / encoding buffers for one recognition thread"""
+
+    def __init__(self, max_faces=MAX_FACES):
+        self._small = np.empty(0, dtype=np.uint8)
+        self._rgb = np.empty(0, dtype=np.uint8)
+        self._encodings = np.empty((max_faces, ENCODING_DIM), dtype=np.float32)
+        self._views = {}  # {(buffer name, shape): view}; frames from one camera keep the same shape
+        self.allocations = 0  # Times a buffer had to grow
+
+    def _view(self, name, shape):
+        view = self._views.get((name, shape))
+        if view is not None:
+            return view
+        size = 1
+        for n in shape:
+            size *= n
+        buffer = getattr(self, name)
+        if buffer.size < size:
+            buffer = np.empty(int(size * GROWTH), dtype=np.uint8)
+            setattr(self, name, buffer)
+            self.allocations += 1
+            self._views.clear()  # Views of the old buffer must not be handed out again
+        if len(self._views) >= MAX_CACHED_VIEWS:
+            self._views.clear()
+        view = self._views[(name, shape)] = buffer[:size].reshape(shape)
+        return view
+
+    def resize(self, frame, scale):
+        """``cv2.resize(frame, fx=scale, fy=scale)`` into the reusable small-frame buffer"""
+        # dsize stays (0, 0) so OpenCV samples with exactly fx/fy, as the allocating call does;
+        # ``dst`` has the size it computes (round(width * scale)), so it is written in place
+        height, width = frame.shape[:2]
+        dst = self._view("_small", (round(height * scale), round(width * scale)) + frame.shape[2:])
+        return cv2.resize(frame, (0, 0), dst=dst, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
+
+    def to_rgb(self, bgr):
+        """BGR to RGB into the reusable RGB buffer"""
+        return cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB, dst=self._view("_rgb", bgr.shape))
+
+    def encodings(self, encodings):
+        """Copy a list of face encodings into the reusable float32 matrix; returns the filled rows"""
+        count = len(encodings)
+        if count > len(self._encodings):
+            self._encodings = np.empty((int(count * GROWTH) + 1, ENCODING_DIM), dtype=np.float32)
+            self.allocations += 1
+        matrix = self._encodings[:count]
+        matrix[:] = encodings
+        return matrix
+
+
+def face_boxes(face_locations):
+    """Detector boxes as one (n, 4) int32 array of (top, right, bottom, left)"""
+    if not len(face_locations):
+        return NO_FACES
+    return np.array(face_locations, dtype=np.int32).reshape(-1, 4)
+
+
+def map_boxes(boxes, scale, x0, y0, out_scale=0.25, rounded=True):
+    """Map boxes found in a crop at ``scale`` (offset x0, y0) to frame coordinates at ``out_scale``"""
+    mapped = boxes * (out_scale / scale)
+    if x0 or y0:
+        mapped += (y0 * out_scale, x0 * out_scale, y0 * out_scale, x0 * out_scale)
+    if not rounded:
+        return mapped
+    return np.rint(mapped, out=mapped).astype(np.int32)
+
+
+_local = threading.local()
+
+
+def thread_context():
+    """The calling thread's FrameContext, created on first use"""
+    context = getattr(_local, "context", None)
+    if context is None:
+        context = _local.context = FrameContext()
+    return context
@@ -0,0 +1,352 @@
+# gallery.py
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+from face_cache import ENCODING_DIM
+
+DEFAULT_TOP_K = 1
+IVF_MIN_GALLERY_SIZE = 20000  # Below this a full scan is already sub-millisecond
+GALLERY_PRECISION = os.environ.get("ATTENDANCE_GALLERY_PRECISION", "float32")  # float32, float16 (memory only, slower) or int8
+QUANTIZED_SHORTLIST = 32  # Candidates per query re-ranked against the full-precision rows
+QUANTIZED_CHUNK_ROWS = 1024  # Quantized rows widened to float32 at a time while scoring
+SHARED_ALIGNMENT = 64  # Byte alignment of each array in a SharedGallery block
+
+
+def _top_k(distances, k):
+    """Return (indices, distances) of the k smallest values in each row, sorted ascending"""
+    k = min(k, distances.shape[1])
+    if k == distances.shape[1]:
+        idx = np.argsort(distances, axis=1)
+    else:
+        idx = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        order = np.argsort(np.take_along_axis(distances, idx, axis=1), axis=1)
+        idx = np.take_along_axis(idx, order, axis=1)
+    return idx, np.take_along_axis(distances, idx, axis=1)
+
+
+def pairwise_distances(queries, matrix, matrix_sq_norms):
+    """Euclidean distances between each query row and each matrix row.
+
+    Uses ||q - g||^2 = ||q||^2 + ||g||^2 - 2 q.g so the whole frame is one GEMM.
+    """
+    query_sq_norms = np.einsum("ij,ij->i", queries, queries)[:, None]
+    sq = query_sq_norms + matrix_sq_norms[None, :] - 2.0 * (queries @ matrix.T)
+    np.maximum(sq, 0.0, out=sq)
+    return np.sqrt(sq, out=sq)
+
+
+class ExactIndex:
+    """Brute-force search over the full gallery matrix.
+
+    Every index can hand out what ``build`` computed as ``arrays()`` and
+    take it back with ``restore``, so SharedGallery builds it only once.
+    """
+
+    def build(self, matrix, sq_norms):
+        self.matrix = matrix
+        self.sq_norms = sq_norms
+
+    def arrays(self):
+        return {}
+
+    def restore(self, matrix, sq_norms, arrays):
+        self.build(matrix, sq_norms)
+
+    def search(self, queries, k):
+        return _top_k(pairwise_distances(queries, self.matrix, self.sq_norms), k)
+
+
+class IVFIndex:
+    """Inverted-file index: k-means coarse quantizer with exact re-ranking.
+
+    Each query is compared against ``nlist`` centroids, the rows of the
+    ``nprobe`` closest clusters are gathered, and only those candidates are
+    scored exactly. Search cost is roughly ``nprobe / nlist`` of a full scan.
+    """
+
+    def __init__(self, nlist=None, nprobe=8, iterations=10, seed=0):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.iterations = iterations
+        self.seed = seed
+
+    def build(self, matrix, sq_norms):
+        self.matrix = matrix
+        self.sq_norms = sq_norms
+        n = matrix.shape[0]
+        nlist = self.nlist or max(1, int(np.sqrt(n)))
+        nlist = min(nlist, n)
+
+        rng = np.random.default_rng(self.seed)
+        centroids = matrix[rng.choice(n, nlist, replace=False)].copy()
+        for _ in range(self.iterations):
+            assign = self._assign(matrix, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, matrix)
+            counts = np.bincount(assign, minlength=nlist)
+            non_empty = counts > 0
+            centroids[non_empty] = sums[non_empty] / counts[non_empty, None]
+
+        assign = self._assign(matrix, centroids)
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(nlist + 1))
+        self.restore(matrix, sq_norms, {
+            "centroids": centroids,
+            "centroid_sq_norms": np.einsum("ij,ij->i", centroids, centroids),
+            "order": order,
+            "bounds": bounds,
+        })
+
+    def arrays(self):
+        return {"centroids": self.centroids, "centroid_sq_norms": self.centroid_sq_norms,
+                "order": self.order, "bounds": self.bounds}
+
+    def restore(self, matrix, sq_norms, arrays):
+        self.matrix = matrix
+        self.sq_norms = sq_norms
+        self.centroids = arrays["centroids"]
+        self.centroid_sq_norms = arrays["centroid_sq_norms"]
+        self.order = arrays["order"]  # Row ids grouped by cluster
+        self.bounds = arrays["bounds"]
+        self.lists = [self.order[self.bounds[c]:self.bounds[c + 1]] for c in range(len(self.centroids))]
+
+    def _assign(self, matrix, centroids):
+        centroid_sq_norms = np.einsum("ij,ij->i", centroids, centroids)
+        # Row norms are constant per row, so they do not affect the argmin
+        scores = centroid_sq_norms[None, :] - 2.0 * (matrix @ centroids.T)
+        return np.argmin(scores, axis=1)
+
+    def search(self, queries, k):
+        nprobe = min(self.nprobe, len(self.lists))
+        coarse = pairwise_distances(queries, self.centroids, self.centroid_sq_norms)
+        probe, _ = _top_k(coarse, nprobe)
+
+        indices = np.full((len(queries), k), -1, dtype=np.int64)
+        distances = np.full((len(queries), k), np.inf, dtype=self.matrix.dtype)
+        for q, clusters in enumerate(probe):
+            candidates = np.concatenate([self.lists[c] for c in clusters])
+            if candidates.size == 0:
+                continue
+            d = pairwise_distances(
+                queries[q:q + 1], self.matrix[candidates], self.sq_norms[candidates]
+            )
+            idx, dist = _top_k(d, k)
+            indices[q, :idx.shape[1]] = candidates[idx[0]]
+            distances[q, :dist.shape[1]] = dist[0]
+        return indices, distances
+
+
+class QuantizedIndex:
+    """Compact copy of the gallery for scoring, with exact re-ranking.
+
+    The rows are stored as float16 (256 bytes each) or as int8 with one
+    float32 scale per row (132 bytes). Every query is scored against the
+    compact rows, and the ``shortlist`` best candidates are then scored
+    exactly against the full-precision matrix. That matrix can stay
+    memory-mapped on disk: after ``build`` only the shortlisted rows are
+    read. The exact squared norms are kept, so tombstoned rows (infinite
+    norm) are never shortlisted.
+
+    float16 is a memory-only trade-off: NumPy widens float16 slowly, so it
+    matches about 2.5x slower than float32. int8 is smaller and about as fast.
+    """
+
+    def __init__(self, precision="float16", shortlist=QUANTIZED_SHORTLIST, chunk_rows=QUANTIZED_CHUNK_ROWS):
+        if precision not in ("float16", "int8"):
+            raise ValueError(f"Unknown quantized precision {precision!r}; use float16 or int8")
+        self.precision = precision
+        self.shortlist = shortlist
+        self.chunk_rows = chunk_rows
+
+    def build(self, matrix, sq_norms):
+        self.matrix = matrix
+        self.sq_norms = sq_norms
+        n = matrix.shape[0]
+        self.codes = np.empty((n, ENCODING_DIM), dtype=np.float16 if self.precision == "float16" else np.int8)
+        self.scales = np.ones(n, dtype=np.float32) if self.precision == "int8" else None
+        for start in range(0, n, self.chunk_rows):
+            block = np.asarray(matrix[start:start + self.chunk_rows], dtype=np.float32)
+            end = start + len(block)
+            if self.scales is None:
+                self.codes[start:end] = block
+                continue
+            scales = np.abs(block).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            self.scales[start:end] = scales
+            self.codes[start:end] = np.rint(block / scales[:, None])
+
+    def arrays(self):
+        arrays = {"codes": self.codes}
+        if self.scales is not None:
+            arrays["scales"] = self.scales
+        return arrays
+
+    def restore(self, matrix, sq_norms, arrays):
+        self.matrix = matrix
+        self.sq_norms = sq_norms
+        self.codes = arrays["codes"]
+        self.scales = arrays.get("scales")
+
+    @property
+    def nbytes(self):
+        """Resident bytes of the compact rows, scales and norms"""
+        scales = 0 if self.scales is None else self.scales.nbytes
+        return self.codes.nbytes + scales + np.asarray(self.sq_norms).nbytes
+
+    def approximate_distances(self, queries):
+        """Squared distances from each query to every row, computed on the compact rows"""
+        n = self.codes.shape[0]
+        query_sq_norms = np.einsum("ij,ij->i", queries, queries)[:, None]
+        sq = np.empty((len(queries), n), dtype=np.float32)
+        for start in range(0, n, self.chunk_rows):
+            end = min(start + self.chunk_rows, n)
+            dots = queries @ self.codes[start:end].astype(np.float32).T
+            if self.scales is not None:
+                dots *= self.scales[start:end]
+            sq[:, start:end] = query_sq_norms + self.sq_norms[start:end] - 2.0 * dots
+        return sq
+
+    def search(self, queries, k):
+        shortlist = min(max(k, self.shortlist), self.codes.shape[0])
+        candidates, _ = _top_k(self.approximate_distances(queries), shortlist)
+        candidates.sort(axis=1)  # Ascending row order reads a memory-mapped matrix sequentially
+        k = min(k, shortlist)
+        indices = np.empty((len(queries), k), dtype=np.int64)
+        distances = np.empty((len(queries), k), dtype=np.float32)
+        for q, rows in enumerate(candidates):
+            rows_matrix = np.asarray(self.matrix[rows], dtype=np.float32)
+            d = pairwise_distances(queries[q:q + 1], rows_matrix, self.sq_norms[rows])
+            idx, dist = _top_k(d, k)
+            indices[q] = rows[idx[0]]
+            distances[q] = dist[0]
+        return indices, distances
+
+
+class Gallery:
+    """Known encodings held as one contiguous float32 matrix with precomputed norms.
+
+    All faces in a frame are matched with a single batched call to ``search``.
+    The search strategy is pluggable: pass an ``IVFIndex`` for large galleries,
+    otherwise every query is compared against every row. A float32
+    C-contiguous ``encodings`` array (and ``sq_norms``) is used without copying.
+    ``built`` skips ``index.build`` for an index that was already restored.
+    """
+
+    def __init__(self, encodings, names, index=None, sq_norms=None, built=False):
+        self.names = list(names)
+        self.matrix = np.ascontiguousarray(
+            np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        )
+        if sq_norms is None:
+            sq_norms = np.einsum("ij,ij->i", self.matrix, self.matrix)
+        self.sq_norms = sq_norms
+        self.index = index or ExactIndex()
+        if len(self) and not built:
+            self.index.build(self.matrix, self.sq_norms)
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def search(self, encodings, k=DEFAULT_TOP_K):
+        """Return (indices, distances), each of shape (n_queries, k), nearest first"""
+        queries = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        if len(queries) == 0 or len(self) == 0:
+            shape = (len(queries), 0)
+            return np.empty(shape, dtype=np.int64), np.empty(shape, dtype=np.float32)
+        return self.index.search(queries, k)
+
+    def top_k(self, encodings, k=5):
+        """Return a list per query of [(name, distance), ...] candidates"""
+        indices, distances = self.search(encodings, k)
+        return [
+            [(self.names[i], float(d)) for i, d in zip(row_idx, row_dist) if i >= 0]
+            for row_idx, row_dist in zip(indices, distances)
+        ]
+
+    def match(self, encodings, tolerance):
+        """Return (names, distances) of the best match per query; None where above tolerance"""
+        indices, distances = self.search(encodings, 1)
+        names = []
+        best = []
+        for row_idx, row_dist in zip(indices, distances):
+            if row_idx.size and row_idx[0] >= 0 and row_dist[0] < tolerance:
+                names.append(self.names[row_idx[0]])
+            else:
+                names.append(None)
+            best.append(float(row_dist[0]) if row_dist.size else float("inf"))
+        return names, best
+
+
+def build_gallery(encodings, names, sq_norms=None, precision=None):
+    """Build a Gallery, switching to an IVF index once the gallery is large.
+
+    With ``precision`` (default GALLERY_PRECISION) set to float16 or int8 the
+    gallery is searched through a QuantizedIndex instead. Pass a float32
+    memory-mapped matrix (FaceEncodingCache.float32_matrix) to keep the
+    full-precision rows on disk.
+    """
+    precision = precision or GALLERY_PRECISION
+    return Gallery(encodings, names, index=_gallery_index(len(names), precision), sq_norms=sq_norms)
+
+
+def _gallery_index(count, precision):
+    """The (unbuilt) index build_gallery uses for ``count`` rows at ``precision``"""
+    if precision != "float32":
+        return QuantizedIndex(precision)
+    if count >= IVF_MIN_GALLERY_SIZE:
+        return IVFIndex()
+    return None
+
+
+class SharedGallery:
+    """Gallery matrix, norms and built index in one shared-memory block for worker processes.
+
+    The owning process builds the gallery once (quantized codes, IVF
+    clusters) and copies every array into the block; workers call
+    ``attach(handle)`` and get a Gallery whose arrays are read-only views of
+    it, so N workers hold one copy and never rebuild the index. The owner
+    must ``close()`` it, which also frees the block.
+    """
+
+    def __init__(self, encodings, names, precision=None):
+        precision = precision or GALLERY_PRECISION
+        gallery = build_gallery(encodings, names, precision=precision)
+        arrays = {"matrix": gallery.matrix, "sq_norms": gallery.sq_norms}
+        if len(gallery):
+            arrays.update((f"index.{key}", value) for key, value in gallery.index.arrays().items())
+
+        layout = []
+        size = 0
+        for key, value in arrays.items():
+            layout.append((key, value.dtype.str, value.shape, size))
+            size += -(-value.nbytes // SHARED_ALIGNMENT) * SHARED_ALIGNMENT
+        self._shm = shared_memory.SharedMemory(create=True, size=max(1, size))
+        for key, view in self._views(self._shm, layout).items():
+            view[...] = arrays[key]
+        self.handle = (self._shm.name, layout, precision, list(names))
+
+    @staticmethod
+    def _views(shm, layout):
+        return {
+            key: np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+            for key, dtype, shape, offset in layout
+        }
+
+    @staticmethod
+    def attach(handle):
+        """Return (gallery, shm) for a handle; keep ``shm`` referenced while the gallery is used"""
+        name, layout, precision, names = handle
+        shm = shared_memory.SharedMemory(name=name)
+        views = SharedGallery._views(shm, layout)
+        for view in views.values():
+            view.flags.writeable = False
+        matrix, norms = views.pop("matrix"), views.pop("sq_norms")
+        index = _gallery_index(len(names), precision) or ExactIndex()
+        if len(names):
+            index.restore(matrix, norms, {key[len("index."):]: view for key, view in views.items()})
+        return Gallery(matrix, names, index=index, sq_norms=norms, built=True), shm
+
+    def close(self):
+        self._shm.close()
+        self._shm.unlink()
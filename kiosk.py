@@ -0,0 +1,72 @@
+# kiosk.py
+from collections import deque
+from datetime import datetime
+
+from metrics import metrics
+from voting import EVENT_COOLDOWN, VOTE_WINDOW, AttendanceVoter
+
+RECENT_MARKS = 10  # Names listed on the kiosk page
+
+
+class KioskSession:
+    """Continuous attendance: everyone in view is voted on independently.
+
+    A person is marked as soon as they reach ``min_votes`` confident matches
+    within the vote window, and not again until ``cooldown`` has passed, so
+    a queue of students can walk past one camera without pressing anything.
+    ``mark_fn(name)`` queues the mark (e.g. ``RecognitionPipeline.persist``).
+    """
+
+    def __init__(self, mark_fn, min_votes, window=VOTE_WINDOW, cooldown=EVENT_COOLDOWN):
+        self.mark_fn = mark_fn
+        self.voter = AttendanceVoter(min_votes=min_votes, window=window, cooldown=cooldown)
+        self.started = datetime.now()
+        self.marked = 0
+        self.recent = deque(maxlen=RECENT_MARKS)  # (time, name), newest last
+
+    def observe_matches(self, names, distances, now=None):
+        """Count one frame's matches; returns the names marked by it"""
+        now = now or datetime.now()
+        return [
+            name for name, distance in zip(names, distances)
+            if name is not None and self.voter.vote(name, now, distance) and self._mark(name, now)
+        ]
+
+    def observe_tracks(self, votes, now=None, retire=None):
+        """Tracking mode: mark identities whose track holds ``min_votes``; returns the names marked
+
+        ``retire(name)`` (e.g. ``FaceTracker.retire``) is called for each
+        marked name so its tracks stop voting and a new track is needed to
+        mark it again.
+        """
+        now = now or datetime.now()
+        marked = [
+            name for name, count in votes.items()
+            if count >= self.voter.min_votes and self.voter.confirm(name, now) and self._mark(name, now)
+        ]
+        if retire:
+            for name in marked:
+                retire(name)
+        return marked
+
+    def _mark(self, name, now):
+        self.mark_fn(name)
+        self.marked += 1
+        self.recent.append((now, name))
+        metrics.inc("kiosk_marks")
+        return True
+
+    def elapsed_minutes(self, now=None):
+        return ((now or datetime.now()) - self.started).total_seconds() / 60
+
+    def people_per_minute(self, now=None):
+        minutes = self.elapsed_minutes(now)
+        return self.marked / minutes if minutes > 0 else 0.0
+
+    def summary(self, now=None):
+        now = now or datetime.now()
+        return {
+            "marked": self.marked,
+            "minutes": round(self.elapsed_minutes(now), 1),
+            "people_per_minute": round(self.people_per_minute(now), 2),
+        }
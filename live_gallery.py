@@ -0,0 +1,142 @@
+# live_gallery.py
+"""Gallery that follows the registration change feed while recognition runs.
+
+A LiveGallery wraps the Gallery built at startup. Changes from the
+``gallery_changes`` feed are applied in place:
+
+* add / update: the new encoding is appended to a small exact-search
+  segment, then the student's older rows are tombstoned.
+* remove: the student's rows are tombstoned.
+
+A tombstoned base row gets an infinite squared norm, so every distance to
+it is infinite and it can never match; no index is rebuilt. The appended
+segment is replaced (copy-on-write) rather than mutated, and an update
+appends before it tombstones, so a concurrent ``match`` sees the old
+encoding, the new one, or both, but never neither.
+"""
+import threading
+
+import numpy as np
+
+from face_cache import ENCODING_DIM
+from gallery import _top_k, pairwise_distances
+
+GALLERY_POLL_INTERVAL = 2.0  # Seconds between checks of the change feed
+
+
+class LiveGallery:
+    """Gallery plus an appended segment and tombstones, updated from change records"""
+
+    def __init__(self, gallery, version=0, on_change=None):
+        self.base = gallery
+        self.on_change = on_change  # Called as on_change(op, name) after each applied record
+        if not gallery.sq_norms.flags.writeable:
+            # Shared or memory-mapped norms: keep a private copy to tombstone (4 bytes per row)
+            gallery.sq_norms = np.array(gallery.sq_norms)
+            gallery.index.sq_norms = gallery.sq_norms
+        self.version = version
+        self._rows = {}  # {name: [base rows]}
+        for row, name in enumerate(gallery.names):
+            self._rows.setdefault(name, []).append(row)
+        # Appended segment, replaced as a whole on every change
+        self._extra = (np.empty((0, ENCODING_DIM), dtype=np.float32), np.empty(0, dtype=np.float32), [])
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self.base) + len(self._extra[2]) - self.tombstoned
+
+    @property
+    def tombstoned(self):
+        return int(np.isinf(self.base.sq_norms).sum())
+
+    def _tombstone(self, name, keep_extra=None):
+        for row in self._rows.pop(name, []):
+            self.base.sq_norms[row] = np.inf
+        matrix, norms, names = self._extra
+        keep = [i for i, n in enumerate(names) if n != name or i == keep_extra]
+        if len(keep) != len(names):
+            self._extra = (matrix[keep], norms[keep], [names[i] for i in keep])
+
+    def _append(self, name, encoding):
+        row = np.asarray(encoding, dtype=np.float32).reshape(1, ENCODING_DIM)
+        matrix, norms, names = self._extra
+        self._extra = (
+            np.vstack([matrix, row]),
+            np.concatenate([norms, np.einsum("ij,ij->i", row, row)]),
+            names + [name],
+        )
+        return len(names)
+
+    def apply(self, version, op, name, encoding=None):
+        """Apply one change record; records at or below the current version are ignored"""
+        with self._lock:
+            if version <= self.version:
+                return
+            if op in ("add", "update"):
+                # Append first so the student is always matchable, then retire older rows
+                self._tombstone(name, keep_extra=self._append(name, encoding))
+            elif op == "remove":
+                self._tombstone(name)
+            self.version = version
+        if self.on_change:
+            self.on_change(op, name)
+
+    def search(self, encodings, k=1):
+        """Return a list per query of up to k (distance, name) pairs, nearest first, over all live rows"""
+        queries = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        matrix, norms, extra_names = self._extra
+        base_idx, base_dist = self.base.search(queries, k)
+        results = []
+        extra_idx = extra_dist = None
+        if len(extra_names):
+            extra_idx, extra_dist = _top_k(pairwise_distances(queries, matrix, norms), k)
+        for q in range(len(queries)):
+            candidates = [
+                (float(d), self.base.names[i])
+                for i, d in zip(base_idx[q], base_dist[q]) if i >= 0 and np.isfinite(d)
+            ]
+            if extra_idx is not None:
+                candidates += [(float(d), extra_names[i]) for i, d in zip(extra_idx[q], extra_dist[q])]
+            candidates.sort()
+            results.append(candidates[:k])
+        return results
+
+    def top_k(self, encodings, k=5):
+        return [[(name, d) for d, name in row] for row in self.search(encodings, k)]
+
+    def match(self, encodings, tolerance):
+        """Return (names, distances) of the best match per query; None where above tolerance"""
+        names, best = [], []
+        for row in self.search(encodings, 1):
+            distance, name = row[0] if row else (float("inf"), None)
+            names.append(name if distance < tolerance else None)
+            best.append(distance)
+        return names, best
+
+    def refresh(self, fetch_changes):
+        """Apply every change newer than the current version; returns how many were applied"""
+        changes = fetch_changes(self.version)
+        for change in changes:
+            self.apply(*change)
+        return len(changes)
+
+    def follow(self, fetch_changes, interval=GALLERY_POLL_INTERVAL):
+        """Poll ``fetch_changes(version)`` on a daemon thread until ``stop()``"""
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.refresh(fetch_changes)
+                except Exception as e:
+                    print(f"❌ Gallery refresh failed: {e}")
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name="gallery-feed", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
@@ -1,21 +1,27 @@
 import streamlit as st
 import os
+import tempfile
+import zipfile
 import pandas as pd
 from datetime import datetime, timedelta
-from docx import Document
-from db_config2 import get_db_connection, insert_default_attendance
-from take_attendace import convert_24_to_12
-import pymysql
+from db_config2 import (
+    get_db_connection, get_attendance_version, insert_default_attendance, attendance_daily_columns, DB_ERRORS,
+)
+from enrollment import (
+    EnrollmentError, bulk_enroll, enroll_student, read_roster, remove_student_face, report_csv,
+)
+from report_export import (
+    ATTENDANCE_COLUMN_NAMES, EXPORT_FORMATS, export_report, format_time_columns,
+    query_attendance_summary, query_student_summary, status_clause,
+)
 
 # Constants
 KNOWN_FACES_DIR = "known_faces"
 ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+PAGE_SIZE = 50
 USERNAME = "admin"
 PASSWORD = "admin"
 
-# Ensure the directory exists
-os.makedirs(KNOWN_FACES_DIR, exist_ok=True)
-
 def handle_user_login():
     """Handle login and ensure attendance is initialized"""
     insert_default_attendance()
@@ -42,44 +48,176 @@ def register_student():
                                       help="Upload a clear frontal face photo")
     
     if st.button("Register", help="Click to register the student"):
-        if not student_name.strip():
+        student_name = student_name.strip()
+        if not student_name:
             st.error("Please enter a student name.")
             return
         if not uploaded_image:
             st.error("Please upload an image.")
             return
             
+        connection = get_db_connection()
+        if connection is None:
+            st.error("Failed to connect to the database.")
+            return
+
         try:
-            # Save the image to the known_faces folder
-            filepath = os.path.join(KNOWN_FACES_DIR, f"{student_name}.jpg")
-            with open(filepath, "wb") as f:
-                uploaded_image.seek(0)
-                f.write(uploaded_image.read())
+            # Encode once here; running attendance sessions pick the change up live
+            uploaded_image.seek(0)
+            with st.spinner("Encoding face..."):
+                op = enroll_student(connection, student_name, uploaded_image.read(), KNOWN_FACES_DIR)
 
-            st.success(f"Student '{student_name}' registered successfully!")
+            filepath = os.path.join(KNOWN_FACES_DIR, f"{student_name}.jpg")
+            if op == "update":
+                st.success(f"Student '{student_name}' re-enrolled with the new photo!")
+            else:
+                st.success(f"Student '{student_name}' registered successfully!")
             st.image(filepath, caption=f"Registered image for {student_name}", use_column_width=True)
+            st.info(f"Student '{student_name}' added to the database.")
+        except EnrollmentError as e:
+            st.error(f"Registration failed: {e}")
+        except DB_ERRORS as e:
+            st.error(f"Failed to insert student into database: {e}")
+        except Exception as e:
+            st.error(f"Registration failed: {str(e)}")
+        finally:
+            connection.close()
 
-            # Insert student into userDetails
+    with st.expander("Remove a student's face"):
+        remove_name = st.text_input("Student name to remove", key="remove_name")
+        if st.button("Remove face", disabled=not remove_name.strip()):
             connection = get_db_connection()
             if connection is None:
                 st.error("Failed to connect to the database.")
                 return
-
             try:
-                with connection.cursor() as cursor:
-                    cursor.execute("""
-                        INSERT INTO userDetails (name) VALUES (%s)
-                        ON DUPLICATE KEY UPDATE name = name;
-                    """, (student_name,))
-
-                st.info(f"Student '{student_name}' added to the database.")
-            except pymysql.Error as e:
-                st.error(f"Failed to insert student into database: {e}")
+                if remove_student_face(connection, remove_name, KNOWN_FACES_DIR):
+                    st.success(f"'{remove_name}' will no longer be recognized.")
+                else:
+                    st.warning(f"No registered photo found for '{remove_name}'.")
+            except EnrollmentError as e:
+                st.error(f"Removal failed: {e}")
+            except DB_ERRORS as e:
+                st.error(f"Failed to publish the removal: {e}")
             finally:
                 connection.close()
 
-        except Exception as e:
-            st.error(f"Registration failed: {str(e)}")
+def bulk_import_students():
+    """Bulk enrollment page: a ZIP of photos plus an optional CSV roster"""
+    st.header("📦 Bulk Import Students")
+    st.caption("Photos are named after the file (e.g. 'Jane Doe.jpg') unless a roster CSV with "
+               "'filename' and 'name' columns is given.")
+
+    archive = st.file_uploader("Photos (ZIP)", type=["zip"])
+    roster_file = st.file_uploader("Roster (CSV, optional)", type=["csv"])
+    workers = st.number_input("Worker processes", min_value=1, max_value=os.cpu_count() or 1,
+                              value=os.cpu_count() or 1)
+
+    if not st.button("Import", disabled=archive is None):
+        return
+
+    try:
+        roster = read_roster(roster_file.getvalue()) if roster_file else None
+    except (EnrollmentError, UnicodeDecodeError) as e:
+        st.error(f"Invalid roster: {e}")
+        return
+
+    connection = get_db_connection()
+    if connection is None:
+        st.error("Failed to connect to the database.")
+        return
+
+    # Worker processes open the archive by path, so spool the upload to a private temp file
+    fd, zip_path = tempfile.mkstemp(suffix=".zip")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            archive.seek(0)
+            f.write(archive.read())
+        progress_bar = st.progress(0)
+        status_text = st.empty()
+
+        def progress(done, total):
+            progress_bar.progress(done / total)
+            status_text.text(f"Encoded {done} of {total} photos")
+
+        report = bulk_enroll(connection, zip_path, roster, KNOWN_FACES_DIR, int(workers), progress)
+    except (EnrollmentError, zipfile.BadZipFile) as e:
+        st.error(f"Import failed: {e}")
+        return
+    except DB_ERRORS as e:
+        st.error(f"Failed to insert students into database: {e}")
+        return
+    finally:
+        connection.close()
+        os.remove(zip_path)
+
+    enrolled = sum(row["status"] != "rejected" for row in report)
+    st.success(f"Enrolled {enrolled} students, rejected {len(report) - enrolled} entries.")
+    report_df = pd.DataFrame(report)
+    if len(report_df):
+        st.dataframe(report_df, use_container_width=True)
+        st.download_button("Download import report", data=report_csv(report),
+                           file_name="bulk_import_report.csv", mime="text/csv")
+
+def _run_query(query, params):
+    conn = get_db_connection()
+    if conn is None:
+        raise ConnectionError("Database connection failed")
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+    finally:
+        conn.close()
+
+# The ``version`` argument of the cached queries below is the attendance
+# change counter: any attendance write bumps it, which misses the cache.
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def fetch_status_options(version):
+    rows = _run_query("SELECT DISTINCT status FROM attendance", ())
+    return sorted(row["status"] for row in rows if row["status"])
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def fetch_attendance_summary(start_date, end_date, statuses, version):
+    """Summary metrics for the range in a single aggregate query"""
+    return query_attendance_summary(start_date, end_date, statuses)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def fetch_student_summary(start_date, end_date, version):
+    """Per-student totals for the range, read from the rollup tables"""
+    return query_student_summary(start_date, end_date)
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def fetch_attendance_page(start_date, end_date, statuses, after, version):
+    """Up to PAGE_SIZE + 1 rows ordered by (date DESC, name ASC), starting after the ``after`` key.
+
+    The extra row only tells the caller that another page follows. The page
+    is picked from the attendance table through its (date, name) index and
+    only its rows are joined to their sessions and aggregated; reading the
+    attendance_daily view instead would aggregate the whole view per page on
+    MySQL. The status filter applies to the stored status, which marking
+    sets to 'Present'.
+    """
+    status_sql, status_params = status_clause(statuses)
+    keyset_sql, keyset_params = "", ()
+    if after is not None:
+        keyset_sql = " AND (date < %s OR (date = %s AND name > %s))"
+        keyset_params = (after[0], after[0], after[1])
+    rows = _run_query(f"""
+        SELECT {attendance_daily_columns()}
+        FROM (
+            SELECT id, name, date, status FROM attendance
+            WHERE date BETWEEN %s AND %s{status_sql}{keyset_sql}
+            ORDER BY date DESC, name ASC
+            LIMIT {PAGE_SIZE + 1}
+        ) a
+        LEFT JOIN userDetails u ON u.name = a.name
+        LEFT JOIN attendance_sessions s ON s.student_id = u.id AND s.date = a.date
+        GROUP BY a.id, a.name, a.date, a.status
+        ORDER BY a.date DESC, a.name ASC
+    """, (start_date, end_date) + status_params + keyset_params)
+    return pd.DataFrame(rows, columns=ATTENDANCE_COLUMN_NAMES)
 
 def view_attendance_data():
     """View and export attendance data"""
@@ -111,106 +249,89 @@ def view_attendance_data():
     if start_date > end_date:
         st.error("Start date cannot be after end date")
         return
-        
-    conn = get_db_connection()
-    if conn:
-        try:
-            with conn.cursor() as cursor:
-                query = """
-                SELECT 
-                    name, date, 
-                    entry1_in, entry1_out, entry1_hours,
-                    entry2_in, entry2_out, entry2_hours,
-                    entry3_in, entry3_out, entry3_hours,
-                    entry4_in, entry4_out, entry4_hours,
-                    entry5_in, entry5_out, entry5_hours,
-                    total_hours, status
-                FROM attendance
-                WHERE date BETWEEN %s AND %s
-                ORDER BY date DESC, name ASC
-                """
-                cursor.execute(query, (start_date, end_date))
-                rows = cursor.fetchall()
-                
-                if rows:
-                    df = pd.DataFrame(rows)
-                    
-                    # Convert 24-hour format to 12-hour format for display
-                    time_columns = [
-                        'entry1_in', 'entry1_out', 'entry2_in', 'entry2_out',
-                        'entry3_in', 'entry3_out', 'entry4_in', 'entry4_out',
-                        'entry5_in', 'entry5_out'
-                    ]
-                    for col in time_columns:
-                        if col in df.columns:
-                            df[col] = df[col].apply(lambda x: convert_24_to_12(x) if x else "")
-                    
-                    selected_status = st.multiselect(
-                        "Filter by Status",
-                        options=sorted(df['status'].unique()),
-                        default=[]
-                    )
-                    
-                    if selected_status:
-                        df = df[df['status'].isin(selected_status)]
-                    
-                    st.dataframe(df, use_container_width=True)
-                    
-                    st.subheader("Summary Statistics")
-                    col1, col2, col3, col4 = st.columns(4)
-                    with col1:
-                        st.metric("Total Students", len(df['name'].unique()))
-                    with col2:
-                        st.metric("Total Days", len(df['date'].unique()))
-                    with col3:
-                        present_count = len(df[df['status'] == 'Present'])
-                        st.metric("Total Present", present_count)
-                    with col4:
-                        attendance_rate = (present_count / len(df) * 100) if len(df) > 0 else 0
-                        st.metric("Attendance Rate", f"{attendance_rate:.1f}%")
-                    
-                    export_format = st.selectbox("Export Format:", ["Excel", "CSV", "Word"])
-                    
-                    if st.button("Generate Report"):
-                        generate_report(df, export_format, start_date, end_date)
-                else:
-                    st.info("No records found for the selected date range")
-                    
-        except Exception as e:
-            st.error(f"Error fetching records: {str(e)}")
-        finally:
-            conn.close()
-    else:
+
+    version = get_attendance_version()
+    if version is None:
         st.error("Database connection failed")
+        return
+
+    try:
+        selected_status = st.multiselect(
+            "Filter by Status",
+            options=fetch_status_options(version),
+            default=[]
+        )
+        statuses = tuple(sorted(selected_status))
+
+        summary = fetch_attendance_summary(start_date, end_date, statuses, version)
+        if not summary["total_rows"]:
+            st.info("No records found for the selected date range")
+            return
+
+        # Keyset pagination: remember the last (date, name) of every page visited
+        filter_key = (start_date, end_date, statuses)
+        if st.session_state.get("page_filter") != filter_key:
+            st.session_state.page_filter = filter_key
+            st.session_state.page_keys = [None]
+        page_keys = st.session_state.page_keys
+
+        df = fetch_attendance_page(start_date, end_date, statuses, page_keys[-1], version)
+        has_next = len(df) > PAGE_SIZE
+        df = df.iloc[:PAGE_SIZE]
+        st.dataframe(format_time_columns(df), use_container_width=True)
+
+        page_count = -(-summary["total_rows"] // PAGE_SIZE)
+        col1, col2, col3 = st.columns([1, 1, 4])
+        with col1:
+            if st.button("◀ Previous", disabled=len(page_keys) == 1):
+                page_keys.pop()
+                st.rerun()
+        with col2:
+            if st.button("Next ▶", disabled=not has_next):
+                last = df.iloc[-1]
+                page_keys.append((last["date"], last["name"]))
+                st.rerun()
+        with col3:
+            st.caption(f"Page {len(page_keys)} of {page_count} ({summary['total_rows']} rows)")
+
+        st.subheader("Summary Statistics")
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Total Students", summary["students"])
+        with col2:
+            st.metric("Total Days", summary["days"])
+        with col3:
+            st.metric("Total Present", summary["present"])
+        with col4:
+            attendance_rate = summary["present"] / summary["total_rows"] * 100
+            st.metric("Attendance Rate", f"{attendance_rate:.1f}%")
+
+        if st.checkbox("Show per-student summary"):
+            st.dataframe(fetch_student_summary(start_date, end_date, version), use_container_width=True)
+
+        export_format = st.selectbox("Export Format:", list(EXPORT_FORMATS))
+
+        if st.button("Generate Report"):
+            generate_report(export_format, start_date, end_date, statuses)
+
+    except Exception as e:
+        st.error(f"Error fetching records: {str(e)}")
 
-def generate_report(df, export_format, start_date, end_date):
+def generate_report(export_format, start_date, end_date, statuses=()):
     """Generate attendance report in specified format"""
     try:
-        if export_format == "Excel":
-            df.to_excel("Attendance_Report.xlsx", index=False)
-            with open("Attendance_Report.xlsx", "rb") as f:
-                st.download_button("Download Excel Report", data=f, file_name=f"Attendance_Report_{start_date}to{end_date}.xlsx")
-        
-        elif export_format == "CSV":
-            csv = df.to_csv(index=False)
-            st.download_button("Download CSV Report", data=csv, file_name=f"Attendance_Report_{start_date}to{end_date}.csv")
-        
-        else:  # Word format
-            doc = Document()
-            doc.add_heading(f"Attendance Report ({start_date} to {end_date})", 0)
-            doc.add_heading("Summary", level=1)
-            doc.add_paragraph(f"Total Students: {len(df['name'].unique())}")
-            doc.add_paragraph(f"Total Days: {len(df['date'].unique())}")
-            doc.add_paragraph(f"Total Present: {len(df[df['status'] == 'Present'])}")
-            doc.save("Attendance_Report.docx")
-            with open("Attendance_Report.docx", "rb") as f:
-                st.download_button("Download Word Report", data=f, file_name=f"Attendance_Report_{start_date}to{end_date}.docx")
+        with st.spinner("Generating report..."):
+            buffer, file_name, mime = export_report(export_format, start_date, end_date, statuses)
+        with buffer:
+            st.download_button(f"Download {export_format} Report", data=buffer.read(),
+                               file_name=file_name, mime=mime)
     except Exception as e:
         st.error(f"Error generating report: {str(e)}")
 
 def main():
     """Main function"""
     st.set_page_config(page_title="Manage Students", layout="wide")
+    os.makedirs(KNOWN_FACES_DIR, exist_ok=True)
     if 'logged_in' not in st.session_state:
         st.session_state.logged_in = False
 
@@ -218,9 +339,11 @@ def main():
         login()
     else:
         st.title("Manage Students")
-        page = st.sidebar.selectbox("Choose a page:", ["Register Students", "View Attendance Data"])
+        page = st.sidebar.selectbox("Choose a page:", ["Register Students", "Bulk Import", "View Attendance Data"])
         if page == "Register Students":
             register_student()
+        elif page == "Bulk Import":
+            bulk_import_students()
         else:
             view_attendance_data()
 
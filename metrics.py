@@ -0,0 +1,233 @@
+# metrics.py
+"""Low-overhead counters and per-stage latency histograms for the recognition loop.
+
+Stages are timed with a stopwatch that records the time since the previous
+lap into a fixed-bucket histogram, so recording is a bisect and an add.
+Only every SAMPLE_EVERY-th stopwatch actually times anything (the others
+are a shared no-op), which keeps the cost negligible in production.
+Counters are always exact.
+
+Snapshots are available as JSON or Prometheus text, from ``snapshot()`` /
+``prometheus_text()``, a file (``write_snapshot``), or a small HTTP
+endpoint (``serve_metrics``; GET /metrics or /metrics.json).
+"""
+import itertools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds of the latency buckets in milliseconds; a final +Inf bucket is implied
+BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+SAMPLE_EVERY = max(1, int(os.environ.get("ATTENDANCE_METRICS_SAMPLE_EVERY", "1")))
+METRICS_PORT = os.environ.get("ATTENDANCE_METRICS_PORT")  # Serve /metrics on this port when set
+METRICS_FILE = os.environ.get("ATTENDANCE_METRICS_FILE")  # Write snapshots here when set (.json or text)
+METRICS_PREFIX = "attendance"
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (milliseconds)"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, ms):
+        index = bisect_left(BUCKETS_MS, ms)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum_ms += ms
+            if ms > self.max_ms:
+                self.max_ms = ms
+
+    def quantile(self, q, counts=None, count=None, max_ms=None):
+        """Bucket upper bound at quantile ``q`` (the observed max for the +Inf bucket)"""
+        counts = counts or self.counts
+        count = self.count if count is None else count
+        if not count:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for bound, n in zip(BUCKETS_MS, counts):
+            seen += n
+            if seen >= rank:
+                return float(bound)
+        return self.max_ms if max_ms is None else max_ms
+
+    def snapshot(self):
+        with self._lock:
+            counts, count, sum_ms, max_ms = list(self.counts), self.count, self.sum_ms, self.max_ms
+        return {
+            "count": count,
+            "sum_ms": round(sum_ms, 3),
+            "avg_ms": round(sum_ms / count, 3) if count else 0.0,
+            "max_ms": round(max_ms, 3),
+            "p50_ms": self.quantile(0.5, counts, count, max_ms),
+            "p90_ms": self.quantile(0.9, counts, count, max_ms),
+            "p99_ms": self.quantile(0.99, counts, count, max_ms),
+            "buckets": counts,
+        }
+
+
+class Stopwatch:
+    """Records the time since the previous lap (or creation) under each stage name"""
+
+    __slots__ = ("registry", "last")
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.last = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.registry.observe(stage, (now - self.last) * 1000)
+        self.last = now
+
+    def reset(self):
+        self.last = time.perf_counter()
+
+
+class _NullStopwatch:
+    """Stopwatch handed out for unsampled frames; laps cost one method call"""
+
+    __slots__ = ()
+
+    def lap(self, stage):
+        pass
+
+    def reset(self):
+        pass
+
+
+NULL_STOPWATCH = _NullStopwatch()
+
+
+class MetricsRegistry:
+    """Named counters and stage histograms shared by every thread of the process"""
+
+    def __init__(self, sample_every=SAMPLE_EVERY):
+        self.sample_every = max(1, sample_every)
+        self.started = time.time()
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._ticks = itertools.count()
+
+    def histogram(self, stage):
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(stage, Histogram())
+        return histogram
+
+    def observe(self, stage, ms):
+        self.histogram(stage).observe(ms)
+
+    def inc(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def stopwatch(self):
+        """A stopwatch for one frame: real for one in ``sample_every`` calls, a no-op otherwise"""
+        if self.sample_every == 1 or next(self._ticks) % self.sample_every == 0:
+            return Stopwatch(self)
+        return NULL_STOPWATCH
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self.started = time.time()
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = dict(self._histograms)
+        return {
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "sample_every": self.sample_every,
+            "bucket_bounds_ms": list(BUCKETS_MS),
+            "counters": counters,
+            "stages": {stage: h.snapshot() for stage, h in sorted(histograms.items())},
+        }
+
+    def prometheus_text(self, prefix=METRICS_PREFIX):
+        snap = self.snapshot()
+        lines = []
+        for name, value in sorted(snap["counters"].items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        metric = f"{prefix}_stage_seconds"
+        lines.append(f"# HELP {metric} Sampled stage latency (1 in {snap['sample_every']} frames)")
+        lines.append(f"# TYPE {metric} histogram")
+        for stage, h in snap["stages"].items():
+            cumulative = 0
+            for bound, n in zip(BUCKETS_MS + (None,), h["buckets"]):
+                cumulative += n
+                le = "+Inf" if bound is None else repr(bound / 1000)
+                lines.append(f'{metric}_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{stage="{stage}"}} {h["sum_ms"] / 1000}')
+            lines.append(f'{metric}_count{{stage="{stage}"}} {h["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def write_snapshot(self, path=None):
+        """Atomically write a JSON (``*.json``) or Prometheus text snapshot to ``path``"""
+        path = path or METRICS_FILE
+        if not path:
+            return
+        if path.endswith(".json"):
+            text = json.dumps(self.snapshot(), indent=2)
+        else:
+            text = self.prometheus_text()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+
+metrics = MetricsRegistry()  # Process-wide registry
+
+
+def _handler_for(registry):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, content_type = registry.prometheus_text(), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body, content_type = json.dumps(registry.snapshot()), "application/json"
+            else:
+                self.send_error(404)
+                return
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass  # Scrapes every few seconds would flood the console
+    return MetricsHandler
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def serve_metrics(port=None, registry=metrics):
+    """Start the /metrics HTTP endpoint in a daemon thread once per process; returns the server"""
+    global _server
+    port = port or METRICS_PORT
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer(("0.0.0.0", int(port)), _handler_for(registry))
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+    return _server
@@ -0,0 +1,129 @@
+-- Migration 001: normalized attendance sessions
+--
+-- Replaces the wide entry1..entry5 VARCHAR columns with one row per in/out
+-- session using native DATETIME values. Marking attendance becomes a single
+-- CALL mark_attendance_session(name, timestamp) that applies the 10-minute
+-- gap rule and in/out toggle atomically. The `attendance` table stays as the
+-- daily roster (one row per student per day, default 'Absent'); the legacy
+-- wide layout is served by the attendance_daily view.
+--
+-- Run once:  mysql attendance_system < migrations/001_attendance_sessions.sql
+
+USE attendance_system;
+
+-- Step 1: Session table
+CREATE TABLE IF NOT EXISTS attendance_sessions (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    student_id INT NOT NULL,
+    date DATE NOT NULL,
+    session_no INT NOT NULL,
+    time_in DATETIME NOT NULL,
+    time_out DATETIME NULL,
+    UNIQUE KEY unique_student_session (student_id, date, session_no),
+    KEY idx_sessions_date (date, student_id),
+    CONSTRAINT fk_sessions_student FOREIGN KEY (student_id) REFERENCES userDetails (id)
+);
+
+-- Step 2: Migrate existing wide rows
+INSERT IGNORE INTO userDetails (name)
+SELECT DISTINCT name FROM attendance;
+
+INSERT IGNORE INTO attendance_sessions (student_id, date, session_no, time_in, time_out)
+SELECT u.id, a.date, s.session_no,
+       TIMESTAMP(a.date, s.time_in),
+       IF(s.time_out IS NULL OR s.time_out = '', NULL, TIMESTAMP(a.date, s.time_out))
+FROM (
+    SELECT id, 1 AS session_no, entry1_in AS time_in, entry1_out AS time_out FROM attendance
+    UNION ALL SELECT id, 2, entry2_in, entry2_out FROM attendance
+    UNION ALL SELECT id, 3, entry3_in, entry3_out FROM attendance
+    UNION ALL SELECT id, 4, entry4_in, entry4_out FROM attendance
+    UNION ALL SELECT id, 5, entry5_in, entry5_out FROM attendance
+) s
+JOIN attendance a ON a.id = s.id
+JOIN userDetails u ON u.name = a.name
+WHERE s.time_in IS NOT NULL AND s.time_in <> '';
+
+-- Step 3: Atomic marking
+DROP PROCEDURE IF EXISTS mark_attendance_session;
+
+DELIMITER //
+
+CREATE PROCEDURE mark_attendance_session(IN p_name VARCHAR(100), IN p_ts DATETIME)
+BEGIN
+    DECLARE v_student INT DEFAULT NULL;
+    DECLARE v_session_no INT DEFAULT 0;
+    DECLARE v_session_id BIGINT DEFAULT NULL;
+    DECLARE v_time_in DATETIME DEFAULT NULL;
+    DECLARE v_time_out DATETIME DEFAULT NULL;
+    DECLARE v_result VARCHAR(20);
+
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    START TRANSACTION;
+
+    -- Locking the student row serializes concurrent marks from several kiosks
+    SELECT id INTO v_student FROM userDetails WHERE name = p_name FOR UPDATE;
+
+    IF v_student IS NULL THEN
+        SET v_result = 'unregistered';
+    ELSE
+        SELECT id, session_no, time_in, time_out
+          INTO v_session_id, v_session_no, v_time_in, v_time_out
+          FROM attendance_sessions
+         WHERE student_id = v_student AND date = DATE(p_ts)
+         ORDER BY session_no DESC
+         LIMIT 1;
+
+        IF v_session_id IS NULL OR (v_time_out IS NOT NULL AND p_ts >= v_time_out + INTERVAL 10 MINUTE) THEN
+            INSERT INTO attendance_sessions (student_id, date, session_no, time_in)
+            VALUES (v_student, DATE(p_ts), v_session_no + 1, p_ts);
+            INSERT INTO attendance (name, date, status)
+            VALUES (p_name, DATE(p_ts), 'Present')
+            ON DUPLICATE KEY UPDATE status = 'Present';
+            SET v_result = 'in';
+        ELSEIF v_time_out IS NULL AND p_ts >= v_time_in + INTERVAL 10 MINUTE THEN
+            UPDATE attendance_sessions SET time_out = p_ts WHERE id = v_session_id;
+            SET v_result = 'out';
+        ELSE
+            SET v_result = 'too_soon';
+        END IF;
+    END IF;
+
+    COMMIT;
+    SELECT v_result AS result, v_session_no + (v_result = 'in') AS session_no;
+END //
+
+DELIMITER ;
+
+-- Step 4: Legacy wide layout and total_hours, derived from sessions
+CREATE OR REPLACE VIEW attendance_daily AS
+SELECT
+    a.name,
+    a.date,
+    MAX(CASE WHEN s.session_no = 1 THEN TIME_FORMAT(s.time_in, '%H:%i:%s') END) AS entry1_in,
+    MAX(CASE WHEN s.session_no = 1 THEN TIME_FORMAT(s.time_out, '%H:%i:%s') END) AS entry1_out,
+    MAX(CASE WHEN s.session_no = 1 THEN TIMEDIFF(s.time_out, s.time_in) END) AS entry1_hours,
+    MAX(CASE WHEN s.session_no = 2 THEN TIME_FORMAT(s.time_in, '%H:%i:%s') END) AS entry2_in,
+    MAX(CASE WHEN s.session_no = 2 THEN TIME_FORMAT(s.time_out, '%H:%i:%s') END) AS entry2_out,
+    MAX(CASE WHEN s.session_no = 2 THEN TIMEDIFF(s.time_out, s.time_in) END) AS entry2_hours,
+    MAX(CASE WHEN s.session_no = 3 THEN TIME_FORMAT(s.time_in, '%H:%i:%s') END) AS entry3_in,
+    MAX(CASE WHEN s.session_no = 3 THEN TIME_FORMAT(s.time_out, '%H:%i:%s') END) AS entry3_out,
+    MAX(CASE WHEN s.session_no = 3 THEN TIMEDIFF(s.time_out, s.time_in) END) AS entry3_hours,
+    MAX(CASE WHEN s.session_no = 4 THEN TIME_FORMAT(s.time_in, '%H:%i:%s') END) AS entry4_in,
+    MAX(CASE WHEN s.session_no = 4 THEN TIME_FORMAT(s.time_out, '%H:%i:%s') END) AS entry4_out,
+    MAX(CASE WHEN s.session_no = 4 THEN TIMEDIFF(s.time_out, s.time_in) END) AS entry4_hours,
+    MAX(CASE WHEN s.session_no = 5 THEN TIME_FORMAT(s.time_in, '%H:%i:%s') END) AS entry5_in,
+    MAX(CASE WHEN s.session_no = 5 THEN TIME_FORMAT(s.time_out, '%H:%i:%s') END) AS entry5_out,
+    MAX(CASE WHEN s.session_no = 5 THEN TIMEDIFF(s.time_out, s.time_in) END) AS entry5_hours,
+    CASE WHEN COUNT(s.time_out) > 0
+         THEN SEC_TO_TIME(SUM(TIMESTAMPDIFF(SECOND, s.time_in, s.time_out)))
+    END AS total_hours,
+    CASE WHEN COUNT(s.id) > 0 THEN 'Present' ELSE a.status END AS status
+FROM attendance a
+LEFT JOIN userDetails u ON u.name = a.name
+LEFT JOIN attendance_sessions s ON s.student_id = u.id AND s.date = a.date
+GROUP BY a.id, a.name, a.date, a.status;
@@ -0,0 +1,36 @@
+-- Migration 002: change counter and keyset index for the attendance views
+--
+-- attendance_version holds a single counter bumped by triggers on every
+-- attendance write. The admin UI keys its query cache on it, so cached pages
+-- and summaries are reused until attendance actually changes.
+--
+-- Run once after 001:  mysql attendance_system < migrations/002_attendance_version.sql
+
+USE attendance_system;
+
+CREATE TABLE IF NOT EXISTS attendance_version (
+    id TINYINT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT IGNORE INTO attendance_version (id, version) VALUES (1, 0);
+
+DROP TRIGGER IF EXISTS bump_version_on_session_insert;
+DROP TRIGGER IF EXISTS bump_version_on_session_update;
+DROP TRIGGER IF EXISTS bump_version_on_attendance_insert;
+DROP TRIGGER IF EXISTS bump_version_on_attendance_update;
+
+CREATE TRIGGER bump_version_on_session_insert AFTER INSERT ON attendance_sessions
+FOR EACH ROW UPDATE attendance_version SET version = version + 1 WHERE id = 1;
+
+CREATE TRIGGER bump_version_on_session_update AFTER UPDATE ON attendance_sessions
+FOR EACH ROW UPDATE attendance_version SET version = version + 1 WHERE id = 1;
+
+CREATE TRIGGER bump_version_on_attendance_insert AFTER INSERT ON attendance
+FOR EACH ROW UPDATE attendance_version SET version = version + 1 WHERE id = 1;
+
+CREATE TRIGGER bump_version_on_attendance_update AFTER UPDATE ON attendance
+FOR EACH ROW UPDATE attendance_version SET version = version + 1 WHERE id = 1;
+
+-- Keyset pagination walks (date DESC, name ASC)
+CREATE INDEX idx_attendance_date_name ON attendance (date, name, status);
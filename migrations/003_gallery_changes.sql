@@ -0,0 +1,17 @@
+-- Migration 003: change feed for live gallery updates
+--
+-- Every registration, re-enrollment and removal appends a row with the new
+-- encoding (128 float32 values, 512 bytes). Running recognizers poll for
+-- rows past the last version they applied and patch their gallery in place.
+--
+-- Run once:  mysql attendance_system < migrations/003_gallery_changes.sql
+
+USE attendance_system;
+
+CREATE TABLE IF NOT EXISTS gallery_changes (
+    version BIGINT AUTO_INCREMENT PRIMARY KEY,
+    op ENUM('add', 'update', 'remove') NOT NULL,
+    name VARCHAR(100) NOT NULL,
+    encoding BLOB,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,50 @@
+-- Migration 004: once-per-day roster keyed by student id
+--
+-- roster_days records, per date, the highest userDetails.id that already has
+-- its 'Absent' row. The nightly event and the admin login
+-- (db_config2.ensure_daily_roster) both walk students in id ranges from
+-- there, so each student is inserted once and a repeat run costs two
+-- primary-key lookups. INSERT IGNORE on the (name, date) unique key replaces
+-- the NOT IN anti-join. The roster now comes from userDetails instead of
+-- past attendance rows.
+--
+-- Run once after 003:  mysql attendance_system < migrations/004_daily_roster.sql
+
+USE attendance_system;
+
+CREATE TABLE IF NOT EXISTS roster_days (
+    date DATE PRIMARY KEY,
+    last_student_id INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+DROP PROCEDURE IF EXISTS initialize_daily_attendance;
+
+DELIMITER //
+
+CREATE PROCEDURE initialize_daily_attendance()
+BEGIN
+    DECLARE v_day DATE DEFAULT CURDATE();
+    DECLARE v_chunk INT DEFAULT 5000;  -- Same as db_config2.ROSTER_CHUNK_SIZE
+    DECLARE v_last INT DEFAULT 0;
+    DECLARE v_max INT DEFAULT 0;
+    DECLARE v_upper INT;
+
+    SELECT COALESCE(MAX(id), 0) INTO v_max FROM userDetails;
+    INSERT IGNORE INTO roster_days (date, last_student_id) VALUES (v_day, 0);
+    SELECT last_student_id INTO v_last FROM roster_days WHERE date = v_day;
+
+    WHILE v_last < v_max DO
+        SET v_upper = LEAST(v_last + v_chunk, v_max);
+        INSERT IGNORE INTO attendance (name, date, status)
+        SELECT name, v_day, 'Absent' FROM userDetails WHERE id > v_last AND id <= v_upper;
+        UPDATE roster_days SET last_student_id = v_upper
+        WHERE date = v_day AND last_student_id < v_upper;
+        SET v_last = v_upper;
+    END WHILE;
+END //
+
+DELIMITER ;
+
+-- The daily_attendance_init event from database_face_att.sql keeps calling this
+-- procedure at midnight (it needs event_scheduler=ON on the server).
@@ -0,0 +1,77 @@
+-- Migration 005: per-student daily and weekly attendance rollups
+--
+-- attendance_rollup_daily holds one row per student per day present
+-- (sessions, seconds attended, first in, last out); attendance_rollup_weekly
+-- rolls those up per Monday-to-Sunday week. Triggers on attendance_sessions
+-- re-aggregate the student's day and week after every write, so a mark costs
+-- a handful of primary-key reads and dashboards read a few rows per student
+-- per week instead of every raw attendance row.
+--
+-- Run once after 004:  mysql attendance_system < migrations/005_attendance_rollups.sql
+-- then backfill history:  python rebuild_rollups.py
+
+USE attendance_system;
+
+CREATE TABLE IF NOT EXISTS attendance_rollup_daily (
+    student_id INT NOT NULL,
+    date DATE NOT NULL,
+    sessions INT NOT NULL,
+    total_seconds INT NOT NULL,
+    first_in DATETIME NULL,
+    last_out DATETIME NULL,
+    PRIMARY KEY (student_id, date),
+    KEY idx_rollup_daily_date (date),
+    CONSTRAINT fk_rollup_daily_student FOREIGN KEY (student_id) REFERENCES userDetails (id)
+);
+
+CREATE TABLE IF NOT EXISTS attendance_rollup_weekly (
+    student_id INT NOT NULL,
+    week_start DATE NOT NULL,
+    days_present INT NOT NULL,
+    total_seconds INT NOT NULL,
+    first_in DATETIME NULL,
+    last_out DATETIME NULL,
+    PRIMARY KEY (student_id, week_start),
+    KEY idx_rollup_weekly_week (week_start),
+    CONSTRAINT fk_rollup_weekly_student FOREIGN KEY (student_id) REFERENCES userDetails (id)
+);
+
+DROP PROCEDURE IF EXISTS refresh_attendance_rollup;
+DROP TRIGGER IF EXISTS refresh_rollup_on_session_insert;
+DROP TRIGGER IF EXISTS refresh_rollup_on_session_update;
+DROP TRIGGER IF EXISTS refresh_rollup_on_session_delete;
+
+DELIMITER //
+
+-- Same logic as db_config2.SQLITE_ROLLUP_TRIGGER
+CREATE PROCEDURE refresh_attendance_rollup(IN p_student INT, IN p_date DATE)
+BEGIN
+    DECLARE v_week DATE DEFAULT DATE_SUB(p_date, INTERVAL WEEKDAY(p_date) DAY);
+
+    DELETE FROM attendance_rollup_daily WHERE student_id = p_student AND date = p_date;
+    INSERT INTO attendance_rollup_daily (student_id, date, sessions, total_seconds, first_in, last_out)
+    SELECT student_id, date, COUNT(*),
+           COALESCE(SUM(TIMESTAMPDIFF(SECOND, time_in, time_out)), 0),
+           MIN(time_in), MAX(time_out)
+    FROM attendance_sessions
+    WHERE student_id = p_student AND date = p_date
+    GROUP BY student_id, date;
+
+    DELETE FROM attendance_rollup_weekly WHERE student_id = p_student AND week_start = v_week;
+    INSERT INTO attendance_rollup_weekly (student_id, week_start, days_present, total_seconds, first_in, last_out)
+    SELECT student_id, v_week, COUNT(*), SUM(total_seconds), MIN(first_in), MAX(last_out)
+    FROM attendance_rollup_daily
+    WHERE student_id = p_student AND date BETWEEN v_week AND v_week + INTERVAL 6 DAY
+    GROUP BY student_id;
+END //
+
+DELIMITER ;
+
+CREATE TRIGGER refresh_rollup_on_session_insert AFTER INSERT ON attendance_sessions
+FOR EACH ROW CALL refresh_attendance_rollup(NEW.student_id, NEW.date);
+
+CREATE TRIGGER refresh_rollup_on_session_update AFTER UPDATE ON attendance_sessions
+FOR EACH ROW CALL refresh_attendance_rollup(NEW.student_id, NEW.date);
+
+CREATE TRIGGER refresh_rollup_on_session_delete AFTER DELETE ON attendance_sessions
+FOR EACH ROW CALL refresh_attendance_rollup(OLD.student_id, OLD.date);
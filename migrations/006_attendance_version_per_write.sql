@@ -0,0 +1,108 @@
+-- Migration 006: bump attendance_version once per write instead of once per row
+--
+-- The row triggers from 002 updated the single attendance_version row for
+-- every attendance and session row written. Inside mark_attendance_session's
+-- transaction that row lock serialized the marks of every kiosk, and the
+-- daily roster bumped it once per student. The triggers are dropped: the
+-- marking procedure now bumps the counter once per accepted mark, after its
+-- COMMIT, and the roster procedure once per run that inserted rows. The
+-- application does the same for its own writes (db_config2.bump_attendance_version).
+--
+-- Run once after 005:  mysql attendance_system < migrations/006_attendance_version_per_write.sql
+
+USE attendance_system;
+
+DROP TRIGGER IF EXISTS bump_version_on_session_insert;
+DROP TRIGGER IF EXISTS bump_version_on_session_update;
+DROP TRIGGER IF EXISTS bump_version_on_attendance_insert;
+DROP TRIGGER IF EXISTS bump_version_on_attendance_update;
+
+DROP PROCEDURE IF EXISTS mark_attendance_session;
+DROP PROCEDURE IF EXISTS initialize_daily_attendance;
+
+DELIMITER //
+
+CREATE PROCEDURE mark_attendance_session(IN p_name VARCHAR(100), IN p_ts DATETIME)
+BEGIN
+    DECLARE v_student INT DEFAULT NULL;
+    DECLARE v_session_no INT DEFAULT 0;
+    DECLARE v_session_id BIGINT DEFAULT NULL;
+    DECLARE v_time_in DATETIME DEFAULT NULL;
+    DECLARE v_time_out DATETIME DEFAULT NULL;
+    DECLARE v_result VARCHAR(20);
+
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    START TRANSACTION;
+
+    -- Locking the student row serializes concurrent marks from several kiosks
+    SELECT id INTO v_student FROM userDetails WHERE name = p_name FOR UPDATE;
+
+    IF v_student IS NULL THEN
+        SET v_result = 'unregistered';
+    ELSE
+        SELECT id, session_no, time_in, time_out
+          INTO v_session_id, v_session_no, v_time_in, v_time_out
+          FROM attendance_sessions
+         WHERE student_id = v_student AND date = DATE(p_ts)
+         ORDER BY session_no DESC
+         LIMIT 1;
+
+        IF v_session_id IS NULL OR (v_time_out IS NOT NULL AND p_ts >= v_time_out + INTERVAL 10 MINUTE) THEN
+            INSERT INTO attendance_sessions (student_id, date, session_no, time_in)
+            VALUES (v_student, DATE(p_ts), v_session_no + 1, p_ts);
+            INSERT INTO attendance (name, date, status)
+            VALUES (p_name, DATE(p_ts), 'Present')
+            ON DUPLICATE KEY UPDATE status = 'Present';
+            SET v_result = 'in';
+        ELSEIF v_time_out IS NULL AND p_ts >= v_time_in + INTERVAL 10 MINUTE THEN
+            UPDATE attendance_sessions SET time_out = p_ts WHERE id = v_session_id;
+            SET v_result = 'out';
+        ELSE
+            SET v_result = 'too_soon';
+        END IF;
+    END IF;
+
+    COMMIT;
+
+    -- One autocommitted bump per accepted mark, after the mark's locks are released
+    IF v_result IN ('in', 'out') THEN
+        UPDATE attendance_version SET version = version + 1 WHERE id = 1;
+    END IF;
+
+    SELECT v_result AS result, v_session_no + (v_result = 'in') AS session_no;
+END //
+
+CREATE PROCEDURE initialize_daily_attendance()
+BEGIN
+    DECLARE v_day DATE DEFAULT CURDATE();
+    DECLARE v_chunk INT DEFAULT 5000;  -- Same as db_config2.ROSTER_CHUNK_SIZE
+    DECLARE v_last INT DEFAULT 0;
+    DECLARE v_max INT DEFAULT 0;
+    DECLARE v_upper INT;
+    DECLARE v_inserted INT DEFAULT 0;
+
+    SELECT COALESCE(MAX(id), 0) INTO v_max FROM userDetails;
+    INSERT IGNORE INTO roster_days (date, last_student_id) VALUES (v_day, 0);
+    SELECT last_student_id INTO v_last FROM roster_days WHERE date = v_day;
+
+    WHILE v_last < v_max DO
+        SET v_upper = LEAST(v_last + v_chunk, v_max);
+        INSERT IGNORE INTO attendance (name, date, status)
+        SELECT name, v_day, 'Absent' FROM userDetails WHERE id > v_last AND id <= v_upper;
+        SET v_inserted = v_inserted + ROW_COUNT();
+        UPDATE roster_days SET last_student_id = v_upper
+        WHERE date = v_day AND last_student_id < v_upper;
+        SET v_last = v_upper;
+    END WHILE;
+
+    IF v_inserted > 0 THEN
+        UPDATE attendance_version SET version = version + 1 WHERE id = 1;
+    END IF;
+END //
+
+DELIMITER ;
@@ -0,0 +1,36 @@
+-- Migration 007: index for the attendance page's keyset walk
+--
+-- The admin page now picks each page of (date DESC, name ASC) rows from the
+-- attendance table itself and aggregates only that page's sessions, instead
+-- of reading the attendance_daily view (which MySQL materializes in full for
+-- every query). A descending-date index lets that walk read exactly one page.
+-- Both indexes are created only if missing, so this migration can be re-run,
+-- including on databases where 002 already created idx_attendance_date_name.
+--
+-- Run once after 006:  mysql attendance_system < migrations/007_attendance_keyset_index.sql
+
+USE attendance_system;
+
+SET @has_index = (
+    SELECT COUNT(*) FROM information_schema.statistics
+    WHERE table_schema = DATABASE() AND table_name = 'attendance'
+      AND index_name = 'idx_attendance_date_name'
+);
+SET @ddl = IF(@has_index = 0,
+    'CREATE INDEX idx_attendance_date_name ON attendance (date, name, status)',
+    'DO 0');
+PREPARE create_index FROM @ddl;
+EXECUTE create_index;
+DEALLOCATE PREPARE create_index;
+
+SET @has_index = (
+    SELECT COUNT(*) FROM information_schema.statistics
+    WHERE table_schema = DATABASE() AND table_name = 'attendance'
+      AND index_name = 'idx_attendance_keyset'
+);
+SET @ddl = IF(@has_index = 0,
+    'CREATE INDEX idx_attendance_keyset ON attendance (date DESC, name ASC, status)',
+    'DO 0');
+PREPARE create_index FROM @ddl;
+EXECUTE create_index;
+DEALLOCATE PREPARE create_index;
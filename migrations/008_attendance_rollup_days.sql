@@ -0,0 +1,54 @@
+-- Migration 008: one row per day with attendance, for per-student rates
+--
+-- The per-student summary divides days present by the number of days in
+-- the range on which anyone attended. Counting distinct dates in
+-- attendance_rollup_daily reads every student's row for every day;
+-- attendance_rollup_days keeps one row per such day instead, so the count
+-- reads one index entry per day. Triggers on attendance_sessions add the day
+-- on the first session and remove it when its last session is deleted, with
+-- one primary-key or index lookup each (same logic as db_config2's SQLite
+-- schema).
+--
+-- Run once after 007:  mysql attendance_system < migrations/008_attendance_rollup_days.sql
+
+USE attendance_system;
+
+CREATE TABLE IF NOT EXISTS attendance_rollup_days (
+    date DATE PRIMARY KEY
+);
+
+INSERT IGNORE INTO attendance_rollup_days (date)
+SELECT DISTINCT date FROM attendance_sessions;
+
+DROP TRIGGER IF EXISTS add_rollup_day_on_session_insert;
+DROP TRIGGER IF EXISTS move_rollup_day_on_session_update;
+DROP TRIGGER IF EXISTS drop_rollup_day_on_session_delete;
+
+DELIMITER //
+
+CREATE TRIGGER add_rollup_day_on_session_insert AFTER INSERT ON attendance_sessions
+FOR EACH ROW
+BEGIN
+    INSERT IGNORE INTO attendance_rollup_days (date) VALUES (NEW.date);
+END //
+
+CREATE TRIGGER move_rollup_day_on_session_update AFTER UPDATE ON attendance_sessions
+FOR EACH ROW
+BEGIN
+    IF NEW.date <> OLD.date THEN
+        INSERT IGNORE INTO attendance_rollup_days (date) VALUES (NEW.date);
+        IF NOT EXISTS (SELECT 1 FROM attendance_sessions WHERE date = OLD.date) THEN
+            DELETE FROM attendance_rollup_days WHERE date = OLD.date;
+        END IF;
+    END IF;
+END //
+
+CREATE TRIGGER drop_rollup_day_on_session_delete AFTER DELETE ON attendance_sessions
+FOR EACH ROW
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM attendance_sessions WHERE date = OLD.date) THEN
+        DELETE FROM attendance_rollup_days WHERE date = OLD.date;
+    END IF;
+END //
+
+DELIMITER ;
@@ -0,0 +1,115 @@
+# motion.py
+"""Motion gate deciding where (and whether) to run face detection on a frame.
+
+Each frame is shrunk to a small grayscale thumbnail and compared with a
+running-average background. When nothing changed and no face was seen on
+the previous detection, the frame is idle and detection is skipped. Otherwise
+detection runs on the bounding box of the changed pixels joined with the
+previous face boxes, at a scale chosen so that faces come out around
+TARGET_FACE_PX tall (HOG misses faces much smaller than its 80px window and
+wastes time on faces much larger).
+"""
+import threading
+
+import cv2
+import numpy as np
+
+THUMB_WIDTH = 160  # Width of the grayscale thumbnail used for differencing
+DIFF_THRESHOLD = 18  # Per-pixel intensity change counted as motion (0-255)
+MIN_MOTION_FRACTION = 0.002  # Ignore changes covering less of the thumbnail than this (noise)
+BACKGROUND_ALPHA = 0.05  # Running-average weight of each new thumbnail
+MOTION_PADDING = 0.1  # Grow the motion box by this fraction of the frame size on each side
+FACE_PADDING = 0.5  # Grow previous face boxes by this fraction of their size on each side
+DEFAULT_SCALE = 0.25  # Detection scale until a face size has been observed (process_frame's fx)
+TARGET_FACE_PX = 80  # Face height aimed for in the downscaled detection image
+MIN_SCALE = 0.1
+MAX_SCALE = 1.0
+FACE_SIZE_SMOOTHING = 0.3  # EMA weight of the newest observed face height
+
+
+class MotionGate:
+    """Per-camera motion state; safe to share between recognition worker threads"""
+
+    def __init__(self, thumb_width=THUMB_WIDTH, diff_threshold=DIFF_THRESHOLD,
+                 min_motion_fraction=MIN_MOTION_FRACTION, alpha=BACKGROUND_ALPHA):
+        self.thumb_width = thumb_width
+        self.diff_threshold = diff_threshold
+        self.min_motion_fraction = min_motion_fraction
+        self.alpha = alpha
+        self.scale = DEFAULT_SCALE
+        self.face_height = None
+        self.faces = []  # Face boxes from the last detection, (top, right, bottom, left) in frame pixels
+        self.background = None
+        self.idle_frames = 0
+        self.gated_frames = 0
+        self._kernel = np.ones((3, 3), np.uint8)
+        self._lock = threading.Lock()
+
+    def _motion_box(self, frame):
+        """Bounding box (x0, y0, x1, y1) of changed pixels in frame coordinates, or None"""
+        height, width = frame.shape[:2]
+        thumb_height = max(1, round(height * self.thumb_width / width))
+        thumb = cv2.resize(frame, (self.thumb_width, thumb_height), interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+
+        with self._lock:
+            if self.background is None or self.background.shape != gray.shape:
+                self.background = gray.astype(np.float32)
+                return 0, 0, width, height  # No history yet: treat everything as changed
+            diff = cv2.absdiff(gray, cv2.convertScaleAbs(self.background))
+            cv2.accumulateWeighted(gray, self.background, self.alpha)
+
+        mask = cv2.dilate(cv2.threshold(diff, self.diff_threshold, 255, cv2.THRESH_BINARY)[1], self._kernel)
+        if cv2.countNonZero(mask) < self.min_motion_fraction * mask.size:
+            return None
+        x, y, w, h = cv2.boundingRect(mask)
+        fx, fy = width / self.thumb_width, height / thumb_height
+        pad_x, pad_y = MOTION_PADDING * width, MOTION_PADDING * height
+        return x * fx - pad_x, y * fy - pad_y, (x + w) * fx + pad_x, (y + h) * fy + pad_y
+
+    def plan(self, frame):
+        """Return (region, scale) for detection, or (None, None) when the frame is idle.
+
+        ``region`` is (x0, y0, x1, y1) in frame pixels.
+        """
+        height, width = frame.shape[:2]
+        box = self._motion_box(frame)
+        with self._lock:
+            for top, right, bottom, left in self.faces:
+                pad_x, pad_y = FACE_PADDING * (right - left), FACE_PADDING * (bottom - top)
+                face_box = (left - pad_x, top - pad_y, right + pad_x, bottom + pad_y)
+                box = face_box if box is None else (
+                    min(box[0], face_box[0]), min(box[1], face_box[1]),
+                    max(box[2], face_box[2]), max(box[3], face_box[3]),
+                )
+            if box is None:
+                self.idle_frames += 1
+                self.scale = DEFAULT_SCALE
+                self.face_height = None
+                return None, None
+            self.gated_frames += 1
+            scale = self.scale
+
+        x0, y0 = max(0, int(box[0])), max(0, int(box[1]))
+        x1, y1 = min(width, int(np.ceil(box[2]))), min(height, int(np.ceil(box[3])))
+        return (x0, y0, x1, y1), scale
+
+    def observe(self, faces):
+        """Remember face boxes (frame pixels) from the last detection and adapt the scale"""
+        with self._lock:
+            self.faces = list(faces)
+            if not self.faces:
+                return
+            observed = float(np.median([bottom - top for top, _, bottom, _ in self.faces]))
+            if self.face_height is None:
+                self.face_height = observed
+            else:
+                self.face_height += FACE_SIZE_SMOOTHING * (observed - self.face_height)
+            self.scale = float(np.clip(TARGET_FACE_PX / self.face_height, MIN_SCALE, MAX_SCALE))
+
+    def reset(self):
+        with self._lock:
+            self.background = None
+            self.faces = []
+            self.scale = DEFAULT_SCALE
+            self.face_height = None
@@ -0,0 +1,218 @@
+# pipeline.py
+import threading
+import time
+from collections import deque
+from queue import Empty, Full
+
+
+class BoundedQueue:
+    """Thread-safe bounded queue with an explicit overflow policy.
+
+    With ``drop_oldest=True`` a put on a full queue evicts the oldest item and
+    counts it as dropped, so producers never block and consumers always see
+    the freshest data. With ``drop_oldest=False`` a put blocks until there is
+    room or the timeout expires. ``on_drop`` is called after each eviction.
+    """
+
+    def __init__(self, maxsize, drop_oldest=True, on_drop=None):
+        self.maxsize = maxsize
+        self.drop_oldest = drop_oldest
+        self.on_drop = on_drop
+        self.dropped = 0
+        self._items = deque()
+        self._cond = threading.Condition()
+
+    def put(self, item, timeout=None):
+        dropped = False
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                if self.drop_oldest:
+                    self._items.popleft()
+                    self.dropped += 1
+                    dropped = True
+                elif not self._cond.wait_for(lambda: len(self._items) < self.maxsize, timeout):
+                    raise Full
+            self._items.append(item)
+            self._cond.notify_all()
+        if dropped and self.on_drop:
+            self.on_drop()
+
+    def get(self, timeout=None):
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items, timeout):
+                raise Empty
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def qsize(self):
+        with self._cond:
+            return len(self._items)
+
+
+class StageStats:
+    """Throughput and busy-time counters for one pipeline stage"""
+
+    def __init__(self, name, queue=None):
+        self.name = name
+        self.queue = queue
+        self.processed = 0
+        self.busy_seconds = 0.0
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def record(self, busy_seconds):
+        with self._lock:
+            self.processed += 1
+            self.busy_seconds += busy_seconds
+
+    def snapshot(self):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        with self._lock:
+            processed, busy = self.processed, self.busy_seconds
+        return {
+            "stage": self.name,
+            "processed": processed,
+            "fps": round(processed / elapsed, 2),
+            "avg_ms": round(busy / processed * 1000, 2) if processed else 0.0,
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            "dropped": self.queue.dropped if self.queue else 0,
+        }
+
+
+class RecognitionPipeline:
+    """Capture -> recognize (worker pool) -> render / persist, joined by bounded queues.
+
+    * capture: one thread reading the camera; its output queue holds only the
+      newest frame, so a slow recognizer never works on a stale buffer.
+    * recognize: ``workers`` threads calling ``recognize_fn(frame)``; dlib
+      releases the GIL so these run in parallel.
+    * render: the caller pulls results with ``next_result`` on its own thread
+      (Streamlit widgets must be updated from the script thread).
+    * persist: one thread calling ``persist_fn(item)`` for every ``persist``.
+
+    ``on_drop`` is called whenever a stale frame or result is discarded.
+    ``worker_init()`` runs at the start of every recognize thread (e.g. to
+    load per-thread detector models); ``start`` returns, and capture begins,
+    only once all of them have finished.
+    """
+
+    def __init__(self, capture, recognize_fn, persist_fn=None, workers=2,
+                 frame_queue_size=1, result_queue_size=2, persist_queue_size=64,
+                 thread_hook=None, on_drop=None, worker_init=None):
+        self.capture = capture
+        self.recognize_fn = recognize_fn
+        self.persist_fn = persist_fn
+        self.workers = max(1, workers)
+        self.thread_hook = thread_hook
+        self.worker_init = worker_init
+
+        self.frame_queue = BoundedQueue(frame_queue_size, on_drop=on_drop)
+        self.result_queue = BoundedQueue(result_queue_size, on_drop=on_drop)
+        self.persist_queue = BoundedQueue(persist_queue_size, drop_oldest=False)
+
+        self.capture_stats = StageStats("capture", self.frame_queue)
+        self.recognize_stats = StageStats("recognize", self.result_queue)
+        self.render_stats = StageStats("render")
+        self.persist_stats = StageStats("persist", self.persist_queue)
+
+        self.capture_error = None
+        self._stop = threading.Event()
+        self._closed = threading.Event()
+        self._threads = []
+        self._seq = 0
+        self._last_rendered = -1
+
+    def _spawn(self, target, name, args=()):
+        thread = threading.Thread(target=target, name=name, args=args, daemon=True)
+        if self.thread_hook:
+            self.thread_hook(thread)
+        thread.start()
+        self._threads.append(thread)
+
+    def start(self):
+        ready = [threading.Event() for _ in range(self.workers)]
+        for i, event in enumerate(ready):
+            self._spawn(self._recognize_loop, f"recognize-{i}", (event,))
+        for event in ready:
+            event.wait()
+        self._spawn(self._capture_loop, "capture")
+        if self.persist_fn:
+            self._spawn(self._persist_loop, "persist")
+        return self
+
+    def _capture_loop(self):
+        while not self._stop.is_set():
+            start = time.perf_counter()
+            ret, frame = self.capture.read()
+            if not ret:
+                self.capture_error = "Failed to capture frame from camera"
+                self._stop.set()
+                break
+            self.frame_queue.put((self._seq, frame))
+            self._seq += 1
+            self.capture_stats.record(time.perf_counter() - start)
+
+    def _recognize_loop(self, ready):
+        try:
+            if self.worker_init:
+                self.worker_init()
+        finally:
+            ready.set()
+        while not self._stop.is_set():
+            try:
+                seq, frame = self.frame_queue.get(timeout=0.1)
+            except Empty:
+                continue
+            start = time.perf_counter()
+            result = self.recognize_fn(frame)
+            self.result_queue.put((seq, frame, result))
+            self.recognize_stats.record(time.perf_counter() - start)
+
+    def _persist_loop(self):
+        # Runs until stop() so marks queued after a capture failure still land
+        while not self._closed.is_set() or self.persist_queue.qsize():
+            try:
+                item = self.persist_queue.get(timeout=0.1)
+            except Empty:
+                continue
+            start = time.perf_counter()
+            self.persist_fn(item)
+            self.persist_stats.record(time.perf_counter() - start)
+
+    def next_result(self, timeout=0.1):
+        """Return the next (frame, result) newer than the last one rendered, or None"""
+        while True:
+            try:
+                seq, frame, result = self.result_queue.get(timeout=timeout)
+            except Empty:
+                return None
+            # Workers can finish out of order; never step the preview backwards
+            if seq > self._last_rendered:
+                self._last_rendered = seq
+                return frame, result
+
+    def rendered(self, busy_seconds):
+        self.render_stats.record(busy_seconds)
+
+    def persist(self, item, timeout=5):
+        self.persist_queue.put(item, timeout=timeout)
+
+    @property
+    def running(self):
+        return not self._stop.is_set()
+
+    def stop(self):
+        self._stop.set()
+        self._closed.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads.clear()
+
+    def stats(self):
+        return [
+            self.capture_stats.snapshot(),
+            self.recognize_stats.snapshot(),
+            self.render_stats.snapshot(),
+            self.persist_stats.snapshot(),
+        ]
@@ -0,0 +1,92 @@
+# preview.py
+import threading
+import time
+from queue import Empty
+
+import cv2
+
+from metrics import metrics
+from pipeline import BoundedQueue
+
+PREVIEW_FPS = 10  # Preview frames sent to the browser per second
+PREVIEW_WIDTH = 480  # Preview frames are downscaled to this width
+PREVIEW_JPEG_QUALITY = 70
+
+
+class LivePreview:
+    """Pushes a throttled, downscaled JPEG preview to a Streamlit placeholder on its own thread.
+
+    ``offer`` never blocks: frames arriving faster than ``fps`` are skipped,
+    and the single-slot queue replaces a frame the render thread has not
+    picked up yet, so a slow browser only ever sees the newest frame and
+    never holds up the caller. ``draw_fn(frame, *args)`` annotates the frame
+    on the render thread, so skipped frames are never drawn.
+    """
+
+    def __init__(self, placeholder, draw_fn=None, fps=PREVIEW_FPS, width=PREVIEW_WIDTH,
+                 quality=PREVIEW_JPEG_QUALITY, thread_hook=None):
+        self.placeholder = placeholder
+        self.draw_fn = draw_fn
+        self.interval = 1.0 / fps if fps else None
+        self.width = width
+        self.quality = quality
+        self.thread_hook = thread_hook
+        self.queue = BoundedQueue(1, on_drop=lambda: metrics.inc("preview_stale"))
+        self._next_due = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.interval is None:
+            return self  # Preview disabled
+        self._thread = threading.Thread(target=self._run, name="preview", daemon=True)
+        if self.thread_hook:
+            self.thread_hook(self._thread)
+        self._thread.start()
+        return self
+
+    def offer(self, frame, *draw_args):
+        """Queue a frame for display if the FPS cap allows; returns whether it was taken"""
+        now = time.monotonic()
+        if self._thread is None or now < self._next_due:
+            metrics.inc("preview_skipped")
+            return False
+        self._next_due = now + self.interval
+        self.queue.put((frame, draw_args))
+        return True
+
+    def encode(self, frame, draw_args=()):
+        """Annotate, downscale and JPEG-encode one frame"""
+        if self.draw_fn:
+            frame = self.draw_fn(frame, *draw_args)
+        height, width = frame.shape[:2]
+        if width > self.width:
+            frame = cv2.resize(frame, (self.width, round(height * self.width / width)),
+                               interpolation=cv2.INTER_AREA)
+        ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        return jpeg.tobytes() if ok else None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                frame, draw_args = self.queue.get(timeout=0.1)
+            except Empty:
+                continue
+            watch = metrics.stopwatch()
+            jpeg = self.encode(frame, draw_args)
+            watch.lap("preview_encode")
+            if jpeg is None:
+                continue
+            try:
+                self.placeholder.image(jpeg)
+            except Exception as e:
+                print(f"❌ Preview update failed: {e}")
+                continue
+            watch.lap("ui_push")
+            metrics.inc("preview_frames")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
@@ -0,0 +1,46 @@
+# rebuild_rollups.py
+"""Backfill or repair the attendance rollup tables from attendance_sessions.
+
+    python rebuild_rollups.py [--start 2024-01-01] [--end 2024-06-30]
+
+Without dates the whole session history is rebuilt. Run it once after
+migrations/005_attendance_rollups.sql (or on an existing SQLite database),
+and after editing attendance_sessions by hand; new marks keep the rollups
+current on their own.
+"""
+import argparse
+import sys
+from datetime import datetime
+
+from db_config2 import DB_ERRORS, rebuild_attendance_rollups
+
+
+def _date(value):
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--start", type=_date, help="First day to rebuild (YYYY-MM-DD)")
+    parser.add_argument("--end", type=_date, help="Last day to rebuild (YYYY-MM-DD)")
+    args = parser.parse_args(argv)
+    if args.start and args.end and args.start > args.end:
+        parser.error("--start is after --end")
+
+    def progress(done, total):
+        print(f"\r{done}/{total} weeks", end="", file=sys.stderr, flush=True)
+
+    try:
+        weeks = rebuild_attendance_rollups(args.start, args.end, progress=progress)
+    except DB_ERRORS as e:
+        print(f"\n❌ Rebuild failed: {e}", file=sys.stderr)
+        return 1
+    if weeks is None:
+        print("❌ Database connection failed", file=sys.stderr)
+        return 1
+    print(f"\n✅ Rebuilt rollups for {weeks} weeks", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+# report_export.py
+"""Attendance report export that streams rows instead of building a DataFrame.
+
+Rows are read from the database in EXPORT_CHUNK_ROWS chunks through an
+unbuffered cursor and written straight into a per-request buffer, so the
+working set is one chunk no matter how long the date range is. Buffers are
+SpooledTemporaryFiles: small reports stay in memory, large ones spill to an
+anonymous temp file that disappears when it is closed. Nothing is written to
+a shared path, so concurrent exports cannot overwrite each other.
+"""
+import csv
+import io
+import tempfile
+from datetime import timedelta
+
+import pandas as pd
+
+from db_config2 import get_db_connection, rollup_week_start, streaming_cursor
+
+EXPORT_CHUNK_ROWS = 2000  # Rows fetched and formatted at a time
+SPOOL_MAX_BYTES = 8 * 1024 * 1024  # Buffers larger than this move from memory to a temp file
+
+TIME_COLUMNS = [
+    'entry1_in', 'entry1_out', 'entry2_in', 'entry2_out',
+    'entry3_in', 'entry3_out', 'entry4_in', 'entry4_out',
+    'entry5_in', 'entry5_out'
+]
+ATTENDANCE_COLUMN_NAMES = [
+    'name', 'date',
+    'entry1_in', 'entry1_out', 'entry1_hours',
+    'entry2_in', 'entry2_out', 'entry2_hours',
+    'entry3_in', 'entry3_out', 'entry3_hours',
+    'entry4_in', 'entry4_out', 'entry4_hours',
+    'entry5_in', 'entry5_out', 'entry5_hours',
+    'total_hours', 'status'
+]
+ATTENDANCE_COLUMNS = ", ".join(ATTENDANCE_COLUMN_NAMES)
+STUDENT_SUMMARY_COLUMNS = [
+    'name', 'days_present', 'attendance_rate', 'total_hours', 'avg_hours_per_day',
+    'first_in', 'last_out'
+]
+
+EXPORT_FORMATS = {
+    # format: (extension, mime type)
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "CSV": ("csv", "text/csv"),
+    "Word": ("docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+    "Student Summary (CSV)": ("csv", "text/csv"),
+}
+
+
+def status_clause(statuses):
+    """SQL fragment and params restricting ``status`` to the selected values"""
+    if not statuses:
+        return "", ()
+    return f" AND status IN ({', '.join(['%s'] * len(statuses))})", tuple(statuses)
+
+
+def format_time_columns(df):
+    """Convert 24-hour time columns to 12-hour format, a whole column at a time"""
+    df = df.copy()
+    for col in TIME_COLUMNS:
+        if col not in df.columns:
+            continue
+        raw = df[col].where(df[col].notna(), "").astype(str)
+        parsed = pd.to_datetime(raw, format="%H:%M:%S", errors="coerce")
+        # Values that do not parse are shown as stored, like convert_24_to_12
+        df[col] = parsed.dt.strftime("%I:%M %p").where(parsed.notna(), raw)
+    return df
+
+
+def _connect():
+    connection = get_db_connection()
+    if connection is None:
+        raise ConnectionError("Database connection failed")
+    return connection
+
+
+def query_attendance_summary(start_date, end_date, statuses=()):
+    """Summary metrics for the range in a single aggregate query"""
+    status_sql, status_params = status_clause(statuses)
+    connection = _connect()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT COUNT(DISTINCT name) AS students,
+                       COUNT(DISTINCT date) AS days,
+                       COALESCE(SUM(CASE WHEN status = 'Present' THEN 1 ELSE 0 END), 0) AS present,
+                       COUNT(*) AS total_rows
+                FROM attendance
+                WHERE date BETWEEN %s AND %s{status_sql}
+            """, (start_date, end_date) + status_params)
+            row = cursor.fetchone()
+    finally:
+        connection.close()
+    return {key: int(value or 0) for key, value in row.items()}
+
+
+def rollup_clauses(start_date, end_date):
+    """WHERE clauses covering the range with weekly rollups for whole weeks and daily rollups for the rest"""
+    first_week = rollup_week_start(start_date)
+    if first_week < start_date:
+        first_week += timedelta(days=7)
+    last_week = rollup_week_start(end_date + timedelta(days=1)) - timedelta(days=7)
+    if first_week > last_week:
+        return None, ("date BETWEEN %s AND %s", (start_date, end_date))
+    return (
+        ("week_start BETWEEN %s AND %s", (first_week, last_week)),
+        ("(date >= %s AND date < %s) OR (date > %s AND date <= %s)",
+         (start_date, first_week, last_week + timedelta(days=6), end_date)),
+    )
+
+
+def query_student_summary(start_date, end_date):
+    """Per-student days present, hours and first in / last out for the range, from the rollup tables.
+
+    Reads one weekly row per student per whole week plus daily rows for the
+    partial weeks at either end, so a semester costs about the same as a
+    week. The attendance rate is days present over the days in range on which
+    anyone attended, counted from attendance_rollup_days (one row per day).
+    """
+    weekly, (daily_sql, daily_params) = rollup_clauses(start_date, end_date)
+    weekly_sql, weekly_params = "", ()
+    if weekly:
+        weekly_sql = f"""
+            SELECT student_id, days_present AS days, total_seconds AS seconds, first_in, last_out
+            FROM attendance_rollup_weekly WHERE {weekly[0]}
+            UNION ALL"""
+        weekly_params = weekly[1]
+    connection = _connect()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT u.name,
+                       COALESCE(SUM(r.days), 0) AS days_present,
+                       COALESCE(SUM(r.seconds), 0) AS total_seconds,
+                       MIN(r.first_in) AS first_in,
+                       MAX(r.last_out) AS last_out
+                FROM userDetails u
+                LEFT JOIN ({weekly_sql}
+                    SELECT student_id, 1 AS days, total_seconds AS seconds, first_in, last_out
+                    FROM attendance_rollup_daily WHERE {daily_sql}
+                ) r ON r.student_id = u.id
+                GROUP BY u.id, u.name
+                ORDER BY u.name
+            """, weekly_params + daily_params)
+            rows = cursor.fetchall()
+            cursor.execute(
+                "SELECT COUNT(*) AS days FROM attendance_rollup_days WHERE date BETWEEN %s AND %s",
+                (start_date, end_date),
+            )
+            attendance_days = cursor.fetchone()["days"]
+    finally:
+        connection.close()
+
+    df = pd.DataFrame(rows, columns=['name', 'days_present', 'total_seconds', 'first_in', 'last_out'])
+    df["days_present"] = df["days_present"].astype(int)
+    hours = df.pop("total_seconds").astype(float) / 3600
+    df["total_hours"] = hours.round(2)
+    df["avg_hours_per_day"] = (hours / df["days_present"].where(df["days_present"] > 0)).round(2)
+    df["attendance_rate"] = (df["days_present"] / attendance_days * 100).round(1) if attendance_days else None
+    for col in ("first_in", "last_out"):
+        df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df[STUDENT_SUMMARY_COLUMNS]
+
+
+def iter_attendance_chunks(start_date, end_date, statuses=(), chunk_size=EXPORT_CHUNK_ROWS):
+    """Yield the report rows as formatted DataFrames of at most ``chunk_size`` rows"""
+    status_sql, status_params = status_clause(statuses)
+    connection = _connect()
+    try:
+        with streaming_cursor(connection) as cursor:
+            cursor.execute(f"""
+                SELECT {ATTENDANCE_COLUMNS}
+                FROM attendance_daily
+                WHERE date BETWEEN %s AND %s{status_sql}
+                ORDER BY date DESC, name ASC
+            """, (start_date, end_date) + status_params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                chunk = pd.DataFrame(rows, columns=ATTENDANCE_COLUMN_NAMES)
+                chunk["date"] = chunk["date"].astype(str)
+                chunk = format_time_columns(chunk)
+                yield chunk.astype(object).where(chunk.notna(), None)
+    finally:
+        connection.close()
+
+
+def _spool():
+    return tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+
+
+def export_csv(start_date, end_date, statuses=()):
+    """Write the report as CSV, chunk by chunk; returns a buffer positioned at the start
+
+    Each chunk is formatted into a small text buffer and written to the
+    spool as UTF-8 bytes (SpooledTemporaryFile only works under a
+    TextIOWrapper from Python 3.11).
+    """
+    buffer = _spool()
+    text = io.StringIO(newline="")
+    writer = csv.writer(text)
+    writer.writerow(ATTENDANCE_COLUMN_NAMES)
+    for chunk in iter_attendance_chunks(start_date, end_date, statuses):
+        writer.writerows(chunk.itertuples(index=False, name=None))
+        buffer.write(text.getvalue().encode("utf-8"))
+        text.seek(0)
+        text.truncate()
+    buffer.write(text.getvalue().encode("utf-8"))
+    buffer.seek(0)
+    return buffer
+
+
+def export_xlsx(start_date, end_date, statuses=()):
+    """Write the report with openpyxl's write-only workbook, which streams rows to disk"""
+    from openpyxl import Workbook  # Imported on use: it adds ~0.3 s to every admin page load
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Attendance")
+    sheet.append(ATTENDANCE_COLUMN_NAMES)
+    for chunk in iter_attendance_chunks(start_date, end_date, statuses):
+        for row in chunk.itertuples(index=False, name=None):
+            sheet.append(row)
+    buffer = _spool()
+    workbook.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def export_docx(start_date, end_date, statuses=()):
+    """Word summary built from SQL aggregates; no attendance rows are fetched"""
+    from docx import Document
+    summary = query_attendance_summary(start_date, end_date, statuses)
+    doc = Document()
+    doc.add_heading(f"Attendance Report ({start_date} to {end_date})", 0)
+    doc.add_heading("Summary", level=1)
+    doc.add_paragraph(f"Total Students: {summary['students']}")
+    doc.add_paragraph(f"Total Days: {summary['days']}")
+    doc.add_paragraph(f"Total Present: {summary['present']}")
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def export_student_summary(start_date, end_date, statuses=()):
+    """Per-student summary CSV from the rollup tables; the status filter does not apply"""
+    buffer = _spool()
+    query_student_summary(start_date, end_date).to_csv(buffer, index=False)
+    buffer.seek(0)
+    return buffer
+
+
+EXPORTERS = {
+    "Excel": export_xlsx, "CSV": export_csv, "Word": export_docx,
+    "Student Summary (CSV)": export_student_summary,
+}
+
+
+def export_report(export_format, start_date, end_date, statuses=()):
+    """Return (buffer, file_name, mime) for a report; the caller closes the buffer"""
+    extension, mime = EXPORT_FORMATS[export_format]
+    buffer = EXPORTERS[export_format](start_date, end_date, statuses)
+    return buffer, f"Attendance_Report_{start_date}to{end_date}.{extension}", mime
@@ -1,13 +1,30 @@
 # take_attendance.py
-import pymysql
 import streamlit as st
-import face_recognition
 import cv2
 import numpy as np
 import os
+import time
 from datetime import datetime
-from playsound import playsound
-from db_config2 import get_db_connection, insert_default_attendance
+from db_config2 import (
+    get_db_connection, mark_attendance_session, DB_ERRORS,
+    fetch_gallery_changes, get_gallery_version,
+)
+from face_cache import FaceEncodingCache
+from gallery import GALLERY_PRECISION, build_gallery
+from live_gallery import LiveGallery
+from pipeline import RecognitionPipeline
+from attendance_writer import AttendanceWriter, AsyncFeedback
+from attendance_cache import AttendanceStateCache
+from tracking import FaceTracker
+from metrics import metrics, serve_metrics
+from motion import MotionGate
+from detectors import DEFAULT_DETECTOR, DETECTORS, create_detector
+from preview import PREVIEW_FPS, LivePreview
+from kiosk import KioskSession
+from face_models import face_recognition, warm_up
+from time_utils import convert_12_to_24
+from frame_context import NO_FACES, face_boxes, map_boxes, thread_context
+from streamlit.runtime.scriptrunner import add_script_run_ctx
 
 
 # Constants
@@ -17,60 +34,41 @@ CAMERA_DURATION = 20
 FACE_RECOGNITION_TOLERANCE = 0.4
 ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
 MAX_IMAGE_SIZE = 5 * 1024 * 1024  # 5MB
-
-# Create required directories
-os.makedirs(KNOWN_FACES_DIR, exist_ok=True)
-
-# Time Conversion Functions
-def convert_12_to_24(time_str):
-    """Convert 12-hour format to 24-hour format"""
-    try:
-        time_obj = datetime.strptime(time_str, '%I:%M %p')
-        return time_obj.strftime('%H:%M:%S')
-    except ValueError as e:
-        st.error(f"Time conversion error: {e}")
+DETECT_EVERY_N_FRAMES = 5  # Full detection cadence in tracking mode
+DETECTION_WORKERS = max(1, (os.cpu_count() or 2) - 1)  # Detection/encoding threads; dlib releases the GIL
+METRICS_PANEL_REFRESH = 1.0  # Seconds between sidebar metrics / snapshot file updates
+
+def _encode_known_face(filepath):
+    """Compute the encoding of the first face in an image file, or None if no face is found"""
+    fr = face_recognition()
+    image = fr.load_image_file(filepath)
+    face_locations = fr.face_locations(image)
+    if not face_locations:
         return None
-
-def convert_24_to_12(time_str):
-    """Convert 24-hour format to 12-hour format"""
-    if not time_str:
-        return ""
-    try:
-        time_obj = datetime.strptime(time_str, '%H:%M:%S')
-        return time_obj.strftime('%I:%M %p')
-    except ValueError:
-        return time_str
-
-def load_known_faces():
-    """Load known faces from directory"""
-    known_faces = []
-    known_names = []
-    
-    if not os.path.exists(KNOWN_FACES_DIR):
-        st.error(f"Directory {KNOWN_FACES_DIR} not found!")
-        return known_faces, known_names
-        
-    for filename in os.listdir(KNOWN_FACES_DIR):
-        if filename.lower().endswith(tuple(ALLOWED_EXTENSIONS)):
-            try:
-                filepath = os.path.join(KNOWN_FACES_DIR, filename)
-                image = face_recognition.load_image_file(filepath)
-                face_locations = face_recognition.face_locations(image)
-                
-                if not face_locations:
-                    st.warning(f"No face detected in {filename}")
-                    continue
-                    
-                encoding = face_recognition.face_encodings(image, face_locations)[0]
-                known_faces.append(encoding)
-                known_names.append(os.path.splitext(filename)[0])
-            except Exception as e:
-                st.error(f"Error loading face {filename}: {e}")
-    
+    return fr.face_encodings(image, face_locations)[0]
+
+def load_known_faces(precision=None):
+    """Load known faces from directory, re-encoding only new or changed images
+
+    For a quantized gallery (``precision`` or GALLERY_PRECISION float16/int8)
+    the encodings come back as a memory-mapped float32 matrix, which the
+    gallery re-ranks against without loading it into memory.
+    """
+    os.makedirs(KNOWN_FACES_DIR, exist_ok=True)
+
+    cache = FaceEncodingCache(KNOWN_FACES_DIR, ALLOWED_EXTENSIONS)
+    known_faces, known_names, skipped = cache.sync(
+        _encode_known_face,
+        on_error=lambda filename, e: st.error(f"Error loading face {filename}: {e}"),
+    )
+    for filename in skipped:
+        st.warning(f"No face detected in {filename}")
+
+    if (precision or GALLERY_PRECISION) != "float32":
+        known_faces = cache.float32_matrix(known_faces)
     return known_faces, known_names
 
 
-
 # Define a dictionary to track recognized faces across frames
 recognized_faces = {}  # {name: count}
 THRESHOLD_FRAMES = 5  # Number of consecutive frames needed to confirm a match
@@ -82,76 +80,178 @@ most_recognized_face = None  # Store the most detected face
 recognition_count = {}  # {name: count}
 
 
-def process_frame(frame, known_faces, known_names):
-    """Process video frame for face recognition and mark attendance correctly."""
-    try:
-        small_frame = cv2.resize(frame, (0, 0), fx=0.25, fy=0.25)
-        rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
-        
-        face_locations = face_recognition.face_locations(rgb_small_frame)
-        face_encodings = face_recognition.face_encodings(rgb_small_frame, face_locations)
+_default_detector = None
+
+
+def get_default_detector():
+    """The ATTENDANCE_DETECTOR backend, created on first use"""
+    global _default_detector
+    if _default_detector is None:
+        _default_detector = create_detector()
+    return _default_detector
+
+
+def recognize_faces(frame, gallery, gate=None, detector=None, context=None):
+    """Detect, encode and match faces; returns (face_locations, matched_names, match_distances)
+
+    Locations are an (n, 4) int32 array in the 1/4-scale coordinates used for
+    detection. With a MotionGate, idle frames skip detection and the rest are
+    detected only in the changed region, at the gate's adaptive scale. The
+    gate locks its own state, detectors keep a model per thread and each
+    thread resizes into its own FrameContext buffers, so this stage is safe
+    to run on several worker threads.
+    """
+    detector = detector or get_default_detector()
+    context = context or thread_context()
+    watch = metrics.stopwatch()
+    metrics.inc("frames")
+    scale, x0, y0 = 0.25, 0, 0
+    if gate is not None:
+        region, scale = gate.plan(frame)
+        watch.lap("motion")
+        if region is None:
+            metrics.inc("idle_frames")
+            return NO_FACES, [], []
+        x0, y0, x1, y1 = region
+        frame = frame[y0:y1, x0:x1]
+
+    small_frame = context.resize(frame, scale)
+    watch.lap("resize")
+    rgb_small_frame = context.to_rgb(small_frame)
+    watch.lap("color_convert")
+
+    face_locations = detector.detect(rgb_small_frame)
+    watch.lap("detect")
+    boxes = face_boxes(face_locations)
+    if gate is not None:
+        gate.observe(map_boxes(boxes, scale, x0, y0, out_scale=1.0, rounded=False))
+    face_encodings = face_recognition().face_encodings(rgb_small_frame, face_locations)
+    watch.lap("encode")
+    if not face_encodings:
+        return NO_FACES, [], []
+    if gate is not None:
+        boxes = map_boxes(boxes, scale, x0, y0)
+
+    face_encodings = context.encodings(face_encodings)
+    matched_names, match_distances = gallery.match(face_encodings, FACE_RECOGNITION_TOLERANCE)
+    watch.lap("match")
+    matches = sum(name is not None for name in matched_names)
+    metrics.inc("faces", len(face_encodings))
+    metrics.inc("matches", matches)
+    metrics.inc("visitors", len(face_encodings) - matches)
+    return boxes, matched_names, match_distances
+
+
+def draw_faces(frame, face_locations, labels):
+    """Draw labelled boxes, scaling 1/4-scale detection coordinates back to the frame"""
+    if not len(face_locations):
+        return frame
+    # Scale back coordinates for display, in one step for all boxes
+    scaled = (np.asarray(face_locations, dtype=np.int32).reshape(-1, 4) * 4).tolist()
+    for (top, right, bottom, left), name in zip(scaled, labels):
+        # Draw rectangle and label on detected faces
+        color = (0, 0, 255) if name == "Visitor" else (0, 255, 0)
+        cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
+        cv2.putText(frame, name, (left + 6, bottom + 20),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+    return frame
+
+
+def face_labels(matched_names):
+    return [name if name is not None else "Visitor" for name in matched_names]
+
+
+def annotate_frame(frame, face_locations, matched_names, match_distances, draw=True):
+    """Update recognition counts and draw labelled boxes for one recognized frame."""
+    attendance_marked = False
+    recognized_names = []  # Store names detected in this frame
+
+    if not len(face_locations):
+        recognition_count.clear()  # Reset if no faces are seen
+        return frame, False, []
 
-        attendance_marked = False
-        recognized_names = []  # Store names detected in this frame
+    watch = metrics.stopwatch()
 
-        if not face_encodings:
-            print("❌ No faces detected.")
-            recognition_count.clear()  # Reset if no faces are seen
-            return frame, False, []  
+    labels = []
+    for matched_name, distance in zip(matched_names, match_distances):
+        # ✅ Only consider match if confidence is high
+        if matched_name is not None:
+            name = matched_name
 
-        for (top, right, bottom, left), face_encoding in zip(face_locations, face_encodings):
-            face_distances = face_recognition.face_distance(known_faces, face_encoding)
-            best_match_index = np.argmin(face_distances)
+            # ✅ Track how many times this face is recognized
+            recognition_count[name] = recognition_count.get(name, 0) + 1
+            recognized_names.append(name)
 
-            # ✅ Only consider match if confidence is high
-            if face_distances[best_match_index] < FACE_RECOGNITION_TOLERANCE:
-                name = known_names[best_match_index]
-                confidence = 1 - face_distances[best_match_index]  # Convert distance to confidence
-                print(f"🔍 Detected: {name} (Confidence: {confidence:.2f})")
+        else:
+            name = "Visitor"
+        labels.append(name)
 
-                # ✅ Track how many times this face is recognized
-                recognition_count[name] = recognition_count.get(name, 0) + 1
-                recognized_names.append(name)
+        # Reset count if multiple people appear
+        if len(set(recognized_names)) > 1:
+            recognition_count.clear()
+            for seen_name in recognized_names:
+                recognition_count[seen_name] = 1
 
-            else:
-                name = "Visitor"
-                print("❌ Face not recognized.")
-
-            # Reset count if multiple people appear
-            if len(set(recognized_names)) > 1:
-                recognition_count.clear()
-                for name in recognized_names:
-                    recognition_count[name] = 1
-
-            # Scale back coordinates for display
-            top *= 4
-            right *= 4
-            bottom *= 4
-            left *= 4
-            
-            # Draw rectangle and label on detected faces
-            color = (0, 0, 255) if name == "Visitor" else (0, 255, 0)
-            cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
-            cv2.putText(frame, name, (left + 6, bottom + 20), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+    if draw:
+        draw_faces(frame, face_locations, labels)
+        watch.lap("draw")
 
-        print(f"📝 Recognition Count: {recognition_count}")
+    return frame, attendance_marked, recognized_names
 
-        return frame, attendance_marked, recognized_names  
-    
+
+def recognize_tracked(frame, gallery, tracker, gate=None, detector=None, context=None):
+    """Recognition stage for tracking mode; returns (face_locations, names, distances, votes)
+
+    Full detection and encoding only run when the tracker asks for them;
+    other frames just propagate the existing tracks. The 1/4-scale frame an
+    OpenCV tracker needs is resized into the thread's FrameContext, after
+    recognize_faces is done with the same buffer.
+    """
+    context = context or thread_context()
+
+    def small():
+        return context.resize(frame, 0.25) if tracker.tracker_factory is not None else None
+
+    if tracker.needs_detection():
+        face_locations, matched_names, match_distances = recognize_faces(frame, gallery, gate, detector, context)
+        tracker.observe(face_locations, matched_names, match_distances, small())
+    else:
+        watch = metrics.stopwatch()
+        tracker.propagate(small())
+        watch.lap("track")
+        metrics.inc("frames")
+    return (*tracker.snapshot(), tracker.votes())
+
+
+def annotate_tracked(frame, face_locations, track_names, track_distances, votes, draw=True):
+    """Draw tracks and take vote counts from them instead of recounting per frame."""
+    recognition_count.clear()
+    recognition_count.update(votes)
+    if draw:
+        watch = metrics.stopwatch()
+        draw_faces(frame, face_locations, face_labels(track_names))
+        watch.lap("draw")
+    return frame, False, []
+
+
+def process_frame(frame, gallery, gate=None, detector=None):
+    """Process video frame for face recognition and mark attendance correctly."""
+    try:
+        return annotate_frame(frame, *recognize_faces(frame, gallery, gate, detector))
     except Exception as e:
+        metrics.inc("frame_errors")
         print(f"❌ Error processing frame: {e}")
         return frame, False, []
 
 
 
 
-def mark_attendance(name):
-    """Mark attendance in database"""
+def mark_attendance(name, when=None):
+    """Mark attendance in database, at ``when`` (e.g. a video timestamp) or now"""
     try:
-        current_time = datetime.now()
+        current_time = when or datetime.now()
         time_str = current_time.strftime("%I:%M %p")
-        return save_attendance_to_db(name, time_str)
+        return save_attendance_to_db(name, time_str, current_time.strftime("%Y-%m-%d"))
     except Exception as e:
         st.error(f"Error marking attendance: {e}")
         return False
@@ -160,130 +260,116 @@ def mark_attendance(name):
 
 
 MIN_REQUIRED_FRAMES = 3
-def save_attendance_to_db(name, time_str):
-    """Save attendance record to database with working hours calculation"""
+attendance_state = AttendanceStateCache()  # Today's per-student state, shared by all writers
+
+def _report_rejection(name, reason):
+    """Show why a mark was rejected; returns True if it was"""
+    if reason == "unregistered":
+        st.error(f"Unregistered student detected: {name}")
+    elif reason == "too_soon":
+        st.info("Skipping update - less than 10 minutes since last entry")
+    elif reason == "spooled":
+        st.warning(f"Database unavailable - attendance for {name} saved locally and will be retried")
+    return reason in ("unregistered", "too_soon")
+
+def record_attendance(name, timestamp, connection):
+    """Apply one mark over ``connection``; returns 'in', 'out', 'too_soon' or 'unregistered'
+
+    Repeat sightings are rejected from memory where possible. Nothing is
+    shown on the page and database errors propagate, so this is safe to call
+    from the writer thread.
+    """
+    reason = attendance_state.check(name, timestamp)
+    if reason:
+        return reason
+    attendance_state.ensure_warm(connection, timestamp.date())
+    reason = attendance_state.check(name, timestamp)
+    if reason:
+        return reason
+
+    watch = metrics.stopwatch()
+    result = mark_attendance_session(connection, name, timestamp)
+    watch.lap("db_write")
+    metrics.inc("db_writes")
+    attendance_state.apply(name, timestamp, result)
+    return result
+
+def save_attendance_to_db(name, time_str, date_str=None):
+    """Save attendance with one atomic call that opens or closes a session
+
+    The 10-minute gap rule and the in/out toggle are applied by the database
+    (see mark_attendance_session), so concurrent kiosks cannot lose updates.
+    """
+    today = date_str or datetime.now().strftime("%Y-%m-%d")
+    time_24 = convert_12_to_24(time_str)
+    if not time_24:
+        st.error(f"Time conversion error: {time_str!r} is not a 12-hour time")
+        return False
+    timestamp = datetime.strptime(f"{today} {time_24}", "%Y-%m-%d %H:%M:%S")
+
+    # Reject repeat sightings from memory before touching the database
+    if _report_rejection(name, attendance_state.check(name, timestamp)):
+        return False
+
     connection = get_db_connection()
     if connection is None:
+        st.error("Failed to connect to the database.")
         return False
-        
     try:
-        with connection.cursor() as cursor:
-            today = datetime.now().strftime("%Y-%m-%d")
-            time_24 = convert_12_to_24(time_str)
-            if not time_24:
-                return False
-            
-            # Ensure student is registered
-            cursor.execute("SELECT name FROM userDetails WHERE name = %s", (name,))
-            if not cursor.fetchone():
-                st.error(f"Unregistered student detected: {name}")
-                return False
-            
-            # Fetch all records for the current day and person
-            cursor.execute("""
-                SELECT * FROM attendance 
-                WHERE name = %s AND date = %s
-                ORDER BY entry1_in ASC
-            """, (name, today))
-            records = cursor.fetchall()
-            
-            if not records:
-                # No records exist for today, insert the first entry
-                cursor.execute("""
-                    INSERT INTO attendance (name, date, entry1_in, status) 
-                    VALUES (%s, %s, %s, 'Present')
-                """, (name, today, time_24))
-                # Play success sound
-                if os.path.exists(SUCCESS_SOUND):
-                    playsound(SUCCESS_SOUND)
-                return True
-            
-            # Get the last record
-            last_record = records[-1]
-            
-            # Find the next available entry (entry1_in, entry1_out, entry2_in, etc.)
-            for i in range(1, 6):  # Assuming there are 5 entries (entry1 to entry5)
-                entry_in = f"entry{i}_in"
-                entry_out = f"entry{i}_out"
-                entry_hours = f"entry{i}_hours"
-                
-                if not last_record[entry_in]:
-                    # If entry_in is empty, this is a new in_time entry
-                    if i > 1:
-                        # Check the gap between the previous out_time and the current in_time
-                        prev_entry_out = f"entry{i-1}_out"
-                        if last_record[prev_entry_out]:
-                            prev_out_time = datetime.strptime(last_record[prev_entry_out], "%H:%M:%S")
-                            current_time_obj = datetime.strptime(time_24, "%H:%M:%S")
-                            break_duration = (current_time_obj - prev_out_time).total_seconds() / 60
-                            
-                            if break_duration < 10:
-                                st.info("Need at least 10 minutes break between sessions")
-                                return False
-                    
-                    # Insert the new in_time
-                    cursor.execute(f"""
-                        UPDATE attendance 
-                        SET {entry_in} = %s, status = 'Present'
-                        WHERE name = %s AND date = %s
-                    """, (time_24, name, today))
-                    # Play success sound
-                    if os.path.exists(SUCCESS_SOUND):
-                        playsound(SUCCESS_SOUND)
-                    return True
-                
-                elif not last_record[entry_out]:
-                    # If entry_out is empty, this is an out_time entry
-                    stored_time = datetime.strptime(last_record[entry_in], "%H:%M:%S")
-                    current_time_obj = datetime.strptime(time_24, "%H:%M:%S")
-                    time_diff_minutes = (current_time_obj - stored_time).total_seconds() / 60
-                    
-                    if time_diff_minutes >= 10:
-                        # Update out_time and calculate working hours for this entry
-                        cursor.execute(f"""
-                            UPDATE attendance 
-                            SET {entry_out} = %s,
-                                {entry_hours} = TIMEDIFF(%s, {entry_in})
-                            WHERE name = %s AND date = %s AND {entry_out} IS NULL
-                        """, (time_24, time_24, name, today))
-                        
-                        # Calculate total_hours by summing up all entry_hours
-                        cursor.execute(f"""
-                            UPDATE attendance 
-                            SET total_hours = ADDTIME(
-                                IFNULL(entry1_hours, '00:00:00'),
-                                ADDTIME(
-                                    IFNULL(entry2_hours, '00:00:00'),
-                                    ADDTIME(
-                                        IFNULL(entry3_hours, '00:00:00'),
-                                        ADDTIME(
-                                            IFNULL(entry4_hours, '00:00:00'),
-                                            IFNULL(entry5_hours, '00:00:00')
-                                        )
-                                    )
-                                )
-                            )
-                            WHERE name = %s AND date = %s
-                        """, (name, today))
-                        
-                        # Play success sound
-                        if os.path.exists(SUCCESS_SOUND):
-                            playsound(SUCCESS_SOUND)
-                        return True
-                    else:
-                        st.info(f"Skipping update - less than 10 minutes since last entry")
-                        return False
-            
-            # If all entries are filled, do not allow further updates
-            st.info("Maximum entries reached for today")
-            return False
-            
-    except pymysql.Error as e:
+        return not _report_rejection(name, record_attendance(name, timestamp, connection))
+    except DB_ERRORS as e:
         st.error(f"Failed to save attendance: {e}")
         return False
     finally:
         connection.close()
 
+
+def save_attendance_event(event, connection):
+    """AttendanceWriter adapter: persist one AttendanceEvent; returns (marked, reason)"""
+    # Marks are stored to the minute, as the page's 12-hour times always were
+    result = record_attendance(event.name, event.timestamp.replace(second=0, microsecond=0), connection)
+    return result in ("in", "out"), result
+
+
+def show_writer_notices(writer):
+    """Show the rejections the background writer collected, on the page's own thread"""
+    for name, reason in writer.pop_notices():
+        _report_rejection(name, reason)
+
+
+def play_success_sound():
+    if os.path.exists(SUCCESS_SOUND):
+        from playsound import playsound
+        playsound(SUCCESS_SOUND)
+
+
+def warm_attendance_state():
+    """Load today's attendance state in one query so repeat sightings skip the database"""
+    connection = get_db_connection()
+    if connection is None:
+        return
+    try:
+        attendance_state.ensure_warm(connection)
+    except DB_ERRORS as e:
+        st.warning(f"Could not preload today's attendance: {e}")
+    finally:
+        connection.close()
+
+
+_attendance_writer = None
+
+def get_attendance_writer():
+    """Return the process-wide write-behind attendance writer, starting it on first use"""
+    global _attendance_writer
+    if _attendance_writer is None:
+        _attendance_writer = AttendanceWriter(
+            get_db_connection,
+            save_attendance_event,
+            on_marked=AsyncFeedback(play_success_sound).notify,
+            transient_errors=DB_ERRORS,
+        ).start()
+    return _attendance_writer
+
 # def take_attendance():
 #     """Live attendance page"""
 #     st.header("🎥 Live Attendance System")
@@ -340,15 +426,85 @@ def save_attendance_to_db(name, time_str):
 #             frame_placeholder.empty()
 
 # To keep track of the last recognized name
+def render_metrics_panel(placeholder):
+    """Show recognition counters and sampled stage latencies in a placeholder"""
+    snapshot = metrics.snapshot()
+    with placeholder.container():
+        st.caption(f"Metrics (stage timings sampled 1 in {snapshot['sample_every']})")
+        st.table([{"counter": name, "value": value} for name, value in sorted(snapshot["counters"].items())])
+        st.table([
+            {"stage": stage, "count": h["count"], "avg_ms": h["avg_ms"],
+             "p50_ms": h["p50_ms"], "p90_ms": h["p90_ms"], "p99_ms": h["p99_ms"]}
+            for stage, h in snapshot["stages"].items()
+        ])
+
+
+def render_kiosk_panel(placeholder, kiosk):
+    """Marked count, throughput and the latest names for a running kiosk"""
+    recent = ", ".join(f"{name} ({when:%H:%M:%S})" for when, name in reversed(kiosk.recent))
+    placeholder.markdown(
+        f"**{kiosk.marked}** marked · **{kiosk.people_per_minute():.1f}** people/min · "
+        f"{kiosk.elapsed_minutes():.1f} min running  \n"
+        f"Latest: {recent or '-'}"
+    )
+
+
 def take_attendance():
     """Live attendance page"""
     st.header("🎥 Live Attendance System")
 
+    last_kiosk = st.session_state.pop("kiosk_summary", None)
+    if last_kiosk:
+        st.info(f"Last kiosk session: {last_kiosk['marked']} people marked in {last_kiosk['minutes']} minutes "
+                f"({last_kiosk['people_per_minute']} per minute)")
+
+    kiosk_mode = st.sidebar.checkbox(
+        "Continuous kiosk mode", value=False,
+        help="Keep the camera open and mark everyone who reaches the required matches, until stopped",
+    )
+    tracking_mode = st.sidebar.checkbox(
+        "Tracking mode", value=False,
+        help="Run full detection only every N frames and follow faces in between",
+    )
+    detect_every = st.sidebar.number_input(
+        "Detect every N frames", min_value=1, max_value=30, value=DETECT_EVERY_N_FRAMES,
+        disabled=not tracking_mode,
+    )
+    motion_gating = st.sidebar.checkbox(
+        "Motion gating", value=True,
+        help="Skip detection while nothing moves and only search the changed region",
+    )
+    detector_names = list(DETECTORS)
+    detector_name = st.sidebar.selectbox(
+        "Face detector", detector_names,
+        index=detector_names.index(DEFAULT_DETECTOR) if DEFAULT_DETECTOR in detector_names else 0,
+        help="hog is the most accurate; haar, lbp, yunet and ssd are faster on CPU",
+    )
+    preview_fps = st.sidebar.number_input(
+        "Preview FPS", min_value=0, max_value=30, value=PREVIEW_FPS,
+        help="Frames per second sent to the browser; 0 turns the preview off. Recognition speed does not depend on it.",
+    )
+    show_metrics = st.sidebar.checkbox("Show metrics", value=False)
+    metrics_placeholder = st.sidebar.empty()
+    serve_metrics()
+
     if st.button("Take Attendance"):
+        try:
+            detector = create_detector(detector_name)
+        except (ValueError, FileNotFoundError) as e:
+            st.error(f"Cannot use the {detector_name} detector: {e}")
+            return
+        with st.spinner("Loading face models..."):
+            warm_up(detector)
+        # Read the feed version first so registrations during the load are replayed
+        gallery_version = get_gallery_version() or 0
         known_faces, known_names = load_known_faces()
-        if not known_faces:
+        if len(known_faces) == 0:
             st.warning("No registered faces found. Please register students first.")
             return
+        gallery = LiveGallery(build_gallery(known_faces, known_names), gallery_version,
+                              on_change=attendance_state.on_gallery_change)
+        gallery.follow(fetch_gallery_changes)
 
         progress_bar = st.progress(0)
         status_text = st.empty()
@@ -360,26 +516,100 @@ def take_attendance():
             return
 
         recognition_count.clear()  # Reset recognition counts at the start
+        gate = MotionGate() if motion_gating else None
+
+        if tracking_mode:
+            # Tracks are sequential state, so tracking uses a single in-order worker
+            tracker = FaceTracker(detect_every=detect_every)
+            recognize = lambda frame: recognize_tracked(frame, gallery, tracker, gate, detector)
+            annotate = annotate_tracked
+            empty_result = ([], [], [], {})
+            workers = 1
+        else:
+            recognize = lambda frame: recognize_faces(frame, gallery, gate, detector)
+            annotate = annotate_frame
+            empty_result = ([], [], [])
+            workers = DETECTION_WORKERS
+
+        def safe_recognize(frame):
+            try:
+                return recognize(frame)
+            except Exception as e:
+                metrics.inc("frame_errors")
+                print(f"❌ Error processing frame: {e}")
+                return empty_result
+
+        warm_attendance_state()
+        writer = get_attendance_writer()
+        pipeline = RecognitionPipeline(
+            cap, safe_recognize, persist_fn=writer.submit,
+            workers=workers, thread_hook=add_script_run_ctx,
+            on_drop=lambda: metrics.inc("dropped_frames"),
+            worker_init=lambda: warm_up(detector),  # Detector models are per thread
+        )
+        # Frames are drawn, downscaled and sent on the preview thread; this loop only counts votes
+        preview = LivePreview(
+            frame_placeholder, lambda frame, *boxes: draw_faces(frame, *boxes),
+            fps=preview_fps, thread_hook=add_script_run_ctx,
+        )
+        kiosk = KioskSession(pipeline.persist, MIN_REQUIRED_FRAMES) if kiosk_mode else None
+        if kiosk:
+            st.button("Stop kiosk")  # Any click reruns the page, which ends the loop below
+            progress_bar.empty()
+        kiosk_panel = st.empty()
+        last_metrics_update = time.monotonic()
+        last_progress = -1
 
         try:
+            pipeline.start()
+            preview.start()
+            status_text.text("Kiosk running - students are marked as they pass" if kiosk else "Processing...")
             start_time = datetime.now()
-            while (datetime.now() - start_time).seconds < CAMERA_DURATION:
-                progress = int(((datetime.now() - start_time).seconds / CAMERA_DURATION) * 100)
-                progress_bar.progress(progress)
-                status_text.text("Processing...")
-
-                ret, frame = cap.read()
-                if not ret:
-                    st.error("Failed to capture frame from camera")
-                    break
-
-                processed_frame, attendance_marked, recognized_names = process_frame(frame, known_faces, known_names)
-
-                # ✅ Track how many times each name is recognized
-                for name in recognized_names:
-                    recognition_count[name] = recognition_count.get(name, 0) + 1
-
-                frame_placeholder.image(processed_frame, channels="BGR")
+            while (kiosk or (datetime.now() - start_time).seconds < CAMERA_DURATION) and pipeline.running:
+                if not kiosk:
+                    progress = int(((datetime.now() - start_time).seconds / CAMERA_DURATION) * 100)
+                    if progress != last_progress:
+                        last_progress = progress
+                        progress_bar.progress(progress)
+
+                item = pipeline.next_result()
+                if item is None:
+                    continue
+                render_start = time.perf_counter()
+                frame, result = item
+                if kiosk:
+                    # Every identity is voted on independently and marked as soon as it qualifies
+                    if tracking_mode:
+                        kiosk.observe_tracks(result[3], retire=tracker.retire)
+                    else:
+                        kiosk.observe_matches(result[1], result[2])
+                else:
+                    processed_frame, attendance_marked, recognized_names = annotate(frame, *result, draw=False)
+
+                    # ✅ Track how many times each name is recognized
+                    for name in recognized_names:
+                        recognition_count[name] = recognition_count.get(name, 0) + 1
+
+                preview.offer(frame, result[0], face_labels(result[1]))
+                pipeline.rendered(time.perf_counter() - render_start)
+
+                if time.monotonic() - last_metrics_update >= METRICS_PANEL_REFRESH:
+                    last_metrics_update = time.monotonic()
+                    metrics.write_snapshot()
+                    if show_metrics:
+                        render_metrics_panel(metrics_placeholder)
+                    if kiosk:
+                        render_kiosk_panel(kiosk_panel, kiosk)
+                    show_writer_notices(writer)
+
+            if pipeline.capture_error:
+                st.error(pipeline.capture_error)
+
+            if kiosk:
+                summary = kiosk.summary()
+                status_text.success(f"Kiosk stopped: {summary['marked']} people marked "
+                                    f"({summary['people_per_minute']} per minute)")
+                return
 
             # ✅ Determine the most consistently recognized face
             most_recognized_name = max(
@@ -388,19 +618,31 @@ def take_attendance():
 
             # ✅ Only mark attendance if seen in at least MIN_REQUIRED_FRAMES frames
             if most_recognized_name and recognition_count[most_recognized_name] >= MIN_REQUIRED_FRAMES:
-                mark_attendance(most_recognized_name)
+                pipeline.persist(most_recognized_name)
                 status_text.success(f"Attendance marked successfully for: {most_recognized_name}")
-                playsound(SUCCESS_SOUND)
             else:
                 status_text.warning("No faces recognized!")
 
         except Exception as e:
             st.error(f"An error occurred: {e}")
         finally:
+            if kiosk:
+                # Shown after the rerun that a "Stop kiosk" click triggers
+                st.session_state["kiosk_summary"] = kiosk.summary()
+            preview.stop()
+            pipeline.stop()
+            writer.flush(timeout=5)
+            show_writer_notices(writer)
+            gallery.stop()
             cap.release()
             cv2.destroyAllWindows()
             progress_bar.empty()
             frame_placeholder.empty()
+            st.caption("Pipeline stage statistics")
+            st.table(pipeline.stats())
+            metrics.write_snapshot()
+            if show_metrics:
+                render_metrics_panel(metrics_placeholder)
 
 
 def main():
@@ -0,0 +1,28 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_config2  # noqa: E402
+from db_config2 import ConnectionPool, SQLiteBackend  # noqa: E402
+
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    """A fresh SQLite database behind the process-wide pool"""
+    pool = ConnectionPool(SQLiteBackend(str(tmp_path / "attendance.db")), max_size=4)
+    monkeypatch.setattr(db_config2, "_pool", pool)
+    yield pool
+    pool.close_all()
+
+
+@pytest.fixture
+def students(pool):
+    """Register students by name; returns the helper"""
+    def register(*names):
+        with pool.connection() as connection, connection.cursor() as cursor:
+            cursor.executemany("INSERT INTO userDetails (name) VALUES (%s)", [(name,) for name in names])
+    return register
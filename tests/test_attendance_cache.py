@@ -0,0 +1,67 @@
+# tests/test_attendance_cache.py
+from datetime import datetime, timedelta
+
+import take_attendace
+from attendance_cache import AttendanceStateCache
+from db_config2 import mark_attendance_session
+
+NOW = datetime.now().replace(microsecond=0)
+
+
+def warm_cache(pool):
+    cache = AttendanceStateCache()
+    with pool.connection() as connection:
+        cache.warm(connection, NOW.date())
+    return cache
+
+
+def test_too_soon_is_rejected_without_the_database(pool, students):
+    students("alice")
+    with pool.connection() as connection:
+        assert mark_attendance_session(connection, "alice", NOW) == "in"
+    cache = warm_cache(pool)
+
+    assert cache.check("alice", NOW + timedelta(minutes=5)) == "too_soon"
+    assert cache.check("alice", NOW + timedelta(minutes=10)) is None
+    assert cache.hits == 1
+
+
+def test_unknown_name_falls_through_to_the_database(pool, students):
+    cache = warm_cache(pool)
+    students("late_registration")
+
+    assert cache.check("late_registration", NOW) is None
+    assert cache.misses == 1
+    with pool.connection() as connection:
+        result = mark_attendance_session(connection, "late_registration", NOW)
+    assert result == "in"
+    cache.apply("late_registration", NOW, result)
+    assert cache.check("late_registration", NOW + timedelta(minutes=1)) == "too_soon"
+
+
+def test_gallery_changes_update_the_cache(pool, students):
+    students("alice")
+    cache = warm_cache(pool)
+    cache.on_gallery_change("add", "bob")
+    assert "bob" in cache.students
+    cache.on_gallery_change("remove", "alice")
+    assert "alice" not in cache.students
+
+
+def test_unregistered_names_are_rejected_from_memory(pool, monkeypatch):
+    cache = warm_cache(pool)
+    monkeypatch.setattr(take_attendace, "attendance_state", cache)
+    writes = []
+
+    def counting_mark(connection, name, timestamp):
+        writes.append(name)
+        return mark_attendance_session(connection, name, timestamp)
+
+    monkeypatch.setattr(take_attendace, "mark_attendance_session", counting_mark)
+    with pool.connection() as connection:
+        assert take_attendace.record_attendance("stranger", NOW, connection) == "unregistered"
+        assert take_attendace.record_attendance("stranger", NOW + timedelta(minutes=1), connection) == "unregistered"
+    assert writes == ["stranger"]
+
+    cache.on_gallery_change("add", "stranger")
+    assert cache.check("stranger", NOW) is None
@@ -0,0 +1,38 @@
+# tests/test_attendance_service.py
+import multiprocessing
+
+import numpy as np
+
+import attendance_service
+import db_config2
+from face_cache import ENCODING_DIM
+from gallery import SharedGallery
+
+
+def worker_pool_state(args):
+    handle, parent_pool_id = args
+    attendance_service._init_worker(handle, 0, None, None)
+    pool = db_config2.get_pool()
+    with pool.connection() as connection, connection.cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) AS n FROM userDetails")
+        students = cursor.fetchone()["n"]
+    attendance_service._gallery.stop()
+    return id(pool) != parent_pool_id, pool.metrics()["created"], students
+
+
+def test_camera_workers_get_a_fresh_pool(pool, students):
+    students("alice")
+    pool.acquire().close()  # The parent keeps an idle connection, as main() does before forking
+    assert pool.metrics()["idle"] == 1
+
+    shared = SharedGallery(np.zeros((1, ENCODING_DIM)), ["alice"])
+    try:
+        with multiprocessing.get_context("fork").Pool(1) as workers:
+            fresh, created, count = workers.map(worker_pool_state, [(shared.handle, id(pool))])[0]
+    finally:
+        shared.close()
+
+    assert fresh
+    assert created == 1  # The worker opened its own connection instead of reusing the parent's
+    assert count == 1
+    assert pool.metrics()["idle"] == 1
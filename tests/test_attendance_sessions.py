@@ -0,0 +1,43 @@
+# tests/test_attendance_sessions.py
+from datetime import datetime
+
+from db_config2 import mark_attendance_session
+
+DAY = datetime(2026, 10, 12)
+
+
+def mark(pool, name, hour, minute):
+    with pool.connection() as connection:
+        return mark_attendance_session(connection, name, DAY.replace(hour=hour, minute=minute))
+
+
+def test_session_rules(pool, students):
+    students("alice")
+    assert mark(pool, "alice", 9, 0) == "in"
+    assert mark(pool, "alice", 9, 5) == "too_soon"
+    assert mark(pool, "alice", 9, 10) == "out"
+    assert mark(pool, "alice", 9, 15) == "too_soon"
+    assert mark(pool, "alice", 9, 20) == "in"
+    assert mark(pool, "bob", 9, 0) == "unregistered"
+
+    with pool.connection() as connection, connection.cursor() as cursor:
+        cursor.execute("SELECT session_no, time_in, time_out FROM attendance_sessions ORDER BY session_no")
+        sessions = cursor.fetchall()
+        cursor.execute("SELECT status FROM attendance WHERE name = 'alice'")
+        status = cursor.fetchone()["status"]
+    assert [(s["session_no"], s["time_out"]) for s in sessions] == [
+        (1, "2026-10-12 09:10:00"), (2, None),
+    ]
+    assert status == "Present"
+
+
+def test_daily_view_totals_sessions(pool, students):
+    students("alice")
+    for hour, minute in ((9, 0), (10, 30), (11, 0), (12, 0)):
+        mark(pool, "alice", hour, minute)
+    with pool.connection() as connection, connection.cursor() as cursor:
+        cursor.execute("SELECT entry1_in, entry2_out, total_hours, status FROM attendance_daily")
+        row = cursor.fetchone()
+    assert (str(row["entry1_in"]), str(row["entry2_out"])) == ("09:00:00", "12:00:00")
+    assert str(row["total_hours"]) == "02:30:00"
+    assert row["status"] == "Present"
@@ -0,0 +1,73 @@
+# tests/test_attendance_view.py
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+import manage_students3
+from db_config2 import ensure_daily_roster, get_attendance_version, mark_attendance_session
+
+MONDAY = date(2026, 10, 5)
+
+
+def at(day, hour, minute=0):
+    return datetime.combine(day, datetime.min.time()).replace(hour=hour, minute=minute)
+
+
+def fetch_page(after, start=MONDAY, end=MONDAY + timedelta(days=1)):
+    return manage_students3.fetch_attendance_page(start, end, (), after, 0)
+
+
+def test_version_bumps_once_per_write(pool, students):
+    students(*[f"student{i}" for i in range(30)])
+    version = get_attendance_version()
+    assert ensure_daily_roster(MONDAY, chunk_size=7) == 30
+    assert get_attendance_version() == version + 1
+
+    with pool.connection() as connection:
+        assert mark_attendance_session(connection, "student1", at(MONDAY, 9)) == "in"
+        assert get_attendance_version() == version + 2
+        assert mark_attendance_session(connection, "student1", at(MONDAY, 9, 1)) == "too_soon"
+    assert get_attendance_version() == version + 2
+
+
+def test_keyset_pages_cover_every_row_once(pool, students, monkeypatch):
+    names = [f"student{i:02d}" for i in range(6)]
+    students(*names)
+    for offset in range(2):
+        ensure_daily_roster(MONDAY + timedelta(days=offset))
+    monkeypatch.setattr(manage_students3, "PAGE_SIZE", 4)
+    manage_students3.fetch_attendance_page.clear()
+
+    pages, after = [], None
+    while True:
+        page = fetch_page(after)
+        has_next = len(page) > 4
+        page = page.iloc[:4]
+        pages.append([(str(row.date), row.name) for row in page.itertuples()])
+        if not has_next:
+            break
+        after = (page.iloc[-1]["date"], page.iloc[-1]["name"])
+    manage_students3.fetch_attendance_page.clear()
+
+    # 12 rows are exactly three pages: the last one must not offer an empty fourth
+    assert [len(page) for page in pages] == [4, 4, 4]
+    rows = [row for page in pages for row in page]
+    assert rows == [(str(MONDAY + timedelta(days=d)), name) for d in (1, 0) for name in names]
+
+
+def test_page_matches_the_daily_view(pool, students):
+    students("alice", "bob")
+    ensure_daily_roster(MONDAY)
+    with pool.connection() as connection:
+        for hour, minute in ((9, 0), (10, 30), (11, 0)):
+            mark_attendance_session(connection, "alice", at(MONDAY, hour, minute))
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT * FROM attendance_daily ORDER BY date DESC, name ASC")
+            view = cursor.fetchall()
+    manage_students3.fetch_attendance_page.clear()
+    page = fetch_page(None, MONDAY, MONDAY)
+    manage_students3.fetch_attendance_page.clear()
+
+    pd.testing.assert_frame_equal(page, pd.DataFrame(view, columns=page.columns))
+    assert page.loc[0, "entry1_hours"] == "01:30:00" and pd.isna(page.loc[0, "entry2_out"])
+    assert page.loc[1, "status"] == "Absent"
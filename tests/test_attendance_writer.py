@@ -0,0 +1,101 @@
+# tests/test_attendance_writer.py
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+import attendance_writer
+from attendance_writer import AttendanceEvent, AttendanceWriter, coalesce
+from db_config2 import DB_ERRORS, get_db_connection, mark_attendance_session
+
+T0 = datetime(2026, 10, 12, 9, 0, 5)
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(attendance_writer, "RETRY_BACKOFF", 0)
+
+
+def save(event, connection):
+    result = mark_attendance_session(connection, event.name, event.timestamp)
+    return result in ("in", "out"), result
+
+
+def make_writer(tmp_path, connect_fn=get_db_connection, save_fn=save, **kwargs):
+    kwargs.setdefault("max_retries", 0)
+    return AttendanceWriter(
+        connect_fn, save_fn, spool_path=str(tmp_path / "spool.jsonl"),
+        dead_letter_path=str(tmp_path / "dead.jsonl"), transient_errors=DB_ERRORS,
+        flush_interval=0.05, **kwargs,
+    )
+
+
+def test_coalesce_drops_only_same_minute_duplicates():
+    events = [
+        AttendanceEvent("alice", T0.replace(minute=8)),
+        AttendanceEvent("alice", T0),
+        AttendanceEvent("alice", T0.replace(second=40)),
+        AttendanceEvent("bob", T0),
+    ]
+    kept = coalesce(events)
+    assert [(e.name, e.timestamp.minute) for e in kept] == [("alice", 0), ("bob", 0), ("alice", 8)]
+
+
+def test_batch_keeps_valid_marks_and_reports_rejections(pool, students, tmp_path):
+    students("alice")
+    writer = make_writer(tmp_path).start()
+    for minute in (0, 8, 12):
+        writer.submit("alice", T0.replace(minute=minute))
+    writer.submit("alice", T0.replace(second=30))
+    assert writer.flush(timeout=5)
+    writer.close()
+
+    assert writer.stats["committed"] == 2
+    assert writer.stats["rejected"] == 1
+    assert writer.stats["coalesced"] == 1
+    assert writer.pop_notices() == [("alice", "too_soon")]
+
+
+def test_failed_batches_are_spooled_and_replayed(pool, students, tmp_path):
+    students("alice")
+    offline = make_writer(tmp_path, connect_fn=lambda: None).start()
+    offline.submit("alice", T0)
+    assert offline.flush(timeout=5)
+    offline.close()
+    assert offline.stats["spooled"] == 1
+    assert offline.pop_notices() == [("alice", "spooled")]
+    assert (tmp_path / "spool.jsonl").exists()
+
+    online = make_writer(tmp_path).start()
+    assert online.flush(timeout=5)
+    online.close()
+    assert online.stats["committed"] == 1
+    assert not (tmp_path / "spool.jsonl").exists()
+
+
+def test_events_that_keep_failing_are_dead_lettered(pool, tmp_path):
+    def broken(event, connection):
+        raise ValueError("bad event")
+
+    writer = make_writer(tmp_path, save_fn=broken, max_event_attempts=1).start()
+    writer.submit("alice", T0)
+    assert writer.flush(timeout=5)
+    writer.close()
+
+    assert writer.stats["dead_lettered"] == 1
+    assert writer.stats["spooled"] == 0
+    line = (tmp_path / "dead.jsonl").read_text().strip()
+    assert AttendanceEvent.from_json(line).name == "alice"
+
+
+def test_database_errors_are_spooled_not_dead_lettered(pool, tmp_path):
+    def outage(event, connection):
+        raise sqlite3.OperationalError("database is locked")
+
+    writer = make_writer(tmp_path, save_fn=outage, max_event_attempts=1).start()
+    writer.submit("alice", T0)
+    assert writer.flush(timeout=5)
+    writer.close()
+
+    assert writer.stats["spooled"] == 1
+    assert writer.stats["dead_lettered"] == 0
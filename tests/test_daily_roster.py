@@ -0,0 +1,24 @@
+# tests/test_daily_roster.py
+from datetime import date
+
+from db_config2 import ensure_daily_roster
+
+DAY = date(2026, 10, 12)
+
+
+def test_roster_only_tops_up_new_students(pool, students):
+    students("alice", "bob")
+    assert ensure_daily_roster(DAY) == 2
+    assert ensure_daily_roster(DAY) == 0
+    students("carol")
+    assert ensure_daily_roster(DAY) == 1
+
+
+def test_roster_walks_students_in_chunks(pool, students):
+    students(*[f"student{i}" for i in range(25)])
+    assert ensure_daily_roster(DAY, chunk_size=4) == 25
+    with pool.connection() as connection, connection.cursor() as cursor:
+        cursor.execute("SELECT last_student_id FROM roster_days WHERE date = %s", (str(DAY),))
+        assert cursor.fetchone()["last_student_id"] == 25
+        cursor.execute("SELECT COUNT(*) AS n FROM attendance WHERE status = 'Absent'")
+        assert cursor.fetchone()["n"] == 25
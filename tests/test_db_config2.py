@@ -0,0 +1,111 @@
+# tests/test_db_config2.py
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import db_config2
+from db_config2 import ConnectionPool, SQLiteBackend
+
+
+def test_pool_never_exceeds_max_size(tmp_path):
+    pool = ConnectionPool(SQLiteBackend(str(tmp_path / "pool.db")), max_size=2)
+    peak = []
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(20):
+            with pool.connection():
+                metrics = pool.metrics()
+                with lock:
+                    peak.append(metrics["in_use"] + metrics["idle"])
+                time.sleep(0.001)
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    metrics = pool.metrics()
+    assert max(peak) <= 2
+    assert metrics["created"] <= 2
+    assert metrics["in_use"] == 0
+    assert metrics["acquired"] == 120
+    pool.close_all()
+
+
+def test_pool_times_out_when_exhausted(tmp_path):
+    pool = ConnectionPool(SQLiteBackend(str(tmp_path / "pool.db")), max_size=1)
+    held = pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.05)
+    held.close()
+    pool.acquire(timeout=0.05).close()
+    assert pool.metrics()["timeouts"] == 1
+    pool.close_all()
+
+
+def test_pool_recycles_expired_connections(tmp_path):
+    pool = ConnectionPool(SQLiteBackend(str(tmp_path / "pool.db")), max_size=2, max_lifetime=0)
+    pool.acquire().close()
+    pool.acquire().close()
+    metrics = pool.metrics()
+    assert metrics["created"] == 2
+    assert metrics["in_use"] + metrics["idle"] <= 2
+    pool.close_all()
+
+
+def test_broken_connections_are_not_reused(pool):
+    with pytest.raises(Exception):
+        with pool.connection() as connection, connection.cursor() as cursor:
+            cursor.execute("SELECT * FROM no_such_table")
+    assert pool.metrics()["idle"] == 0
+
+
+def test_concurrent_first_connects_to_a_new_database(tmp_path):
+    errors = []
+    for trial in range(50):
+        backend = SQLiteBackend(str(tmp_path / f"fresh{trial}.db"))
+
+        def connect():
+            try:
+                backend.connect()._raw.close()
+            except sqlite3.OperationalError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=connect) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert errors == []
+
+
+def test_sqlite_translates_mysql_upserts(pool, students):
+    students("alice")
+    with pool.connection() as connection, connection.cursor() as cursor:
+        for status in ("Absent", "Present"):
+            cursor.execute("""
+                INSERT INTO attendance (name, date, status) VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE status = VALUES(status)
+            """, ("alice", "2026-10-12", status))
+        cursor.execute("INSERT IGNORE INTO userDetails (name) VALUES (%s)", ("alice",))
+        cursor.execute("SELECT status FROM attendance WHERE name = 'alice'")
+        assert [row["status"] for row in cursor.fetchall()] == ["Present"]
+        cursor.execute("SELECT COUNT(*) AS n FROM userDetails")
+        assert cursor.fetchone()["n"] == 1
+
+
+def test_connection_failures_are_logged_not_shown(monkeypatch, caplog):
+    class Unreachable:
+        name = "sqlite"
+
+        def connect(self):
+            raise sqlite3.OperationalError("unable to open database file")
+
+    monkeypatch.setattr(db_config2, "_pool", ConnectionPool(Unreachable(), max_size=1))
+    monkeypatch.setattr(db_config2.st, "error", lambda *args: pytest.fail("st.error called"))
+    assert db_config2.get_db_connection() is None
+    assert "Failed to connect to database" in caplog.text
@@ -0,0 +1,45 @@
+# tests/test_enrollment.py
+import numpy as np
+import pytest
+
+import enrollment
+from face_cache import ENCODING_DIM, FaceEncodingCache
+
+
+@pytest.fixture
+def faces_dir(tmp_path, monkeypatch):
+    """An empty gallery whose uploads encode to a vector derived from their bytes"""
+    monkeypatch.setattr(
+        enrollment, "encode_upload",
+        lambda image_bytes: np.full(ENCODING_DIM, float(len(image_bytes))),
+    )
+    faces = tmp_path / "known_faces"
+    faces.mkdir()
+    return faces
+
+
+def _changes(pool):
+    with pool.connection() as connection, connection.cursor() as cursor:
+        cursor.execute("SELECT op, name FROM gallery_changes ORDER BY version")
+        return [(row["op"], row["name"]) for row in cursor.fetchall()]
+
+
+def test_enrolling_updates_one_cache_entry(pool, faces_dir, monkeypatch):
+    faces_dir.joinpath("bob.png").write_bytes(b"old bob")
+    FaceEncodingCache(str(faces_dir), enrollment.ALLOWED_EXTENSIONS).sync(
+        lambda filepath: np.zeros(ENCODING_DIM)
+    )
+    monkeypatch.setattr(FaceEncodingCache, "sync", lambda *args, **kwargs: pytest.fail("full cache sync"))
+
+    with pool.connection() as connection:
+        assert enrollment.enroll_student(connection, "alice", b"a" * 10, str(faces_dir)) == "add"
+        assert enrollment.enroll_student(connection, "bob", b"b" * 20, str(faces_dir)) == "update"
+        assert enrollment.remove_student_face(connection, "alice", str(faces_dir))
+    monkeypatch.undo()
+
+    assert sorted(p.name for p in faces_dir.iterdir() if p.is_file()) == ["bob.jpg"]
+    matrix, names, _ = FaceEncodingCache(str(faces_dir), enrollment.ALLOWED_EXTENSIONS).sync(
+        lambda filepath: pytest.fail(f"{filepath} was re-encoded")
+    )
+    assert names == ["bob"] and np.array_equal(matrix[0], np.full(ENCODING_DIM, 20.0))
+    assert _changes(pool) == [("add", "alice"), ("update", "bob"), ("remove", "alice")]
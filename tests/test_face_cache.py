@@ -0,0 +1,98 @@
+# tests/test_face_cache.py
+import json
+
+import numpy as np
+import pytest
+
+from face_cache import ENCODING_DIM, FaceEncodingCache
+
+
+def _make_faces(directory, names):
+    for i, name in enumerate(names):
+        directory.joinpath(f"{name}.jpg").write_bytes(bytes([i]) * 16)
+
+
+def _encoder(seed=0):
+    rng = np.random.default_rng(seed)
+    return lambda filepath: rng.normal(size=ENCODING_DIM)
+
+
+def test_float32_copy_is_written_once(tmp_path):
+    _make_faces(tmp_path, ["alice", "bob"])
+    cache = FaceEncodingCache(str(tmp_path), {".jpg"})
+    matrix, names, _ = cache.sync(_encoder())
+    first = cache.float32_matrix(matrix)
+    assert first.dtype == np.float32 and np.allclose(first, matrix, atol=1e-6)
+    assert cache.float32_matrix(matrix).filename == first.filename
+
+
+def test_each_write_gets_a_new_generation_and_removes_the_old(tmp_path):
+    _make_faces(tmp_path, ["alice", "bob"])
+    cache = FaceEncodingCache(str(tmp_path), {".jpg"})
+    matrix, _, _ = cache.sync(_encoder())
+    cache.float32_matrix(matrix)
+    first = cache.generation
+
+    _make_faces(tmp_path, ["carol"])
+    matrix, names, _ = cache.sync(_encoder(1))
+    assert names == ["alice", "bob", "carol"] and cache.generation != first
+    leftover = sorted(p.name for p in tmp_path.joinpath(".encoding_cache").iterdir())
+    assert leftover == sorted(["index.json", f"encodings-{cache.generation}.npy"])
+
+
+def test_index_is_never_paired_with_another_writers_matrix(tmp_path):
+    _make_faces(tmp_path, ["alice", "bob"])
+    cache = FaceEncodingCache(str(tmp_path), {".jpg"})
+    expected, _, _ = cache.sync(_encoder())
+    expected = np.array(expected)
+
+    # A second writer lands a same-shaped matrix under its own generation; the index still names ours
+    cache_dir = tmp_path.joinpath(".encoding_cache")
+    np.save(cache_dir.joinpath("encodings-other.npy"), np.zeros_like(expected))
+    reader = FaceEncodingCache(str(tmp_path), {".jpg"})
+    files, matrix = reader._read_index()
+    assert np.array_equal(matrix, expected)
+
+    # An index whose matrix has vanished is treated as a cold cache, not a crash
+    index = json.loads(cache_dir.joinpath("index.json").read_text())
+    cache_dir.joinpath(f"encodings-{index['generation']}.npy").unlink()
+    files, matrix = reader._read_index()
+    assert files == {} and matrix.shape == (0, ENCODING_DIM)
+
+
+def test_atomic_write_leaves_no_temporary_file_on_failure(tmp_path):
+    from face_cache import atomic_write
+
+    def fail(f):
+        f.write(b"partial")
+        raise RuntimeError("disk full")
+
+    target = tmp_path / "index.json"
+    try:
+        atomic_write(str(target), fail)
+    except RuntimeError:
+        pass
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_update_touches_only_the_given_files(tmp_path, monkeypatch):
+    _make_faces(tmp_path, ["alice", "bob"])
+    cache = FaceEncodingCache(str(tmp_path), {".jpg"})
+    matrix, _, _ = cache.sync(_encoder())
+    bob = np.array(matrix[1])
+
+    # Re-enroll alice, enroll carol and delete bob without a directory scan
+    monkeypatch.setattr(FaceEncodingCache, "_scan", lambda self: pytest.fail("update scanned the directory"))
+    new_alice, carol = np.full(ENCODING_DIM, 0.5), np.full(ENCODING_DIM, -0.5)
+    tmp_path.joinpath("alice.jpg").write_bytes(b"new alice")
+    _make_faces(tmp_path, ["carol"])
+    cache.update({"alice.jpg": new_alice, "carol.jpg": carol})
+    tmp_path.joinpath("bob.jpg").unlink()
+    cache.update(removed=["bob.jpg"])
+    monkeypatch.undo()
+
+    # The next sync finds nothing to encode and compacts the replaced and removed rows away
+    matrix, names, _ = cache.sync(lambda filepath: pytest.fail(f"{filepath} was re-encoded"))
+    assert names == ["alice", "carol"] and matrix.shape == (2, ENCODING_DIM)
+    assert np.array_equal(matrix[0], new_alice) and np.array_equal(matrix[1], carol)
+    assert not any(np.array_equal(row, bob) for row in matrix)
@@ -0,0 +1,93 @@
+# tests/test_gallery.py
+import numpy as np
+import pytest
+
+from face_cache import ENCODING_DIM
+import gallery
+from gallery import Gallery, IVFIndex, QuantizedIndex, SharedGallery, build_gallery
+
+TOLERANCE = 0.4
+
+
+@pytest.fixture(scope="module")
+def encodings():
+    rng = np.random.default_rng(0)
+    return rng.normal(0.0, 0.09, size=(2000, ENCODING_DIM)).astype(np.float32)
+
+
+@pytest.fixture(scope="module")
+def queries(encodings):
+    rng = np.random.default_rng(1)
+    genuine = encodings[:150] + rng.normal(0.0, 0.01, size=(150, ENCODING_DIM))
+    impostors = rng.normal(0.0, 0.09, size=(50, ENCODING_DIM))
+    return np.vstack([genuine, impostors]).astype(np.float32)
+
+
+def names_for(encodings):
+    return [f"student{i}" for i in range(len(encodings))]
+
+
+def assert_same_decisions(encodings, queries, index):
+    names = names_for(encodings)
+    exact_names, exact_distances = Gallery(encodings, names).match(queries, TOLERANCE)
+    other_names, other_distances = Gallery(encodings, names, index=index).match(queries, TOLERANCE)
+
+    # Approximate indexes may miss the nearest impostor, but never change a decision
+    assert other_names == exact_names
+    matched = [name is not None for name in exact_names]
+    assert np.allclose(np.array(other_distances)[matched], np.array(exact_distances)[matched], atol=1e-4)
+
+
+def test_ivf_agrees_with_exact_search(encodings, queries):
+    assert_same_decisions(encodings, queries, IVFIndex())
+
+
+@pytest.mark.parametrize("precision", ["int8", "float16"])
+def test_quantized_index_agrees_with_exact_search(encodings, queries, precision):
+    assert_same_decisions(encodings, queries, QuantizedIndex(precision))
+
+
+def test_quantized_index_is_smaller(encodings):
+    index = QuantizedIndex("int8")
+    Gallery(encodings, names_for(encodings), index=index)
+    assert index.nbytes < encodings.nbytes / 2
+
+
+def test_genuine_queries_match_their_row(encodings, queries):
+    matched, _ = Gallery(encodings, names_for(encodings)).match(queries[:150], TOLERANCE)
+    assert matched == names_for(encodings)[:150]
+
+
+def test_top_k_is_sorted(encodings, queries):
+    candidates = Gallery(encodings, names_for(encodings)).top_k(queries[:3], k=5)
+    for row in candidates:
+        distances = [d for _, d in row]
+        assert len(row) == 5 and distances == sorted(distances)
+
+
+def test_empty_gallery_matches_nothing():
+    names, distances = Gallery(np.empty((0, ENCODING_DIM)), []).match(np.zeros((2, ENCODING_DIM)), TOLERANCE)
+    assert names == [None, None]
+    assert distances == [float("inf")] * 2
+
+
+
+@pytest.mark.parametrize("precision,index_type", [
+    ("float32", IVFIndex), ("int8", QuantizedIndex), ("float16", QuantizedIndex),
+])
+def test_shared_gallery_index_is_built_once(encodings, queries, monkeypatch, precision, index_type):
+    monkeypatch.setattr(gallery, "IVF_MIN_GALLERY_SIZE", 1000)
+    expected = build_gallery(encodings, names_for(encodings), precision=precision).search(queries, 3)
+    shared = SharedGallery(encodings, names_for(encodings), precision=precision)
+    try:
+        # Workers restore the parent's codes and clusters instead of recomputing them
+        monkeypatch.setattr(index_type, "build", lambda *args: pytest.fail("index rebuilt on attach"))
+        attached, shm = SharedGallery.attach(shared.handle)
+        assert isinstance(attached.index, index_type)
+        assert all(not array.flags.writeable for array in attached.index.arrays().values())
+        indices, distances = attached.search(queries, 3)
+        assert np.array_equal(indices, expected[0]) and np.allclose(distances, expected[1])
+        del attached
+        shm.close()
+    finally:
+        shared.close()
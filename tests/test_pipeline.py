@@ -0,0 +1,65 @@
+# tests/test_pipeline.py
+import threading
+import time
+
+import numpy as np
+
+from detectors import Detector
+from pipeline import RecognitionPipeline
+
+
+class CountingDetector(Detector):
+    """Records which threads loaded a model and which detected while still cold"""
+    name = "counting"
+
+    def __init__(self):
+        super().__init__()
+        self.loaded_on = []
+        self.cold_frames = 0
+        self._lock = threading.Lock()
+
+    def _load(self):
+        time.sleep(0.05)  # A model load is slow enough to be noticed on a frame
+        with self._lock:
+            self.loaded_on.append(threading.current_thread().name)
+        return object()
+
+    def _detect(self, model, rgb):
+        return []
+
+    def detect_frame(self, rgb):
+        with self._lock:
+            if getattr(self._local, "model", None) is None:
+                self.cold_frames += 1
+        return self.detect(rgb)
+
+
+class Camera:
+    def __init__(self):
+        self.reads = 0
+
+    def read(self):
+        self.reads += 1
+        time.sleep(0.005)
+        return True, np.zeros((8, 8, 3), dtype=np.uint8)
+
+
+def test_every_worker_is_warm_before_the_first_frame():
+    detector = CountingDetector()
+    camera = Camera()
+    warm_frame = np.zeros((8, 8, 3), dtype=np.uint8)
+    pipeline = RecognitionPipeline(
+        camera, detector.detect_frame, workers=3,
+        worker_init=lambda: detector.detect(warm_frame),
+    )
+    pipeline.start()
+    try:
+        assert sorted(detector.loaded_on) == ["recognize-0", "recognize-1", "recognize-2"]
+        deadline = time.monotonic() + 2
+        while pipeline.recognize_stats.processed < 10 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        pipeline.stop()
+    assert pipeline.recognize_stats.processed >= 10
+    assert detector.cold_frames == 0
+    assert len(detector.loaded_on) == 3
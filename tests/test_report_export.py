@@ -0,0 +1,17 @@
+# tests/test_report_export.py
+from datetime import date
+
+from db_config2 import ensure_daily_roster
+from report_export import export_csv
+
+DAY = date(2026, 10, 12)
+
+
+def test_csv_export_streams_every_row(pool, students):
+    students(*[f"Zoë {i}" for i in range(5)])
+    ensure_daily_roster(DAY)
+    buffer = export_csv(DAY, DAY)
+    lines = buffer.read().decode("utf-8").splitlines()
+    buffer.close()
+    assert lines[0].startswith("name,date,")
+    assert sorted(line.split(",")[0] for line in lines[1:]) == [f"Zoë {i}" for i in range(5)]
@@ -0,0 +1,66 @@
+# tests/test_rollups.py
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from db_config2 import mark_attendance_session, rebuild_attendance_rollups
+from report_export import query_student_summary
+
+MONDAY = date(2026, 10, 5)
+
+
+def read_rollups(pool):
+    tables = {}
+    with pool.connection() as connection, connection.cursor() as cursor:
+        for table, order in (("attendance_rollup_daily", "student_id, date"),
+                             ("attendance_rollup_weekly", "student_id, week_start"),
+                             ("attendance_rollup_days", "date")):
+            cursor.execute(f"SELECT * FROM {table} ORDER BY {order}")
+            tables[table] = cursor.fetchall()
+    return tables
+
+
+@pytest.fixture
+def history(pool, students):
+    """alice every day, bob every other day, carol every third day, for two and a half weeks"""
+    students("alice", "bob", "carol")
+    with pool.connection() as connection:
+        for offset in range(17):
+            day = datetime.combine(MONDAY + timedelta(days=offset), datetime.min.time())
+            for i, name in enumerate(("alice", "bob", "carol")):
+                if offset % (i + 1):
+                    continue
+                mark_attendance_session(connection, name, day.replace(hour=9))
+                mark_attendance_session(connection, name, day.replace(hour=12, minute=30))
+
+
+def test_triggers_match_a_full_rebuild(pool, history):
+    incremental = read_rollups(pool)
+    assert rebuild_attendance_rollups() == 3
+    assert read_rollups(pool) == incremental
+
+    assert len(incremental["attendance_rollup_daily"]) == 17 + 9 + 6
+    assert all(row["total_seconds"] == 3.5 * 3600 for row in incremental["attendance_rollup_daily"])
+    assert incremental["attendance_rollup_weekly"][0]["days_present"] == 7
+    assert len(incremental["attendance_rollup_days"]) == 17
+
+
+def test_deleting_a_day_removes_it_from_the_day_list(pool, history):
+    with pool.connection() as connection, connection.cursor() as cursor:
+        cursor.execute("DELETE FROM attendance_sessions WHERE date = %s", (str(MONDAY + timedelta(days=1)),))
+        cursor.execute("DELETE FROM attendance_sessions WHERE date = %s AND student_id = 2",
+                       (str(MONDAY + timedelta(days=2)),))
+    days = [row["date"] for row in read_rollups(pool)["attendance_rollup_days"]]
+    assert str(MONDAY + timedelta(days=1)) not in days
+    assert str(MONDAY + timedelta(days=2)) in days
+
+
+def test_student_summary_spans_partial_weeks(pool, history):
+    start, end = MONDAY + timedelta(days=2), MONDAY + timedelta(days=15)
+    summary = query_student_summary(start, end).set_index("name")
+
+    assert summary.loc["alice", "days_present"] == 14
+    assert summary.loc["bob", "days_present"] == 7
+    assert summary.loc["alice", "attendance_rate"] == 100.0
+    assert summary.loc["bob", "attendance_rate"] == 50.0
+    assert summary.loc["carol", "total_hours"] == summary.loc["carol", "days_present"] * 3.5
@@ -0,0 +1,23 @@
+# time_utils.py
+"""Time formatting shared by the attendance and admin apps (no vision or UI imports)."""
+from datetime import datetime
+
+
+def convert_12_to_24(time_str):
+    """Convert 12-hour format to 24-hour format; None if ``time_str`` does not parse"""
+    try:
+        time_obj = datetime.strptime(time_str, '%I:%M %p')
+        return time_obj.strftime('%H:%M:%S')
+    except (TypeError, ValueError):
+        return None
+
+
+def convert_24_to_12(time_str):
+    """Convert 24-hour format to 12-hour format"""
+    if not time_str:
+        return ""
+    try:
+        time_obj = datetime.strptime(time_str, '%H:%M:%S')
+        return time_obj.strftime('%I:%M %p')
+    except ValueError:
+        return time_str
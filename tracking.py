@@ -0,0 +1,171 @@
+# tracking.py
+import itertools
+
+IOU_MATCH_THRESHOLD = 0.3
+MAX_MISSED_DETECTIONS = 2
+
+
+def box_iou(a, b):
+    """Intersection-over-union of two (top, right, bottom, left) boxes"""
+    top, bottom = max(a[0], b[0]), min(a[2], b[2])
+    left, right = max(a[3], b[3]), min(a[1], b[1])
+    inter = max(0, bottom - top) * max(0, right - left)
+    if inter == 0:
+        return 0.0
+    area_a = (a[2] - a[0]) * (a[1] - a[3])
+    area_b = (b[2] - b[0]) * (b[1] - b[3])
+    return inter / float(area_a + area_b - inter)
+
+
+class Track:
+    """One face followed across frames, carrying its identity and vote count"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, box, name, distance):
+        self.id = next(self._ids)
+        self.box = box
+        self.name = name
+        self.distance = distance
+        self.votes = 1 if name is not None else 0
+        self.retired = False  # Set once the identity is marked; the track no longer votes
+        self.missed = 0
+        self.cv_tracker = None
+
+    def observe(self, box, name, distance):
+        """Refresh the track from a full detection; a changed identity restarts the vote"""
+        self.box = box
+        self.missed = 0
+        self.distance = distance
+        if name is None:
+            return
+        if name == self.name:
+            self.votes += 1
+        else:
+            self.name = name
+            self.votes = 1
+            self.retired = False
+
+
+class FaceTracker:
+    """Runs full recognition every ``detect_every`` frames and propagates boxes in between.
+
+    Identities and votes live on tracks, so a person standing at the kiosk is
+    only re-encoded on detection frames. Votes are only cast on detection
+    frames with a confident match, which keeps ``MIN_REQUIRED_FRAMES``
+    meaning "confident matches" rather than "frames on screen".
+
+    Between detections boxes are held in place (kiosk faces move little), or
+    followed by an OpenCV tracker when ``tracker_factory`` is given, e.g.
+    ``cv2.TrackerMIL_create``. A tracker reporting failure forces a detection
+    on the next frame.
+    """
+
+    def __init__(self, detect_every=5, tracker_factory=None,
+                 iou_threshold=IOU_MATCH_THRESHOLD, max_missed=MAX_MISSED_DETECTIONS):
+        self.detect_every = max(1, detect_every)
+        self.tracker_factory = tracker_factory
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.tracks = []
+        self.frames_since_detection = None
+        self.track_lost = False
+        self.detections = 0
+        self.propagations = 0
+
+    def needs_detection(self):
+        return (
+            self.frames_since_detection is None
+            or self.track_lost
+            or not self.tracks
+            or self.frames_since_detection + 1 >= self.detect_every
+        )
+
+    def observe(self, face_locations, matched_names, match_distances, image=None):
+        """Associate a full detection with existing tracks by greedy IoU"""
+        pairs = sorted(
+            (
+                (box_iou(track.box, box), t, d)
+                for t, track in enumerate(self.tracks)
+                for d, box in enumerate(face_locations)
+            ),
+            reverse=True,
+        )
+        used_tracks, used_detections = set(), set()
+        for iou, t, d in pairs:
+            if iou < self.iou_threshold:
+                break
+            if t in used_tracks or d in used_detections:
+                continue
+            used_tracks.add(t)
+            used_detections.add(d)
+            self.tracks[t].observe(face_locations[d], matched_names[d], match_distances[d])
+
+        survivors = []
+        for t, track in enumerate(self.tracks):
+            if t not in used_tracks:
+                track.missed += 1
+            if track.missed <= self.max_missed:
+                survivors.append(track)
+        for d, box in enumerate(face_locations):
+            if d not in used_detections:
+                survivors.append(Track(box, matched_names[d], match_distances[d]))
+        self.tracks = survivors
+
+        if self.tracker_factory is not None and image is not None:
+            for track in self.tracks:
+                track.cv_tracker = self._init_cv_tracker(image, track.box)
+
+        self.frames_since_detection = 0
+        self.track_lost = False
+        self.detections += 1
+
+    def propagate(self, image=None):
+        """Advance track boxes without running detection or encoding"""
+        self.frames_since_detection += 1
+        self.propagations += 1
+        if self.tracker_factory is None or image is None:
+            return
+        for track in self.tracks:
+            if track.cv_tracker is None:
+                continue
+            ok, (x, y, w, h) = track.cv_tracker.update(image)
+            if ok:
+                track.box = (int(y), int(x + w), int(y + h), int(x))
+            else:
+                self.track_lost = True
+
+    def _init_cv_tracker(self, image, box):
+        top, right, bottom, left = (int(v) for v in box)
+        tracker = self.tracker_factory()
+        tracker.init(image, (left, top, right - left, bottom - top))
+        return tracker
+
+    def retire(self, name):
+        """Stop the current tracks of ``name`` from voting once it has been marked.
+
+        Only a new track (the person leaving and coming back) can vote for
+        the identity again, so someone who stays in view is not re-marked
+        when the cooldown ends.
+        """
+        for track in self.tracks:
+            if track.name == name:
+                track.retired = True
+
+    def votes(self):
+        """Return {name: votes}, keeping the strongest unretired track per identity"""
+        counts = {}
+        for track in self.tracks:
+            if track.retired:
+                continue
+            if track.name is not None and track.votes > counts.get(track.name, 0):
+                counts[track.name] = track.votes
+        return counts
+
+    def snapshot(self):
+        """Return (face_locations, names, distances) for the current tracks"""
+        return (
+            [track.box for track in self.tracks],
+            [track.name for track in self.tracks],
+            [track.distance for track in self.tracks],
+        )
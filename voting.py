@@ -0,0 +1,49 @@
+# voting.py
+from datetime import timedelta
+
+MIN_VOTES = 3  # Same as take_attendace.MIN_REQUIRED_FRAMES
+VOTE_WINDOW = timedelta(seconds=20)  # Votes older than this no longer count, like CAMERA_DURATION
+EVENT_COOLDOWN = timedelta(minutes=10)  # Same gap the live system enforces between sessions
+
+
+class AttendanceVoter:
+    """Turns a stream of confident matches into attendance events.
+
+    An identity produces an event once it has ``min_votes`` matches within
+    ``window``; after that it is ignored for ``cooldown``. Timestamps may
+    come from the wall clock or from a video position.
+    """
+
+    def __init__(self, min_votes=MIN_VOTES, window=VOTE_WINDOW, cooldown=EVENT_COOLDOWN):
+        self.min_votes = min_votes
+        self.window = window
+        self.cooldown = cooldown
+        self.votes = {}  # {name: [timestamps of confident matches]}
+        self.best = {}  # {name: best distance since the last event}
+        self.last_event = {}
+
+    def vote(self, name, timestamp, distance):
+        """Count one match; returns (votes, best_distance) when it completes an event, else None"""
+        window = [t for t in self.votes.get(name, []) if timestamp - t <= self.window]
+        window.append(timestamp)
+        self.votes[name] = window
+        self.best[name] = min(self.best.get(name, distance), distance)
+        if len(window) < self.min_votes:
+            return None
+        if self.cooling_down(name, timestamp):
+            return None
+        self.last_event[name] = timestamp
+        self.votes[name] = []
+        return len(window), self.best.pop(name)
+
+    def confirm(self, name, timestamp):
+        """Record an event decided elsewhere (e.g. by track votes); returns False while cooling down"""
+        if self.cooling_down(name, timestamp):
+            return False
+        self.last_event[name] = timestamp
+        self.votes[name] = []
+        self.best.pop(name, None)
+        return True
+
+    def cooling_down(self, name, now):
+        return name in self.last_event and now - self.last_event[name] < self.cooldown